@@ -0,0 +1,62 @@
+import re
+import json
+import numpy as np
+import pytest
+from stockmanager import helpers
+
+
+def legacy_parse(html):
+    """The parser of helpers.get_json up to version 0.1."""
+    json_str = html.split('root.App.main =')[1].split('(this)')[0].split(';\n}')[0].strip()
+    data = json.loads(json_str)['context']['dispatcher']['stores']['QuoteSummaryStore']
+    new_data = json.dumps(data).replace('{}', 'null')
+    new_data = re.sub(
+        r'\{[\'|\"]raw[\'|\"]:(.*?),(.*?)\}', r'\1', new_data)
+    return json.loads(new_data)
+
+
+@pytest.mark.benchmark(group='create_df')
+@pytest.mark.parametrize('n', [1000, 100000])
+def bench_create_df(benchmark, chart, n):
+    data = chart(n)
+    df = benchmark(helpers.create_df, data, timezone='America/New_York')
+    assert len(df) == n
+
+
+@pytest.mark.benchmark(group='create_df')
+@pytest.mark.parametrize('n', [1000, 100000])
+def bench_create_series(benchmark, chart, n):
+    data = chart(n)
+    assert len(benchmark(helpers.create_series, data)) == n
+
+
+@pytest.mark.benchmark(group='get_json')
+def bench_parse_quote_summary(benchmark, quote_page):
+    assert benchmark(helpers.parse_quote_summary, quote_page)
+
+
+@pytest.mark.benchmark(group='get_json')
+def bench_parse_quote_summary_legacy(benchmark, quote_page):
+    assert benchmark(legacy_parse, quote_page)
+
+
+def _statement(periods, items=30):
+    end = 1585612800 - 7776000 * np.arange(periods)
+    return [dict({'maxAge': 1, 'endDate': int(e)},
+                 **{'item%dValue' % i: (float(i * e) if i % 7 else '-') for i in range(items)})
+            for e in end]
+
+
+@pytest.mark.benchmark(group='cleanup_statement')
+@pytest.mark.parametrize('periods', [4, 40])
+def bench_cleanup_statement(benchmark, periods):
+    data = _statement(periods)
+    df = benchmark(helpers.cleanup_statement, data)
+    assert df.shape == (30, periods)
+
+
+@pytest.mark.benchmark(group='moving_average')
+@pytest.mark.parametrize('n', [1000, 1000000])
+def bench_moving_average(benchmark, n):
+    x = np.random.default_rng(0).random(n)
+    assert len(benchmark(helpers.moving_average, x, 20)) == n - 19
@@ -0,0 +1,14 @@
+from unittest import mock
+import pytest
+from stockmanager.visualization import price_plot_with_plotly
+
+
+@pytest.mark.benchmark(group='plotly')
+@pytest.mark.parametrize('n', [1000, 10000])
+@pytest.mark.parametrize('type', ['candle', 'line'])
+@mock.patch('stockmanager.visualization.plots.go.Figure.show')
+def bench_price_plot_with_plotly(show, benchmark, price_frame, n, type):
+    df = price_frame(n)
+    benchmark.pedantic(price_plot_with_plotly, args=(df,),
+                       kwargs={'type': type, 'mav': (5, 20)}, rounds=5)
+    assert show.called
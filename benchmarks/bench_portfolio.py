@@ -0,0 +1,98 @@
+from unittest import mock
+import numpy as np
+import pandas as pd
+import pytest
+from stockmanager import Portfolio
+from stockmanager.costbasis import CostBasis
+
+
+def _profiles(symbols, session=None):
+    return {s: {'symbol': s, 'name': s, 'exchange': 'NMS', 'currency': 'USD',
+                'price': 100., 'time': 0} for s in symbols}
+
+
+def _portfolio(n):
+    p = Portfolio()
+    p.summary = pd.DataFrame({'Symbol': ['S%d' % i for i in range(n)],
+                              'Name': 'Name', 'Exchange': 'NMS', 'Holdings': 10,
+                              'Price at Registration': 100., 'Currency': 'USD',
+                              'Date': '01.01.2020 10:00'})
+    p.record = pd.DataFrame({'Symbol': ['S%d' % (i % 100) for i in range(n)],
+                             'Sell': 0, 'Buy': 10, 'Price': 100.,
+                             'Date': pd.Timestamp('2020-01-01 10:00'), 'Total Sell': 0.,
+                             'Total Buy': 1000., 'Fee': 0.})
+    return p
+
+
+@pytest.fixture(scope='module', params=[10000, 100000, 1000000])
+def portfolio(request):
+    return _portfolio(request.param)
+
+
+def _fresh(portfolio):
+    """pedantic setup: a copy of the portfolio for each round."""
+    def setup():
+        p = Portfolio()
+        p.summary = portfolio.summary.copy()
+        p.record = portfolio.record.copy()
+        return (p,), {}
+    return setup
+
+
+@pytest.mark.benchmark(group='Portfolio.add')
+@mock.patch('stockmanager.Portfolio.quote_profiles', _profiles)
+def bench_add_new(benchmark, portfolio):
+    benchmark.pedantic(lambda p: p.add('NEW', 10), setup=_fresh(portfolio), rounds=10)
+
+
+@pytest.mark.benchmark(group='Portfolio.add')
+@mock.patch('stockmanager.Portfolio.quote_profiles', _profiles)
+def bench_add_existing(benchmark, portfolio):
+    benchmark.pedantic(lambda p: p.add('S0', 10), setup=_fresh(portfolio), rounds=10)
+
+
+@pytest.mark.benchmark(group='Portfolio.trade')
+def bench_trade(benchmark, portfolio):
+    benchmark.pedantic(lambda p: p.trade('buy', 'S0', 10, price=100.),
+                       setup=_fresh(portfolio), rounds=10)
+
+
+@pytest.mark.benchmark(group='Portfolio.trade')
+def bench_trade_many(benchmark, portfolio):
+    """10k fills of 100 symbols in one call."""
+    n = 10000
+    trades = pd.DataFrame({'Type': np.where(np.arange(n) % 3, 'buy', 'sell'),
+                           'Symbol': ['S%d' % (i % 100) for i in range(n)],
+                           'Amount': 10, 'Price': 100., 'Date': '02.01.2020 10:00'})
+    benchmark.pedantic(lambda p: p.trade_many(trades), setup=_fresh(portfolio), rounds=5)
+
+
+@pytest.mark.benchmark(group='Portfolio.cost_basis')
+@pytest.mark.parametrize('method', ['fifo', 'lifo', 'average'])
+def bench_cost_basis(benchmark, portfolio, method):
+    """Full rebuild, every other trade sells half of the trade before."""
+    record = portfolio.record.sort_values('Symbol', kind='stable', ignore_index=True)
+    record.loc[1::2, 'Sell'] = 5
+    record.loc[1::2, 'Buy'] = 0
+    benchmark(lambda: CostBasis(method).update(record))
+
+
+@pytest.mark.benchmark(group='Portfolio.load')
+@pytest.mark.parametrize('format', ['csv', 'parquet', 'feather'])
+def bench_load(benchmark, tmpdir, portfolio, format):
+    pytest.importorskip('pyarrow')
+    portfolio.save(str(tmpdir), format=format)
+    paths = [str(tmpdir.join(name + format)) for name in ('portfolio.', 'records.')]
+    benchmark.pedantic(lambda: Portfolio().load(*paths), rounds=3)
+
+
+@pytest.mark.benchmark(group='Portfolio.load')
+def bench_load_filtered(benchmark, tmpdir, portfolio):
+    """One symbol of a Parquet record, the other row groups are skipped."""
+    pytest.importorskip('pyarrow')
+    p = Portfolio()
+    p.summary = portfolio.summary
+    p.record = p._sort_record(portfolio.record)
+    p.save(str(tmpdir), format='parquet')
+    paths = [str(tmpdir.join(name)) for name in ('portfolio.parquet', 'records.parquet')]
+    benchmark.pedantic(lambda: Portfolio().load(*paths, symbols=['S5']), rounds=3)
@@ -0,0 +1,80 @@
+""" Benchmark suite of the hot paths, based on pytest-benchmark.
+
+Everything runs on recorded payloads, no request is sent. The quote page
+and the prices of tests/dummy_data are used, repeated to the benchmarked
+sizes. Quote pages of an archive written by transport.RecordTransport are
+benchmarked as well if STOCKMANAGER_REPLAY is set to its directory.
+
+Usage::
+
+    pip install stockmanager[benchmark]
+    pytest benchmarks
+
+Each run is saved under .benchmarks/ with the commit id in the file name.
+Compare with an earlier run and fail on a regression with::
+
+    pytest benchmarks --benchmark-compare --benchmark-compare-fail=mean:10%
+"""
+
+import os
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from stockmanager.helpers import create_df
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DUMMY_DATA = os.path.join(ROOT, 'tests', 'dummy_data')
+
+
+def _quote_pages():
+    pages = {'dummy_quote': os.path.join(DUMMY_DATA, 'dummy_quote.html')}
+    archive = os.environ.get('STOCKMANAGER_REPLAY')
+    if archive:
+        for fname in sorted(os.listdir(archive)):
+            if fname.endswith('.json'):
+                pages[fname[:8]] = os.path.join(archive, fname)
+    return pages
+
+
+@pytest.fixture(scope='session', params=sorted(_quote_pages()))
+def quote_page(request):
+    path = _quote_pages()[request.param]
+    with open(path) as f:
+        text = f.read()
+    if path.endswith('.json'):
+        text = json.loads(text)['text']
+    if 'QuoteSummaryStore' not in text:
+        pytest.skip("%s is not a quote page" % request.param)
+    return text
+
+
+@pytest.fixture(scope='session')
+def dummy_price():
+    return pd.read_csv(os.path.join(DUMMY_DATA, 'dummy_price.csv'), index_col=0)
+
+
+def make_chart(dummy_price, n, step=60):
+    """Chart response of n bars, the recorded bars repeated, one per step seconds."""
+    reps = -(-n // len(dummy_price))
+
+    def column(name):
+        return np.tile(dummy_price[name].to_numpy(), reps)[:n].tolist()
+    return {'meta': {'symbol': 'MSFT', 'currency': 'USD'},
+            'timestamp': (1587648600 + step * np.arange(n)).tolist(),
+            'indicators': {'quote': [{'open': column('Open'), 'high': column('High'),
+                                      'low': column('Low'), 'close': column('Close'),
+                                      'volume': column('Volume')}],
+                           'adjclose': [{'adjclose': column('Adj Close')}]}}
+
+
+@pytest.fixture(scope='session')
+def chart(dummy_price):
+    """Factory of chart responses, chart(n)."""
+    return lambda n: make_chart(dummy_price, n)
+
+
+@pytest.fixture(scope='session')
+def price_frame(chart):
+    """Factory of get_price DataFrames, price_frame(n)."""
+    return lambda n: create_df(chart(n), timezone='America/New_York')
@@ -15,15 +15,51 @@ limitations under the License.
 """
 
 from .Ticker import Ticker
+from .batch import quote_profiles
+from .costbasis import CostBasis
+from .journal import TradeJournal
+from .storage import save_table, iter_table, _get_format
+import numpy as np
 import pandas as pd
+from bisect import bisect_left, bisect_right
+from contextlib import contextmanager
 from glob import glob
 import os
 from os import mkdir
-from time import strftime
 import logging
 _LOGGER = logging.getLogger(__name__)
 _LOGGER.addHandler(logging.NullHandler())
 
+DATE_FORMAT = "%d.%m.%Y %H:%M"  # Date strings of records before 0.2
+FORMATS = ('csv', 'parquet', 'feather')
+RECORD_DTYPES = {'Sell': 'int64', 'Buy': 'int64', 'Price': 'float64',
+                 'Total Sell': 'float64', 'Total Buy': 'float64', 'Fee': 'float64'}
+SUMMARY_DTYPES = {'Price at Registration': 'float64'}
+RECORD_ROW_GROUP = 100000
+
+
+def _parse_dates(dates):
+    """Dates as datetime64[ns]. Strings can be ISO 8601, DATE_FORMAT or any
+    day first format."""
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        parsed = pd.to_datetime(dates, format='ISO8601', errors='coerce')
+        for fmt in (DATE_FORMAT, 'mixed'):
+            other = parsed.isna() & dates.notna()
+            if not other.any():
+                break
+            parsed[other] = pd.to_datetime(dates[other], format=fmt, dayfirst=True,
+                                           errors='coerce')
+        dates = parsed
+    return dates.astype('datetime64[ns]')
+
+
+def _typed(df, dtypes):
+    """Cast the columns of df that are in dtypes, and Date to datetime64."""
+    df = df.astype({c: t for c, t in dtypes.items() if c in df.columns})
+    if 'Date' in df.columns:
+        df['Date'] = _parse_dates(df['Date'])
+    return df
+
 
 class Portfolio(object):
     """Porfolio is a class help you keep track of your trade record, holders,
@@ -33,63 +69,226 @@ class Portfolio(object):
     There are two ways, you can either instantiate a new manager
     or pull a prerecorded record file.
 
+    Parameters
+    ----------
+    session : requests.Session, optional
+        Session passed to every Ticker the portfolio creates. By default the
+        shared session of stockmanager.network is used.
+    journal : str or TradeJournal, optional
+        SQLite journal, see stockmanager.journal. The portfolio is restored
+        from it and every later change is appended to it.
+
+    Attributes
+    ----------
+    summary : pandas.DataFrame
+        Holdings, one row per symbol. The holdings are stored indexed by
+        symbol, summary returns them as a DataFrame with a Symbol column.
+        Changes made to it in place are kept, or assign a DataFrame to
+        replace them.
+    record : pandas.DataFrame
+        Trade record, Date is datetime64. Fee is the absolute fee of each trade.
+    journal : TradeJournal or None
+
     Examples
     --------
 
     """
     # TODO what happen if holding is reduced to 0, move holding to history
-    # TODo take agency fee into account
-    def __init__(self, read_file=None):
+    def __init__(self, read_file=None, session=None, journal=None):
         self._summary_colnames = ['Symbol', 'Name', 'Exchange', 'Holdings',
                                   'Price at Registration', 'Currency', 'Date']
         # create an empty frame
-        self.summary = pd.DataFrame(columns=self._summary_colnames)
+        self._summary_columns = self._summary_colnames
+        self._summary_frame = None  # Returned by summary, may be changed in place
+        self._summary_snapshot = None
+        self._holdings = pd.DataFrame(columns=self._summary_colnames[1:],
+                                      index=pd.Index([], name='Symbol'))
         self._trade_record_colnames = ['Symbol', 'Sell', 'Buy', 'Price',
-                                       'Date', 'Total Sell', 'Total Buy']
-        self.record = pd.DataFrame(columns=self._trade_record_colnames)
+                                       'Date', 'Total Sell', 'Total Buy', 'Fee']
+        self.record = _typed(pd.DataFrame(columns=self._trade_record_colnames), RECORD_DTYPES)
         self.ticker = None
         self._remove_buffer = None
+        self._session = session
+        self._pending = None  # Trades buffered by batch()
+        self._cost_engines = {}  # method -> CostBasis, updated by trade_many
+        self._cost_until = None  # Latest trade date the engines processed
+        self._sorted_record = None  # The record if trade_many left it sorted
+        self.journal = None
+        if journal is not None:
+            self._replay(journal if isinstance(journal, TradeJournal) else TradeJournal(journal))
+
+    @property
+    def summary(self):
+        """Holdings as a DataFrame with a Symbol column, in the column order
+        they were given. The same DataFrame is returned until the holdings
+        change, changes made to it in place are taken over like an
+        assignment."""
+        if self._summary_frame is None:
+            df = self._holdings_frame.reset_index()
+            self._summary_frame = df[[c for c in self._summary_columns if c in df.columns]]
+            self._summary_snapshot = self._summary_frame.copy()
+        return self._summary_frame
+
+    @summary.setter
+    def summary(self, df):
+        if 'Symbol' not in df.columns:
+            if df.index.name != 'Symbol':
+                raise KeyError("summary needs a Symbol column.")
+            df = df.reset_index()
+        self._summary_columns = list(df.columns)
+        holdings = df.set_index('Symbol')
+        if 'Date' in holdings.columns:
+            holdings['Date'] = _parse_dates(holdings['Date'])
+        if not holdings.index.is_unique:
+            _LOGGER.warning("Duplicated symbols in summary, the last row of each is kept.")
+            holdings = holdings[~holdings.index.duplicated(keep='last')]
+        self._holdings = holdings
+        if self.journal is not None:
+            self.journal.checkpoint(self.summary)
+
+    def _sync_summary(self):
+        """Take over the changes made to the summary frame in place, they
+        are checkpointed like an assignment. The frame is dropped, the next
+        summary is built again."""
+        frame = self._summary_frame
+        if frame is not None:
+            self._summary_frame = None
+            if not frame.equals(self._summary_snapshot):
+                self.summary = frame
+
+    @property
+    def _holdings(self):
+        """Holdings indexed by Symbol, the caller may change them."""
+        self._sync_summary()
+        return self._holdings_frame
+
+    @_holdings.setter
+    def _holdings(self, df):
+        self._summary_frame = None
+        self._holdings_frame = df
 
     @staticmethod
     def get_now():
-        return strftime("%d.%m.%Y %H:%M")
+        """Current time to the minute."""
+        return pd.Timestamp.now().floor('min')
 
     def add(self, symbol, holdings, date='now'):
-        """A new record, this will overwrite whatever the current one.
+        """Register holdings, they are added to the holdings of a symbol
+        that is already registered.
+
+        Name, exchange, currency and price of new symbols are requested
+        with batch.quote_profiles, all symbols of a call at once.
+
+        Examples
+        --------
+        ::
+
+            p.add('MSFT', 10)
+            p.add(['AAPL', 'ZM', 'NFLX'], [5, 20, 3])
 
         Parameters
         ----------
-        symbol : str
-            Ticker symbol
-        holdings : int
-            The amount of holdings to add.
-        date : string. Optional
-            Date information. Default is the current time of call
-            Currently only now. More options to be added. 
+        symbol : str or list of str
+            Ticker symbol(s)
+        holdings : int or list of int
+            The amount of holdings to add, one per symbol or the same for all.
+        date : str or datetime, optional
+            Date information. Default is the current time of call.
         """
-        if not isinstance(symbol, str) or not isinstance(holdings, int):
-            raise TypeError("symbol needs to be str and holdings need to be int")
+        if isinstance(symbol, str):
+            symbols = [symbol]
+        elif hasattr(symbol, '__iter__'):
+            symbols = list(symbol)
         else:
-            self.symbol = symbol
-            self.holdings = holdings
+            raise TypeError("symbol needs to be str and holdings need to be int")
+        amounts = [holdings] * len(symbols) if isinstance(holdings, int) else list(holdings)
+        if not all(isinstance(s, str) for s in symbols) or \
+                not all(isinstance(h, (int, np.integer)) for h in amounts):
+            raise TypeError("symbol needs to be str and holdings need to be int")
+        if len(amounts) != len(symbols):
+            raise ValueError("one holdings value per symbol is needed.")
+
+        added = {}
+        for s, h in zip(symbols, amounts):
+            added[s] = added.get(s, 0) + int(h)
+        new = [s for s in added if s not in self._holdings.index]
+        profiles = {}
+        if new:
             try:
-                self.ticker = Ticker(self.symbol)
-                self.ticker.get_fundamentals()
-            except:  # Can have multiple exception possibilities
-                raise (AttributeError("symbol not recognise, please use a valid ticker symbol"))
-        if date == 'now':
-            now = self.get_now()
-        if self.symbol in self.summary.Symbol.values:
-            self.summary.loc[self.summary['Symbol'] == self.symbol, ['Holdings']] = \
-                self.summary.loc[self.summary['Symbol'] == self.symbol, ['Holdings']].Holdings[0] + self.holdings
-        else:
-            # Append to the last row.
-            to_append = [self.symbol, self.ticker.name,
-                         self.ticker.company_information['exchange'],
-                         self.holdings, self.ticker.current_price,
-                         self.ticker.currency, now]
-            df_len = len(self.summary)
-            self.summary.loc[df_len] = to_append
+                profiles = quote_profiles(new, session=self._session)
+            except Exception:  # Can have multiple exception possibilities
+                raise AttributeError("symbol not recognise, please use a valid ticker symbol")
+            unknown = [s for s in new if s.upper() not in profiles]
+            if unknown:
+                raise AttributeError("symbol not recognise, please use a valid ticker symbol: %s"
+                                     % ', '.join(unknown))
+        now = self.get_now() if date == 'now' else _parse_dates(pd.Series([date]))[0]
+
+        for s, h in added.items():
+            if s in self._holdings.index:
+                self._holdings.at[s, 'Holdings'] += h
+        if new:
+            rows = pd.DataFrame({
+                'Name': [profiles[s.upper()]['name'] for s in new],
+                'Exchange': [profiles[s.upper()]['exchange'] for s in new],
+                'Holdings': [added[s] for s in new],
+                'Price at Registration': [profiles[s.upper()]['price'] for s in new],
+                'Currency': [profiles[s.upper()]['currency'] for s in new],
+                'Date': now}, index=pd.Index(new, name='Symbol'))
+            rows = rows.reindex(columns=self._holdings.columns)
+            self._holdings = pd.concat([self._holdings, rows]) if len(self._holdings) else rows
+        if self.journal is not None:
+            self.journal.upsert(self._holdings.loc[list(added)])
+
+    def valuation(self, max_age=None):
+        """Mark the holdings to market.
+
+        The current prices of all symbols are requested together with
+        batch.quote_profiles, cached quotes up to max_age seconds old are
+        reused. Everything else is computed on whole columns.
+
+        Parameters
+        ----------
+        max_age : float, optional
+            Reuse quotes up to max_age seconds old, by default the ttl of
+            cache.profile_cache. 0 requests all prices.
+
+        Returns
+        -------
+        pandas.DataFrame
+            Indexed by Symbol, with Holdings, Price at Registration, Price,
+            Price Time, Currency, Market Value, Cost, Unrealized P&L,
+            Unrealized P&L % and Weight. The weight is the share of the
+            market value of all holdings in the same currency. Symbols
+            without a quote have NaN prices.
+        """
+        holdings = self._holdings
+        symbols = list(holdings.index)
+        profiles = quote_profiles(symbols, max_age=max_age, session=self._session) if symbols else {}
+        quotes = [profiles.get(str(s).upper(), {}) for s in symbols]
+
+        amount = pd.to_numeric(holdings['Holdings'], errors='coerce').to_numpy(dtype=float)
+        registered = pd.to_numeric(holdings['Price at Registration'],
+                                   errors='coerce').to_numpy(dtype=float)
+        price = np.array([q.get('price', np.nan) for q in quotes], dtype=float)
+        price_time = pd.to_datetime([q.get('time') for q in quotes], unit='s')
+        currency = [q.get('currency') or c for q, c in
+                    zip(quotes, holdings.get('Currency', pd.Series(None, index=holdings.index)))]
+
+        market_value = amount * price
+        cost = amount * registered
+        with np.errstate(divide='ignore', invalid='ignore'):
+            pnl_pct = price / registered - 1.
+        result = pd.DataFrame({'Holdings': amount, 'Price at Registration': registered,
+                               'Price': price, 'Price Time': price_time,
+                               'Currency': currency, 'Market Value': market_value,
+                               'Cost': cost, 'Unrealized P&L': market_value - cost,
+                               'Unrealized P&L %': pnl_pct},
+                              index=holdings.index)
+        total = result.groupby('Currency', dropna=False)['Market Value'].transform('sum')
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result['Weight'] = market_value / total.to_numpy()
+        return result
 
     def remove(self, symbol):
         """Remove an stock from summary
@@ -100,18 +299,26 @@ class Portfolio(object):
             Ticker symbol(s) to be removed.
         """
         if isinstance(symbol, str):
-            self.summary = self.summary[self.summary.Symbol != symbol]
-        elif hasattr(symbol, '__iter__'):
-            for s in symbol:
-                self.summary = self.summary[self.summary.Symbol != s]
-        else:
+            symbol = [symbol]
+        elif not hasattr(symbol, '__iter__'):
             raise TypeError("symbol must be str or list.")
+        symbol = [s for s in symbol if s in self._holdings.index]
+        if self.journal is not None and symbol:
+            self.journal.remove(symbol)
+        self._holdings = self._holdings.drop(index=symbol)
 
-    def load(self, summary_path='./portfolio.csv', record_path='./record.csv'):
+    def load(self, summary_path='./portfolio.csv', record_path='./record.csv',
+             format=None, symbols=None, start=None, end=None, chunksize=None):
         """Load summary and record file. You can have a saved summary and record
         data using the save() method. The load method will load self.summary and 
         self.record if the file path is valid. 
 
+        Columns get the dtypes of RECORD_DTYPES and SUMMARY_DTYPES, Date is
+        parsed to datetime64 and the record is sorted by Symbol and Date,
+        as save() stores it. Filters only apply to the record, a Parquet
+        record is read row group by row group and only the row groups
+        that can hold matching trades are read.
+
         Parameters
         ----------
         summary_path : str, optional
@@ -120,13 +327,86 @@ class Portfolio(object):
         record_path : str, optional
             path including filename of the record data. By default it tries to
             look for record.csv in the current directory.
+        format : str, optional
+            'csv', 'parquet' or 'feather', by default taken from the file
+            extensions.
+        symbols : list of str, optional
+            Only load the trades of these symbols.
+        start, end : str or datetime, optional
+            Only load the trades with start <= Date <= end.
+        chunksize : int, optional
+            Read a csv record in chunks of chunksize rows and filter each
+            chunk, so only the matching trades are held in memory.
+
+        With a journal, the loaded summary is checkpointed but the loaded
+        record is not journaled.
         """
-        self.summary = pd.read_csv(summary_path)
-        self.record = pd.read_csv(record_path)
+        read = {'csv': pd.read_csv, 'parquet': pd.read_parquet, 'feather': pd.read_feather}
+        self.summary = _typed(read[_get_format(summary_path, format, FORMATS)](summary_path),
+                              SUMMARY_DTYPES)
+        if chunksize is None and symbols is None and start is None and end is None and \
+                _get_format(record_path, format, FORMATS) == 'csv':
+            record = _typed(pd.read_csv(record_path, dtype=RECORD_DTYPES), RECORD_DTYPES)
+        else:
+            chunks = list(self.iter_record(record_path, chunksize or 1000000, symbols,
+                                           start, end, format))
+            record = pd.concat(chunks, ignore_index=True) if chunks else \
+                _typed(pd.DataFrame(columns=self._trade_record_colnames), RECORD_DTYPES)
+        self.record = self._sort_record(record)
+        self._sorted_record = self.record
+        self._cost_engines = {}
         return self
 
+    @staticmethod
+    def iter_record(path, chunksize=100000, symbols=None, start=None, end=None, format=None):
+        """Stream a record file in typed chunks, for records that do not fit in
+        memory.
+
+        Examples
+        --------
+        ::
+
+            fills = sum(len(chunk) for chunk in Portfolio.iter_record('records.parquet',
+                                                                      symbols=['MSFT']))
+
+        Parameters
+        ----------
+        path : str
+            Record file written by save().
+        chunksize : int, optional
+            Maximum rows per chunk, before filtering.
+        symbols, start, end, format
+            See load().
+
+        Yields
+        ------
+        pandas.DataFrame
+            Trades in the filters, empty chunks are skipped.
+        """
+        format = _get_format(path, format, FORMATS)
+        if isinstance(symbols, str):
+            symbols = [symbols]
+        if format != 'csv':
+            for table in iter_table(path, 'Date', start=start, end=end, symbols=symbols,
+                                    format=format, batch_size=chunksize):
+                yield _typed(table.to_pandas(), RECORD_DTYPES)
+            return
+        start = None if start is None else pd.Timestamp(start)
+        end = None if end is None else pd.Timestamp(end)
+        for chunk in pd.read_csv(path, dtype=RECORD_DTYPES, chunksize=chunksize):
+            chunk = _typed(chunk, RECORD_DTYPES)
+            mask = np.ones(len(chunk), dtype=bool)
+            if symbols is not None:
+                mask &= chunk['Symbol'].isin(symbols).to_numpy()
+            if start is not None:
+                mask &= (chunk['Date'] >= start).to_numpy()
+            if end is not None:
+                mask &= (chunk['Date'] <= end).to_numpy()
+            if mask.any():
+                yield chunk if mask.all() else chunk[mask]
+
     def save(self, filepath='./', summary_name=None,
-             record_name=None, format='csv', index=False):
+             record_name=None, format='csv', index=False, compression=None):
         """Save summary and trade record to files
 
         Parameters
@@ -134,10 +414,16 @@ class Portfolio(object):
         filepath : str, optional
             Directory path, should end with /. Default is current directory.
         format : str, optional
-            By default it will save as csv. #TODO add more date formats
+            'csv' (default), 'parquet' or 'feather'. Parquet and Feather keep
+            the dtypes and need pyarrow. The record is stored sorted by
+            Symbol and Date, in Parquet row groups of RECORD_ROW_GROUP rows.
         index : bool, optional
             Whether the dataframe index will be save as an extra column. Default is False
+        compression : str, optional
+            Compression codec of Parquet and Feather, see save_prices.
         """
+        if format not in FORMATS:
+            raise AttributeError("format can only be %s." % ', '.join(FORMATS))
         if filepath == '.':
             filepath = './'
         if summary_name is not None:
@@ -152,14 +438,23 @@ class Portfolio(object):
             record_name = ''.join([record_name, '.', format])
         else:
             record_name = ''.join(['records.', format])
+        summary_path = os.path.join(filepath, summary_name)
+        record_path = os.path.join(filepath, record_name)
         if format == 'csv':
-            self.summary.to_csv(os.path.join(filepath, summary_name), index=index)
-            self.record.to_csv(os.path.join(filepath, record_name), index=index)
-            return self
+            self.summary.to_csv(summary_path, index=index)
+            self.record.to_csv(record_path, index=index)
+        else:
+            save_table(self.summary, summary_path, format, compression)
+            save_table(self.record, record_path, format, compression,
+                       row_group_size=RECORD_ROW_GROUP)
+        return self
 
     def trade(self, typ, symbol, amount, fee=None, price=None, update_summary=True):
         """Register a trade record.
 
+        Inside a batch() block the trade is buffered and registered with
+        the other trades of the block when it ends.
+
         Parameters
         ----------
         typ : str
@@ -176,34 +471,275 @@ class Portfolio(object):
             If True, will update self.summary
         """
         typ = typ.lower()
-        _ticker = Ticker(symbol)
-        _register_price = price or _ticker.current_price
-        _fee = fee or 0.
-        if typ == 'buy':
-            _buy = int(amount)
-            _sell = 0
-            _delta = int(amount)
-        elif typ == 'sell':
-            _sell = int(amount)
-            _buy = 0
-            _delta = -1 * (amount)
-        else:
+        if typ not in ('buy', 'sell'):
             raise ValueError("typ can only be either buy or sell, case insensitive.")
+        trade = {'Type': typ, 'Symbol': symbol, 'Amount': amount,
+                 'Price': np.nan if price is None else price, 'Fee': fee or 0.,
+                 'Date': self.get_now()}
+        if self._pending is not None:
+            self._pending.append((trade, update_summary))
+            return
+        self.trade_many(pd.DataFrame([trade]), update_summary=update_summary)
+
+    def trade_many(self, trades=None, update_summary=True, **columns):
+        """Register many trades at once.
+
+        The rows are built in one go, the record is sorted once and the
+        holdings in summary are updated in one grouped pass, so importing
+        a large statement takes about as long as one trade.
 
-        _total_buy = _buy * _register_price - _fee
-        _total_sell = _sell * _register_price - _fee
-        _now = self.get_now()
-        to_append = [symbol, _sell, _buy, _register_price, _now, _total_sell, _total_buy]
-        df_len = len(self.record)
-        self.record.loc[df_len] = to_append
-        self.record.sort_values(by=['Symbol', 'Time'], inplace=True)
+        Examples
+        --------
+        ::
+
+            p.trade_many(statement)  # DataFrame with Type, Symbol, Amount, Price columns
+            p.trade_many(Type=['buy', 'sell'], Symbol=['MSFT', 'MSFT'],
+                         Amount=[10, 5], Price=[180., 185.])
+
+        Parameters
+        ----------
+        trades : pandas.DataFrame or dict, optional
+            Columns Type ('buy' or 'sell', case insensitive), Symbol and
+            Amount, optionally Price, Fee and Date. Missing prices are the
+            current price of the symbol, a missing Date is now.
+        update_summary : bool, optional
+            If True, will update self.summary
+        **columns
+            The columns as arrays, instead of trades.
+
+        Raises
+        ------
+        ValueError
+            If a trade has no price and its symbol has no current price.
+        """
+        trades = pd.DataFrame(columns if trades is None else trades)
+        if not len(trades):
+            return
+        missing = {'Type', 'Symbol', 'Amount'} - set(trades.columns)
+        if missing:
+            raise KeyError("trades need the columns %s" % sorted(missing))
+        typ = trades['Type'].str.lower().to_numpy()
+        is_buy = typ == 'buy'
+        if not (is_buy | (typ == 'sell')).all():
+            raise ValueError("typ can only be either buy or sell, case insensitive.")
+        symbols = trades['Symbol'].to_numpy()
+        amount = trades['Amount'].to_numpy().astype(np.int64)
+        price = self._trade_prices(trades)
+        fee = trades['Fee'].fillna(0.).to_numpy(dtype=float) if 'Fee' in trades else 0.
+        if 'Date' in trades:
+            dates = _parse_dates(trades['Date']).fillna(self.get_now()).to_numpy()
+        else:
+            dates = np.full(len(trades), self.get_now().to_datetime64(), dtype='datetime64[ns]')
+
+        buy = np.where(is_buy, amount, 0)
+        sell = np.where(is_buy, 0, amount)
+        rows = pd.DataFrame({'Symbol': symbols, 'Sell': sell, 'Buy': buy,
+                             'Price': price, 'Date': dates,
+                             'Total Sell': sell * price - fee,
+                             'Total Buy': buy * price - fee, 'Fee': fee},
+                            columns=self._trade_record_colnames)
+        # Same time order as the record, the order of equal times is kept.
+        order = np.argsort(rows['Date'].to_numpy(), kind='stable')
+        rows = rows.iloc[order].reset_index(drop=True)
+
+        if self.journal is not None:  # Written ahead, a failed append changes nothing.
+            self._sync_summary()  # Checkpointed before the trades
+            self.journal.append_trades(rows, update_summary)
+        previous = len(self.record)
+        if previous and self.record is self._sorted_record:
+            self.record = self._insert_sorted(self.record, rows)
+        else:
+            record = pd.concat([self.record, rows], ignore_index=True) if previous else rows
+            self.record = self._sort_record(record)
+        self._sorted_record = self.record
+        self._update_cost_basis(rows, previous)
         if update_summary:
-            # update self.summary here
-            # Check if summary has this:
-            if symbol in set(self.summary['Symbol']):
-                self.summary.loc[self.summary['Symbol'] == symbol, ['Holdings']] = \
-                    self.summary.loc[self.summary['Symbol'] == symbol, ['Holdings']].Holdings[0] + _delta
-                self.summary.loc[self.summary['Symbol'] == symbol, ['Price at Registration']] = _register_price
-                self.summary.loc[self.summary['Symbol'] == symbol, ['Date']] = _now
+            self._update_holdings(rows)
+
+    def checkpoint(self):
+        """Store the holdings in the journal, so opening it only replays
+        the changes made after now. Returns the last journal event included."""
+        if self.journal is None:
+            raise AttributeError("the portfolio has no journal.")
+        self._sync_summary()
+        return self.journal.checkpoint(self.summary)
+
+    def _replay(self, journal):
+        """Restore the holdings and record from a journal, then use it."""
+        summary, events = journal.replay()
+        if summary is not None:
+            self.summary = summary
+        for kind, payload in events:
+            if kind == 'trades':
+                self._update_holdings(payload)
+            elif kind == 'upsert':
+                known = payload.index.intersection(self._holdings.index)
+                self._holdings.loc[known] = payload.loc[known].reindex(
+                    columns=self._holdings.columns)
+                new = payload[~payload.index.isin(self._holdings.index)]
+                if len(new):
+                    new = new.reindex(columns=self._holdings.columns)
+                    self._holdings = pd.concat([self._holdings, new]) \
+                        if len(self._holdings) else new
             else:
-                _LOGGER.warning("Symbol not in the summary. Register one for you")
\ No newline at end of file
+                self._holdings = self._holdings.drop(index=payload, errors='ignore')
+        record = journal.record()
+        if len(record):
+            self.record = self._sort_record(record)
+            self._sorted_record = self.record
+        self.journal = journal
+
+    def _update_cost_basis(self, rows, previous):
+        """Pass new trades to the cost basis engines. An engine that missed
+        trades, or would see a trade before one it processed, is dropped and
+        rebuilt from the record by the next cost_basis call."""
+        if not self._cost_engines:
+            return
+        dates = _parse_dates(rows['Date'])
+        if self._cost_until is not None and dates.min() < self._cost_until:
+            self._cost_engines = {}
+            return
+        for method, engine in list(self._cost_engines.items()):
+            if engine.n_trades != previous:
+                del self._cost_engines[method]
+                continue
+            try:
+                engine.update(rows)
+            except ValueError:
+                del self._cost_engines[method]
+        self._cost_until = dates.max()
+
+    def cost_basis(self, method='fifo', prices=None):
+        """Cost basis, realized and unrealized P&L of each symbol traded.
+
+        Lots are matched per symbol over the whole record, see
+        stockmanager.costbasis. Fees of buys add to the cost basis, fees
+        of sells reduce the proceeds. The engine of each method is kept and
+        only processes the trades registered since the last call.
+
+        Parameters
+        ----------
+        method : str, optional
+            'fifo' (default), 'lifo' or 'average'.
+        prices : dict or pandas.Series, optional
+            symbol -> current price, for the unrealized P&L.
+
+        Returns
+        -------
+        pandas.DataFrame
+            Indexed by Symbol, with Position, Cost Basis, Average Cost,
+            Realized P&L and Fees, plus Price, Market Value and Unrealized
+            P&L if prices are given.
+
+        Raises
+        ------
+        ValueError
+            If the record sells more of a symbol than it bought.
+        """
+        method = method.lower()
+        engine = self._cost_engines.get(method)
+        if engine is None or engine.n_trades != len(self.record):
+            engine = CostBasis(method)
+            engine.update(self.record)
+            self._cost_engines[method] = engine
+            if len(self.record):
+                self._cost_until = _parse_dates(self.record['Date']).max()
+        return engine.positions(prices)
+
+    def _trade_prices(self, trades):
+        """Prices of the trades, the current price where none is given."""
+        if 'Price' not in trades:
+            price = pd.Series(np.nan, index=trades.index)
+        else:
+            price = pd.to_numeric(trades['Price'])
+        missing = price.isna()
+        if missing.any():
+            # Quotes are cached, so one request per symbol.
+            current = {s: Ticker(s, session=self._session).current_price
+                       for s in trades.loc[missing, 'Symbol'].unique()}
+            unpriced = sorted(str(s) for s, v in current.items() if v is None)
+            if unpriced:
+                raise ValueError("no price given and no current price of %s."
+                                 % ', '.join(unpriced))
+            price[missing] = trades.loc[missing, 'Symbol'].map(current)
+        return price.to_numpy(dtype=float)
+
+    @classmethod
+    def _insert_sorted(cls, record, rows):
+        """Insert rows into a record sorted by Symbol and Date without sorting
+        it again. New rows go after the trades at the same time.
+
+        The positions are found by bisection, which reads a few values of
+        the Symbol column instead of converting all of it.
+        """
+        rows = cls._sort_record(rows)
+        symbols = record['Symbol'].array
+        dates = record['Date'].to_numpy()
+        positions = []
+        for symbol, date in zip(rows['Symbol'], rows['Date'].to_numpy()):
+            lo = bisect_left(symbols, symbol)
+            hi = bisect_right(symbols, symbol, lo)
+            positions.append(lo + int(np.searchsorted(dates[lo:hi], date, side='right')))
+        if len(positions) <= 16:
+            pieces, start = [], 0
+            for i, position in enumerate(positions):
+                pieces += [record.iloc[start:position], rows.iloc[i:i + 1]]
+                start = position
+            pieces.append(record.iloc[start:])
+            return pd.concat([p for p in pieces if len(p)], ignore_index=True)
+        combined = pd.concat([record, rows], ignore_index=True)
+        order = np.insert(np.arange(len(record)), positions,
+                          np.arange(len(record), len(combined)))
+        return combined.take(order).reset_index(drop=True)
+
+    @staticmethod
+    def _sort_record(record):
+        """Sort by Symbol and Date, trades at the same time keep their order."""
+        if not pd.api.types.is_datetime64_any_dtype(record['Date']):
+            record = record.assign(Date=_parse_dates(record['Date']))
+        order = np.lexsort((record['Date'].to_numpy(),
+                            record['Symbol'].astype(str).to_numpy()))
+        return record.iloc[order].reset_index(drop=True)
+
+    def _update_holdings(self, rows):
+        """Add the trades of rows to the holdings of summary, in one pass."""
+        grouped = rows.assign(Delta=rows['Buy'] - rows['Sell']).groupby('Symbol', sort=False)
+        changes = grouped.agg(Delta=('Delta', 'sum'), Price=('Price', 'last'),
+                              Date=('Date', 'last'))
+        known = changes.index.intersection(self._holdings.index)
+        if len(known):
+            changes_known = changes.loc[known]
+            self._holdings.loc[known, 'Holdings'] = \
+                self._holdings.loc[known, 'Holdings'] + changes_known['Delta']
+            self._holdings.loc[known, 'Price at Registration'] = changes_known['Price']
+            self._holdings.loc[known, 'Date'] = changes_known['Date']
+        for symbol in changes.index.difference(self._holdings.index):
+            _LOGGER.warning("Symbol %s not in the summary, use add() to register it.", symbol)
+
+    @contextmanager
+    def batch(self):
+        """Buffer the trades of a with block and register them with one
+        trade_many call at its end. If the block raises, none of its trades
+        are registered.
+
+        Examples
+        --------
+        ::
+
+            with p.batch():
+                for fill in fills:
+                    p.trade('buy', fill.symbol, fill.amount, price=fill.price)
+        """
+        if self._pending is not None:  # Nested, the outer block registers.
+            yield self
+            return
+        self._pending = []
+        try:
+            yield self
+            pending, self._pending = self._pending, None
+        finally:
+            self._pending = None
+        for update in (True, False):
+            trades = [t for t, u in pending if u is update]
+            if trades:
+                self.trade_many(pd.DataFrame(trades), update_summary=update)
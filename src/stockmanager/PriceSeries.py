@@ -0,0 +1,155 @@
+""" Compact price series class.
+
+Copyright 2020- Jiajun Yang
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class PriceSeries(object):
+    """OHLCV bars stored as contiguous NumPy arrays.
+
+    A lighter alternative to the DataFrame of Ticker.get_price, use
+    get_price(format='series') to get one. Columns are returned without
+    copying and slices are views of the same arrays.
+
+    Examples
+    --------
+    ::
+
+        from stockmanager import Ticker
+
+        bars = Ticker('MSFT').get_price(period='1y', format='series')
+        bars.close                            # numpy array, no copy
+        bars['Adj Close']                     # same as bars.adjclose
+        bars[-20:]                            # last 20 bars, a view
+        bars['2020-03-01':'2020-04-01']       # slice by time
+        df = bars.to_dataframe()
+
+    Parameters
+    ----------
+    timestamps : array_like
+        Epoch seconds of each bar, in increasing order.
+    open, high, low, close, adjclose, volume : array_like
+        Columns of the same length as timestamps. adjclose defaults to close.
+    timezone : None or str
+        Timezone of the index, same as the timezone of get_price.
+    """
+    __slots__ = ('timestamps', 'open', 'high', 'low', 'close',
+                 'adjclose', 'volume', 'timezone')
+
+    columns = ('Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume')
+    _attrs = {'Open': 'open', 'High': 'high', 'Low': 'low', 'Close': 'close',
+              'Adj Close': 'adjclose', 'Volume': 'volume'}
+
+    def __init__(self, timestamps, open, high, low, close, adjclose=None,
+                 volume=None, timezone=None):
+        self.timestamps = np.asarray(timestamps, dtype=np.int64)
+        self.open = np.asarray(open)
+        self.high = np.asarray(high)
+        self.low = np.asarray(low)
+        self.close = np.asarray(close)
+        self.adjclose = self.close if adjclose is None else np.asarray(adjclose)
+        if volume is None:
+            volume = np.zeros(len(self.timestamps), dtype=np.int64)
+        self.volume = np.asarray(volume)
+        self.timezone = timezone
+        n = len(self.timestamps)
+        for name in self.columns:
+            if len(self[name]) != n:
+                raise ValueError("%s has %d values but there are %d timestamps."
+                                 % (name, len(self[name]), n))
+
+    @classmethod
+    def from_dataframe(cls, df):
+        """Create from a DataFrame with a DatetimeIndex and OHLCV columns."""
+        index = df.index
+        timezone = None
+        if getattr(index, 'tz', None) is not None:
+            timezone = str(index.tz)
+            index = index.tz_localize(None)
+        timestamps = (index - pd.Timestamp(0)) // pd.Timedelta(seconds=1)
+        adjclose = df['Adj Close'].to_numpy() if 'Adj Close' in df.columns else None
+        volume = df['Volume'].to_numpy() if 'Volume' in df.columns else None
+        return cls(np.asarray(timestamps, dtype=np.int64),
+                   df['Open'].to_numpy(), df['High'].to_numpy(),
+                   df['Low'].to_numpy(), df['Close'].to_numpy(),
+                   adjclose, volume, timezone)
+
+    @property
+    def index(self):
+        """pandas.DatetimeIndex of the bars."""
+        index = pd.to_datetime(self.timestamps, unit='s')
+        if self.timezone is not None:
+            index = index.tz_localize(self.timezone)
+        return index
+
+    @property
+    def nbytes(self):
+        """Memory of all arrays in bytes."""
+        return sum(getattr(self, a).nbytes for a in ('timestamps',) + tuple(self._attrs.values()))
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def __repr__(self):
+        if not len(self):
+            return "PriceSeries(empty)"
+        return "PriceSeries(%d bars, %s - %s)" % (len(self), self.index[0], self.index[-1])
+
+    def __getitem__(self, key):
+        """Column by name, bars by position slice or by time slice."""
+        if isinstance(key, str):
+            try:
+                return getattr(self, self._attrs[key])
+            except KeyError:
+                raise KeyError("column %s not in %s" % (key, self.columns))
+        if isinstance(key, slice):
+            if not (_is_position(key.start) and _is_position(key.stop)):
+                key = self._time_slice(key)
+            return self._take(key)
+        raise TypeError("PriceSeries can be indexed by column name or slice.")
+
+    def _time_slice(self, key):
+        start = stop = None
+        if key.start is not None:
+            start = np.searchsorted(self.timestamps, _to_epoch(key.start), side='left')
+        if key.stop is not None:
+            # The stop time is included, same as DataFrame.loc
+            stop = np.searchsorted(self.timestamps, _to_epoch(key.stop), side='right')
+        return slice(start, stop)
+
+    def _take(self, key):
+        return PriceSeries(self.timestamps[key], self.open[key], self.high[key],
+                           self.low[key], self.close[key], self.adjclose[key],
+                           self.volume[key], self.timezone)
+
+    def to_dataframe(self):
+        """Return the same DataFrame as get_price(format='df')."""
+        data = {name: self[name] for name in self.columns}
+        return pd.DataFrame(data, index=self.index, copy=False)
+
+
+def _is_position(value):
+    return value is None or isinstance(value, (int, np.integer))
+
+
+def _to_epoch(value):
+    ts = pd.Timestamp(value)
+    if ts.tz is not None:
+        # Same convention as the index, see get_price timezone.
+        ts = ts.tz_localize(None)
+    return (ts - pd.Timestamp(0)) // pd.Timedelta(seconds=1)
@@ -22,14 +22,170 @@ import pandas as pd
 import time
 import datetime
 import json
-import requests
+from io import StringIO
+from concurrent.futures import ThreadPoolExecutor
 from . import helpers
+from . import network
+from . import metrics
+from .cache import PriceCache, params_to_range, quote_cache
+from . import resample
+from .PriceSeries import PriceSeries
 from warnings import warn
+import logging
+_LOGGER = logging.getLogger(__name__)
+_LOGGER.addHandler(logging.NullHandler())
 
 VALID_PERIOD = ['1d', '5d', '1mo', '3mo', '6mo',
                 '1y', '2y', '5y', '10y', 'ytd', 'max']
 VALID_INTERVAL = ['1m', '2m', '5m', '15m', '30m', '60m',
                   '90m', '1h', '1d', '5d', '1wk', '1mo', '3mo']
+_DAY = 24 * 3600
+# Longest range of one chart request, and how far back the data reaches,
+# for the intraday intervals, in seconds.
+MAX_REQUEST_SPAN = {'1m': 7 * _DAY, '2m': 60 * _DAY, '5m': 60 * _DAY,
+                    '15m': 60 * _DAY, '30m': 60 * _DAY, '90m': 60 * _DAY,
+                    '60m': 730 * _DAY, '1h': 730 * _DAY}
+MAX_LOOKBACK = {'1m': 30 * _DAY, '2m': 60 * _DAY, '5m': 60 * _DAY,
+                '15m': 60 * _DAY, '30m': 60 * _DAY, '90m': 60 * _DAY,
+                '60m': 730 * _DAY, '1h': 730 * _DAY}
+MAX_CHUNK_WORKERS = 4
+# Patched in tests of the quote streams.
+_clock = time.monotonic
+_sleep = time.sleep
+
+
+def chunk_range(start, end, interval, now=None):
+    """Split [start, end] into windows a single chart request accepts.
+
+    For intraday intervals the start is also moved forward to the oldest
+    time Yahoo still has data for, with a warning, so fewer bars than
+    requested are returned.
+
+    Parameters
+    ----------
+    start, end : int
+        Epoch seconds
+    interval : str
+        One of VALID_INTERVAL
+    now : int, optional
+        Epoch seconds of now, default is time.time().
+
+    Returns
+    -------
+    list of tuple
+        (period1, period2) of each window, in order.
+    """
+    if interval not in MAX_REQUEST_SPAN:
+        return [(start, end)]
+    now = int(time.time()) if now is None else int(now)
+    # Stay a minute inside the limit, the server checks against its own clock.
+    oldest = now - MAX_LOOKBACK[interval] + 60
+    if start < oldest:
+        _LOGGER.warning("%s bars only reach back %d days, start moved from %s to %s.",
+                        interval, MAX_LOOKBACK[interval] // _DAY,
+                        pd.Timestamp(start, unit='s'), pd.Timestamp(oldest, unit='s'))
+        start = oldest
+    if start >= end:
+        return [(start, end)]
+    span = MAX_REQUEST_SPAN[interval]
+    return [(s, min(s + span, end)) for s in range(start, end, span)]
+
+
+def price_params(period="1mo", interval="1d", start=None, end=None):
+    """Validate period/interval or start/end and return the query parameters
+    of the chart request.
+
+    See Ticker.get_price for the parameters.
+
+    Returns
+    -------
+    dict
+        Either {'range', 'interval'} or {'period1', 'period2', 'interval'}
+        with period1/period2 as epoch seconds.
+    """
+    # First get the time period right
+    if start or period is None or period.lower() == "max":
+        if start is None:
+            start = -2208988800
+        elif isinstance(start, str):
+            start = np.datetime64(start)
+            start = pd.to_datetime(start)
+            start = int(start.timestamp())
+        elif isinstance(start, datetime.datetime):
+            start = int(time.mktime(start.timetuple()))
+        else:
+            raise TypeError("start must be None, str, or datetime.dateime")
+
+        if end is None:
+            end = int(time.time())
+        elif isinstance(end, str):
+            end = np.datetime64(end)
+            end = pd.to_datetime(end) + datetime.timedelta(days=1)  # This is to include end date
+            end = int(end.timestamp())
+        elif isinstance(end, datetime.datetime):
+            end = int(time.mktime(end.timetuple()))
+        else:
+            raise TypeError("end must be None, str, or datetime.dateime")
+
+        params = {"period1": start, "period2": end}
+    else:
+        period = period.lower()
+        if period not in VALID_PERIOD:
+            raise AttributeError("valid period: 1d, 5d, 1mo, 3mo, 6mo, 1y, 2y, 5y, 10y, ytd, max. ")
+        params = {"range": period}
+
+    if interval not in VALID_INTERVAL:
+        raise AttributeError("valid interval: 1m, 2m, 5m, 15m, 30m, 60m, 90m, 1h, 1d, 5d, 1wk, 1mo, 3mo")
+    params["interval"] = interval.lower()
+    return params
+
+
+def next_poll(scheduled, every, now):
+    """Time of the next poll of a stream polling every `every` seconds.
+
+    Polls are kept on the grid scheduled + k * every, so the schedule does
+    not drift with the request time. Slots that already passed, e.g. after
+    a slow request, are skipped instead of polled in a burst.
+    """
+    scheduled += every
+    if scheduled <= now:
+        scheduled += every * (int((now - scheduled) // every) + 1)
+    return scheduled
+
+
+class PollSchedule(object):
+    """Fixed poll schedule of the quote streams, see next_poll.
+
+    Examples
+    --------
+    ::
+
+        schedule = PollSchedule(every=5)
+        while True:
+            poll()
+            schedule.wait()
+    """
+
+    def __init__(self, every):
+        if every <= 0:
+            raise ValueError("every needs to be positive.")
+        self.every = every
+        self.scheduled = _clock()
+
+    def delay(self):
+        """Move to the next poll and return the seconds until then."""
+        now = _clock()
+        self.scheduled = next_poll(self.scheduled, self.every, now)
+        return max(self.scheduled - now, 0.)
+
+    def wait(self):
+        """Sleep until the next poll."""
+        _sleep(self.delay())
+
+
+def quote_key(quote):
+    """What makes a quote a new tick: price, volume and time."""
+    return quote['price'], quote['volume'], quote['time']
 
 
 class Ticker():
@@ -46,10 +202,14 @@ class Ticker():
         https://query1.finance.yahoo.com
     _scrape_url : str
         https://finance.yahoo.com/quote
-    _price_request_content : dict
-        Raw content of the web request.
+    meta : dict
+        Meta data of the last get_price() response, e.g. currency,
+        exchangeTimezoneName, regularMarketPrice.
     _fundamentals : bool
         Flag to check if get_fundamentals() is already successfully called.
+    _loaded : set
+        Fundamental sections ('summary', 'holders', 'financials') already
+        loaded. Each section is loaded on the first use of its accessors.
     major_holders : pandas.DataFrame
         Major holders
     institutional_holders : pandas.DataFrame
@@ -59,16 +219,24 @@ class Ticker():
     company_information : dict
         General information of the company, 
         e.g. sector, fullTimeEmployees, website, etc.
+    session : requests.Session or None
+        Session used for all requests of this ticker. If None, the shared
+        session of stockmanager.network is used.
+    cache : PriceCache, str or None
+        Default price cache of get_price(). A str is used as the
+        directory of a PriceCache.
     """
 
     # TODO add proxy
-    # TODO dont run summary to save time. 
-    def __init__(self, symbol, proxy=None):
+    def __init__(self, symbol, proxy=None, session=None, cache=None):
         """ticker is a string name of the stock"""
         self._ticker_symbol = symbol.upper()
+        self.session = session
+        self.cache = PriceCache(cache) if isinstance(cache, str) else cache
         self._base_url = 'https://query1.finance.yahoo.com'
         self._scrape_url = 'https://finance.yahoo.com/quote'
         self._fundamentals = False  
+        self._loaded = set()  # Fundamental sections already loaded
         self._recommendations = None  # TODO to be decided whether this necessary
         self._institutional_holders = None
         self._major_holders = None
@@ -94,9 +262,7 @@ class Ticker():
         self._cashflow = {
             "yearly": helpers.empty_df(),
             "quarterly": helpers.empty_df()}
-        self.meta = []
-        self.timestamp = []
-        self.indicators = []
+        self.meta = {}
 
     @property
     def symbol(self):
@@ -106,36 +272,65 @@ class Ticker():
     @symbol.setter
     def symbol(self, symbol):
         self._ticker_symbol = symbol
+        self._loaded = set()
+        self._fundamentals = False
 
     @property
     def institutional_holders(self):
+        self._lazy('holders')
         return self._institutional_holders
 
     @property
     def major_holders(self):
+        self._lazy('holders')
         return self._major_holders
 
     @property
     def mutual_fund_holders(self):
+        self._lazy('holders')
         return self._mutual_fund_holders
 
     @property
     def sustainability(self):
+        self._lazy('summary')
         return self._sustainability
 
+    @property
+    def recommendations(self):
+        self._lazy('summary')
+        return self._recommendations
+
     @property
     def company_information(self):
+        self._lazy('summary')
         return self._info
 
     @property
     def name(self):
+        self._lazy('summary')
         return self._name
 
+    def _quote_page(self, proxy=None):
+        """Parsed quote page, shared through cache.quote_cache."""
+        url = '%s/%s' % (self._scrape_url, self._ticker_symbol)
+        proxy = self._proxy if proxy is None else proxy
+        return quote_cache.get(
+            self._ticker_symbol,
+            lambda: self._get_json(url, proxy, 'quote'))
+
+    def _get_json(self, url, proxy, kind):
+        """helpers.get_json, measured as a request of the given kind."""
+        with metrics.measure(self._ticker_symbol, kind, url) as m:
+            response = network.fetch(url, proxy=proxy, session=self.session)
+            m.received(response)
+            with m.parse():
+                return helpers.parse_quote_summary(response.text)
+
     @property
     def current_price(self):
+        """Regular market price, reused for cache.quote_cache.ttl seconds."""
         try:
-            url = '%s/%s' % (self._scrape_url, self._ticker_symbol)
-            data = helpers.get_json(url, self._proxy)
+            data = self._quote_page()
             self._current_price = data['price']['regularMarketPrice']
             return self._current_price
         except:
@@ -143,10 +338,141 @@ class Ticker():
 
     @property
     def currency(self):
+        self._lazy('summary')
         return self._currency
 
+    def get_quote(self):
+        """Latest quote from the chart endpoint.
+
+        A single daily bar is requested, far less data than the quote page
+        current_price scrapes.
+
+        Returns
+        -------
+        dict
+            symbol, price, volume (of the day), time (epoch seconds of the
+            last trade) and currency.
+        """
+        with metrics.measure(self._ticker_symbol, 'quote', self._chart_url) as m:
+            content = self._request_chart({"range": "1d", "interval": "1d"}, m)
+        meta = content['meta']
+        volume = meta.get('regularMarketVolume')
+        if volume is None:
+            volumes = content.get('indicators', {}).get('quote', [{}])[0].get('volume')
+            volume = volumes[-1] if volumes else None
+        self._current_price = meta.get('regularMarketPrice')
+        return {'symbol': self._ticker_symbol,
+                'price': self._current_price,
+                'volume': volume,
+                'time': meta.get('regularMarketTime'),
+                'currency': meta.get('currency')}
+
+    def stream_quotes(self, every=5.):
+        """Generator of the quotes of this ticker as they change.
+
+        The chart endpoint is polled every `every` seconds on a fixed
+        schedule, see next_poll, and a quote is only yielded if its price,
+        volume or time changed. A failed poll is logged and skipped. Stop
+        the stream by breaking out of the loop.
+
+        Examples
+        --------
+        ::
+
+            for quote in Ticker('MSFT').stream_quotes(every=2):
+                print(quote['time'], quote['price'])
+
+        Parameters
+        ----------
+        every : float, optional
+            Seconds between two polls. Default is 5.
+
+        Yields
+        ------
+        dict
+            Same as get_quote().
+        """
+        schedule = PollSchedule(every)
+        last = None
+        while True:
+            try:
+                quote = self.get_quote()
+            except Exception as e:
+                _LOGGER.warning("Failed to poll the quote of %s: %r", self._ticker_symbol, e)
+            else:
+                if quote_key(quote) != last:
+                    last = quote_key(quote)
+                    yield quote
+            schedule.wait()
+
+    @property
+    def _chart_url(self):
+        return "{}/v8/finance/chart/{}".format(self._base_url, self._ticker_symbol)
+
+    def _fetch_chart(self, params, m=metrics.NULL):
+        """Request the chart endpoint and return its first result.
+
+        A start/end range longer than one request allows, see
+        MAX_REQUEST_SPAN, is requested in concurrent windows and stitched
+        together. The requests are added to the metrics.Measurement m.
+        """
+        if "period1" not in params:
+            return self._request_chart(params, m)
+        windows = chunk_range(params["period1"], params["period2"],
+                              params["interval"])
+        if len(windows) == 1:
+            return self._request_chart(dict(params, period1=windows[0][0],
+                                            period2=windows[0][1]), m)
+        chunks = [dict(params, period1=s, period2=e) for s, e in windows]
+        with ThreadPoolExecutor(max_workers=min(len(chunks), MAX_CHUNK_WORKERS)) as executor:
+            results = list(executor.map(lambda p: self._request_chart(p, m), chunks))
+        with m.parse():
+            return helpers.merge_chart_results(results)
+
+    def _request_chart(self, params, m=metrics.NULL):
+        response = network.fetch(self._chart_url, params=params, session=self.session)
+        m.received(response)
+        with m.parse():
+            return response.json()["chart"]["result"][0]
+
+    def _fetch_bars(self, start, end, interval):
+        """Download the bars in [start, end] as a DataFrame, used by the cache.
+        The exchange timezone is in attrs['timezone'] of the bars."""
+        with metrics.measure(self._ticker_symbol, 'chart', self._chart_url) as m:
+            content = self._fetch_chart({"period1": start, "period2": end,
+                                         "interval": interval}, m)
+            if 'meta' in content:
+                self.meta = content['meta']
+            if "timestamp" not in content:
+                # No trading in the range.
+                df = helpers.empty_df(pd.DatetimeIndex([]))
+            else:
+                with m.build():
+                    df = helpers.create_df(content, dropna=True)
+        df.attrs['timezone'] = self.meta.get('exchangeTimezoneName')
+        return df
+
+    def _cached_bars(self, cache, interval, start, end):
+        """Bars of [start, end) from the cache, resampled from a finer
+        cached interval if there is one."""
+        tz = self.meta.get('exchangeTimezoneName') or cache.timezone(self._ticker_symbol)
+        floor = resample.floor_time(start, interval, tz)
+        source = cache.finer_source(self._ticker_symbol, interval, start, floor)
+        if source is None:
+            return cache.get_price(self._ticker_symbol, interval, start, end,
+                                   lambda s, e: self._fetch_bars(s, e, interval))
+        # From the start of the first bucket, so that it is complete.
+        fine = cache.get_price(self._ticker_symbol, source, floor, end,
+                               lambda s, e: self._fetch_bars(s, e, source))
+        df = resample.resample(fine, interval, tz)
+        if interval in resample.INTRADAY_SECONDS:
+            width = pd.Timedelta(seconds=resample.INTRADAY_SECONDS[interval])
+            df = df[df.index + width > pd.Timestamp(start, unit='s')]
+        return df
+
     def get_price(self, period="1mo", interval="1d",
-                  start=None, end=None, timezone=None, format='df'):
+                  start=None, end=None, timezone=None, format='df',
+                  cache=None, dtype=np.float64):
         """Return a DataFrame of the ticker based on certain period and interval
 
         Examples
@@ -179,63 +505,55 @@ class Ticker():
         format : str
             Indicate the return variable type. By default it is a pandas DataFrame.
             Other options are dict (returns the raw dictionary file). Or json
-            (returns in json format)
+            (returns in json format). Or series (returns a PriceSeries, a
+            compact array based alternative to the DataFrame)
+        cache : PriceCache, str or None
+            Price cache, by default the cache given to Ticker(). Only used
+            with format='df' or 'series'. Only the bars missing in the cache are
+            downloaded. A period is converted to the range from now - period
+            until now. If the cache holds finer bars of the range, they are
+            resampled to the interval instead, see stockmanager.resample.
+        dtype : numpy dtype, optional
+            dtype of the price columns with format='df' or 'series', np.float64 by
+            default. np.float32 halves the memory of large intraday frames.
         """
-        # First get the time period right
-        if start or period is None or period.lower() == "max":
-            if start is None:
-                start = -2208988800
-            elif isinstance(start, str):
-                start = np.datetime64(start)
-                start = pd.to_datetime(start)
-                start = int(start.timestamp())
-            elif isinstance(start, datetime.datetime):
-                start = int(time.mktime(start.timetuple()))
-            else:
-                raise(TypeError("start must be None, str, or datetime.dateime"))
-
-            if end is None:
-                end = int(time.time())
-            elif isinstance(end, str):
-                end = np.datetime64(end)
-                end = pd.to_datetime(end) + datetime.timedelta(days=1)  # This is to include end date
-                end = int(end.timestamp())
-            elif isinstance(end, datetime.datetime):
-                end = int(time.mktime(end.timetuple()))
-            else:
-                raise(TypeError("end must be None, str, or datetime.dateime"))
-
-            params = {"period1": start, "period2": end}
-        else:
-            period = period.lower()
-            if period not in VALID_PERIOD:
-                raise(AttributeError("valid period: 1d, 5d, 1mo, 3mo, 6mo, 1y, 2y, 5y, 10y, ytd, max. "))
-            params = {"range": period}
-
-        if interval not in VALID_INTERVAL:
-            raise(AttributeError("valid interval: 1m, 2m, 5m, 15m, 30m, 60m, 90m, 1h, 1d, 5d, 1wk, 1mo, 3mo"))
-        params["interval"] = interval.lower()
-        url = "{}/v8/finance/chart/{}".format(self._base_url, self._ticker_symbol)
-        self._price_request_content = requests.get(url=url, params=params)
-
-        # What if other language? Question, how to test it. 
-        if "Will be right back" in self._price_request_content.text:
-            raise RuntimeError("*** YAHOO! FINANCE IS CURRENTLY DOWN! ***\n")
-        self._price_request_content = self._price_request_content.json()
-        self._price_request_content = self._price_request_content["chart"]["result"][0]
-        # Raw information from the request response. 
-        self.meta = self._price_request_content['meta']
-        self.timestamp = self._price_request_content['timestamp']
-        self.indicators = self._price_request_content['indicators']
-        self.prices = self.indicators["quote"][0]
-        if format.lower() == "df":
-            try:
-                df = helpers.create_df(self._price_request_content, timezone)
-                df.dropna(inplace=True)
-            except Exception:
-                raise RuntimeError("Error parsing content.")
-            self.prices = df.copy()
-        elif format.lower() == "json":
+        params = price_params(period, interval, start, end)
+        cache = self.cache if cache is None else cache
+        if cache is not None and format.lower() in ("df", "series"):
+            if isinstance(cache, str):
+                cache = PriceCache(cache)
+            start, end = params_to_range(params)
+            df = self._cached_bars(cache, params["interval"], start, end)
+            if timezone is not None:
+                df = df.tz_localize(timezone)
+            if format.lower() == "series":
+                df = PriceSeries.from_dataframe(df)
+            self.prices = df
+            return self.prices
+
+        with metrics.measure(self._ticker_symbol, 'chart', self._chart_url) as m:
+            content = self._fetch_chart(params, m)
+            # Only the meta data is kept, the raw lists are released after parsing.
+            self.meta = content['meta']
+            if format.lower() == "df":
+                try:
+                    with m.build():
+                        self.prices = helpers.create_df(content, timezone, dtype=dtype,
+                                                        dropna=True)
+                except Exception:
+                    raise RuntimeError("Error parsing content.")
+                return self.prices
+            elif format.lower() == "series":
+                try:
+                    with m.build():
+                        self.prices = helpers.create_series(content, timezone, dtype=dtype,
+                                                            dropna=True)
+                except Exception:
+                    raise RuntimeError("Error parsing content.")
+                return self.prices
+
+        self.prices = content['indicators']["quote"][0]
+        if format.lower() == "json":
             # Dumping into a JSon formatted string. 
             self.prices = json.dumps(self.prices, sort_keys=True)
             # self.prices = json.loads(s)
@@ -250,6 +568,8 @@ class Ticker():
         https://finance.yahoo.com/quote/YOUR_TICKER 
 
         It will try to get all fundamental information for more info than just prices.
+        Each section is also loaded on its own the first time one of its
+        accessors is used, calling this is only needed to load everything at once.
 
         Attributes
         ----------
@@ -259,24 +579,6 @@ class Ticker():
         * info
         * recommendations
         """
-        def cleanup(data):
-            df = pd.DataFrame(data).drop(columns=['maxAge'])
-            for col in df.columns:
-                df[col] = np.where(
-                    df[col].astype(str) == '-', np.nan, df[col])
-
-            df.set_index('endDate', inplace=True)
-            try:
-                df.index = pd.to_datetime(df.index, unit='s')
-            except ValueError:
-                df.index = pd.to_datetime(df.index)
-            df = df.T
-            df.columns.name = ''
-            df.index.name = 'Breakdown'
-
-            df.index = helpers.camel2title(df.index)
-            return df
-
         # setup proxy in requests format
         if proxy is not None:
             if isinstance(proxy, dict) and "https" in proxy:
@@ -287,32 +589,25 @@ class Ticker():
             # If already exist 
             return
 
-        # get info and sustainability
-        url = '%s/%s' % (self._scrape_url, self._ticker_symbol)
-        data = helpers.get_json(url, proxy)
-
-        # holders
-        url_holders = "{}/{}/holders".format(self._scrape_url, self._ticker_symbol)
+        self._load_summary(proxy)
+        self._load_holders(proxy)
+        self._load_financials(proxy)
+        self._fundamentals = True
 
-        holders = pd.read_html(url_holders)
+    def _lazy(self, section):
+        """Load a section for an accessor, a failure is warned and retried next time."""
+        if section in self._loaded:
+            return
         try:
-            if len(holders) == 3:
-                self._major_holders = holders[0]
-                self._institutional_holders = holders[1]
-                self._mutual_fund_holders = holders[2]
-                if 'Date Reported' in self._institutional_holders:
-                    self._institutional_holders['Date Reported'] = pd.to_datetime(
-                        self._institutional_holders['Date Reported'])
-            elif len(holders) == 2:
-                self.self._major_holders = holders[0]
-                self._institutional_holders = None
-                self._mutual_fund_holders = holders[1]
-        except:
-            self._major_holders = None
-            self._institutional_holders = None
-            self._mutual_fund_holders = None
+            getattr(self, '_load_' + section)()
+        except Exception as e:
+            warn("Failed to load %s of %s: %r" % (section, self._ticker_symbol, e))
 
-        self._all_holders = holders
+    def _load_summary(self, proxy=None):
+        """Info, sustainability and recommendations from the quote page."""
+        if 'summary' in self._loaded:
+            return
+        data = self._quote_page(proxy)
 
         # sustainability
         d = {}
@@ -331,23 +626,24 @@ class Ticker():
                 ['maxAge', 'ratingYear', 'ratingMonth'])]
         #
         # #  company info (be nice to python 2)
-        self._info = {}
+        info = {}
         items = ['summaryProfile', 'summaryDetail', 'quoteType',
                  'defaultKeyStatistics', 'assetProfile', 'summaryDetail']
         for item in items:
             if isinstance(data.get(item), dict):
-                self._info.update(data[item])
+                info.update(data[item])
 
-        self._info['regularMarketPrice'] = self._info['regularMarketOpen']
-        self._info['logo_url'] = ""
-        self._name = self._info['shortName']  # Company Name
-        self._currency = self._info['currency']
+        info['regularMarketPrice'] = info['regularMarketOpen']
+        info['logo_url'] = ""
+        self._name = info['shortName']  # Company Name
+        self._currency = info['currency']
         try:
-            domain = self._info['website'].split(
+            domain = info['website'].split(
                 '://')[1].split('/')[0].replace('www.', '')
-            self._info['logo_url'] = 'https://logo.clearbit.com/%s' % domain
+            info['logo_url'] = 'https://logo.clearbit.com/%s' % domain
         except Exception:
             pass
+        self._info = info
 
         # analyst recommendations
         try:
@@ -362,9 +658,55 @@ class Ticker():
                 'Firm', 'To Grade', 'From Grade', 'Action']].sort_index()
         except Exception:
             pass
+        self._loaded.add('summary')
 
-        # get fundamentals
-        financials = helpers.get_json(url + '/financials', proxy)
+    def _load_holders(self, proxy=None):
+        """Major, institutional and mutual fund holders from the holders page."""
+        if 'holders' in self._loaded:
+            return
+        proxy = self._proxy if proxy is None else proxy
+        url_holders = "{}/{}/holders".format(self._scrape_url, self._ticker_symbol)
+        with metrics.measure(self._ticker_symbol, 'holders', url_holders) as m:
+            response = network.fetch(url_holders, proxy=proxy, session=self.session)
+            m.received(response)
+            with m.parse():
+                holders = pd.read_html(StringIO(response.text))
+        try:
+            if len(holders) == 3:
+                self._major_holders = holders[0]
+                self._institutional_holders = holders[1]
+                self._mutual_fund_holders = holders[2]
+                if 'Date Reported' in self._institutional_holders:
+                    self._institutional_holders['Date Reported'] = pd.to_datetime(
+                        self._institutional_holders['Date Reported'])
+            elif len(holders) == 2:
+                self._major_holders = holders[0]
+                self._institutional_holders = None
+                self._mutual_fund_holders = holders[1]
+        except:
+            self._major_holders = None
+            self._institutional_holders = None
+            self._mutual_fund_holders = None
+
+        self._all_holders = holders
+        self._loaded.add('holders')
+
+    def _load_financials(self, proxy=None):
+        """Cash flow, balance sheet, income statement and earnings."""
+        if 'financials' in self._loaded:
+            return
+        proxy = self._proxy if proxy is None else proxy
+        url = '%s/%s' % (self._scrape_url, self._ticker_symbol)
+        with metrics.measure(self._ticker_symbol, 'financials', url + '/financials') as m:
+            response = network.fetch(url + '/financials', proxy=proxy, session=self.session)
+            m.received(response)
+            with m.parse():
+                financials = helpers.parse_quote_summary(response.text)
+            with m.build():
+                self._build_financials(financials)
+        self._loaded.add('financials')
+
+    def _build_financials(self, financials):
         # generic patterns
         for key in (
             (self._cashflow, 'cashflowStatement', 'cashflowStatements'),
@@ -374,11 +716,11 @@ class Ticker():
 
             item = key[1] + 'History'
             if isinstance(financials.get(item), dict):
-                key[0]['yearly'] = cleanup(financials[item][key[2]])
+                key[0]['yearly'] = helpers.cleanup_statement(financials[item][key[2]])
 
             item = key[1] + 'HistoryQuarterly'
             if isinstance(financials.get(item), dict):
-                key[0]['quarterly'] = cleanup(financials[item][key[2]])
+                key[0]['quarterly'] = helpers.cleanup_statement(financials[item][key[2]])
 
         # earnings
         if isinstance(financials.get('earnings'), dict):
@@ -393,8 +735,6 @@ class Ticker():
             df.index.name = 'Quarter'
             self._earnings['quarterly'] = df
 
-        self._fundamentals = True
-
     def get_cashflow(self, as_dict=False, freq='yearly'):
         """Get the cash flow yearly or quarterly
 
@@ -413,6 +753,7 @@ class Ticker():
         freq = freq.lower()
         if freq != 'yearly' and freq != 'quarterly':
             raise AttributeError("freq can only be 'yearly' or 'quarterly'.")
+        self._lazy('financials')
 
         if as_dict:
             return self._cashflow[freq].to_dict()
@@ -436,6 +777,7 @@ class Ticker():
         freq = freq.lower()
         if freq != 'yearly' and freq != 'quarterly':
             raise AttributeError("freq can only be 'yearly' or 'quarterly'.")
+        self._lazy('financials')
         if as_dict:
             return self._earnings[freq].to_dict()
         return self._earnings[freq]
@@ -458,6 +800,7 @@ class Ticker():
         freq = freq.lower()
         if freq != 'yearly' and freq != 'quarterly':
             raise AttributeError("freq can only be 'yearly' or 'quarterly'.")
+        self._lazy('financials')
         if as_dict:
             return self._balancesheet[freq].to_dict()
         return self._balancesheet[freq]
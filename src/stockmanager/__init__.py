@@ -11,7 +11,15 @@ finally:
     del get_distribution, DistributionNotFound
 
 from .Ticker import Ticker
-from .Ticker import VALID_INTERVAL, VALID_PERIOD
+from .Ticker import VALID_INTERVAL, VALID_PERIOD, price_params, chunk_range
 from .Portfolio import Portfolio
+from .PriceSeries import PriceSeries
+from . import network
+from . import metrics
+from .cache import PriceCache
+from .journal import TradeJournal
+from .storage import save_prices, load_prices
+from .batch import (fetch_prices, fetch_panel, price_panel, load_fundamentals,
+                    stream_quotes, astream_quotes, quote_profiles)
 from .helpers import *
 from .visualization import *
\ No newline at end of file
@@ -0,0 +1,384 @@
+""" Batch helpers to request many tickers at once.
+
+Examples
+--------
+Download daily prices of many symbols concurrently::
+
+    import asyncio
+    from stockmanager import fetch_prices
+
+    prices, errors = asyncio.run(fetch_prices(['MSFT', 'AAPL', 'ZM'], period='1y'))
+    prices['MSFT']  # pandas.DataFrame, same as Ticker('MSFT').get_price(period='1y')
+    errors          # symbol -> Exception of the symbols that failed
+
+Align them in one DataFrame, columns (symbol, field)::
+
+    from stockmanager import price_panel
+
+    panel = price_panel(prices, join='inner')
+    panel.xs('Close', axis=1, level='Field')  # one close column per symbol
+
+Fill the fundamentals of many tickers with a thread pool::
+
+    from stockmanager import load_fundamentals
+
+    tickers, errors = load_fundamentals(['MSFT', 'AAPL', 'NOSUCHSYMBOL'])
+    tickers['MSFT'].get_cashflow()
+    errors  # {'NOSUCHSYMBOL': KeyError(...)}
+
+Name, exchange, currency and price of many symbols, a few requests in all::
+
+    from stockmanager import quote_profiles
+
+    profiles = quote_profiles(['MSFT', 'AAPL', 'ZM'])
+    profiles['MSFT']['price']
+
+Follow the quotes of many symbols, only changes are yielded::
+
+    from stockmanager import stream_quotes, astream_quotes
+
+    for quote in stream_quotes(['MSFT', 'AAPL'], every=5):
+        print(quote['symbol'], quote['price'])
+
+    async for quote in astream_quotes(['MSFT', 'AAPL'], every=5):
+        ...
+"""
+
+import asyncio
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from .Ticker import Ticker, price_params, PollSchedule, quote_key
+from .PriceSeries import PriceSeries
+from . import network
+from . import metrics
+from .cache import profile_cache
+import logging
+_LOGGER = logging.getLogger(__name__)
+_LOGGER.addHandler(logging.NullHandler())
+
+
+async def fetch_prices(symbols, period="1mo", interval="1d", start=None,
+                       end=None, timezone=None, max_concurrency=10,
+                       session=None):
+    """Coroutine to download the price of many symbols concurrently.
+
+    A failing symbol does not abort the batch, its exception is reported
+    in the returned errors instead.
+
+    Parameters
+    ----------
+    symbols : list of str
+        Ticker symbols
+    period, interval, start, end, timezone
+        Same as Ticker.get_price, they are validated once for all symbols.
+    max_concurrency : int, optional
+        Maximum number of requests in flight at the same time.
+    session : requests.Session, optional
+        By default a session with a pool of max_concurrency connections
+        is created for the batch.
+
+    Returns
+    -------
+    prices : dict
+        symbol -> pandas.DataFrame as returned by Ticker.get_price, in the
+        order of symbols.
+    errors : dict
+        symbol -> Exception raised while downloading that symbol.
+    """
+    if isinstance(symbols, str):
+        symbols = [symbols]
+    if not isinstance(max_concurrency, int) or max_concurrency < 1:
+        raise ValueError("max_concurrency needs to be a positive int.")
+    # Fail early, before any request is sent.
+    price_params(period, interval, start, end)
+    if session is None:
+        session = network.create_session(pool_size=max_concurrency)
+
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    def _get(symbol):
+        return Ticker(symbol, session=session).get_price(
+            period=period, interval=interval, start=start, end=end,
+            timezone=timezone)
+
+    async def _fetch(symbol):
+        async with semaphore:
+            return await loop.run_in_executor(executor, _get, symbol)
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        results = await asyncio.gather(*[_fetch(s) for s in symbols],
+                                       return_exceptions=True)
+    prices, errors = {}, {}
+    for symbol, result in zip(symbols, results):
+        if not isinstance(result, BaseException):
+            prices[symbol] = result
+        elif isinstance(result, Exception):
+            _LOGGER.warning("Failed to fetch the price of %s: %r", symbol, result)
+            errors[symbol] = result
+        else:  # Cancelled or interrupted, not a failure of the symbol.
+            raise result
+    return prices, errors
+
+
+def price_panel(prices, join="outer", ffill=False, layout="wide", fields=None):
+    """Align the prices of many symbols in one DataFrame.
+
+    All symbols are aligned in a single concat, instead of joining the
+    frames one by one.
+
+    Parameters
+    ----------
+    prices : dict
+        symbol -> pandas.DataFrame or PriceSeries, e.g. the prices of
+        fetch_prices.
+    join : str, optional
+        'outer' keeps the union of the timestamps, 'inner' only the
+        timestamps all symbols have. Default is 'outer'.
+    ffill : bool, optional
+        Carry the last price forward over the timestamps a symbol has no
+        bar for. The Volume of those bars is 0.
+    layout : str, optional
+        'wide' gives columns (Symbol, Field). 'long' gives rows
+        (Datetime, Symbol) and one column per field, rows of symbols
+        without a bar at that time are dropped.
+    fields : list of str, optional
+        Columns to keep, e.g. ['Close', 'Volume']. Default is all.
+
+    Returns
+    -------
+    pandas.DataFrame
+    """
+    if join not in ("outer", "inner"):
+        raise AttributeError("join can only be 'outer' or 'inner'.")
+    if layout not in ("wide", "long"):
+        raise AttributeError("layout can only be 'wide' or 'long'.")
+    if not prices:
+        raise ValueError("prices is empty.")
+    frames = []
+    for df in prices.values():
+        if isinstance(df, PriceSeries):
+            df = df.to_dataframe()
+        frames.append(df if fields is None else df[list(fields)])
+    panel = pd.concat(frames, axis=1, keys=list(prices), names=["Symbol", "Field"],
+                      join=join)
+    panel.index.name = "Datetime"
+    if ffill:
+        volume = panel.columns.get_level_values("Field") == "Volume"
+        panel.loc[:, ~volume] = panel.loc[:, ~volume].ffill()
+        panel.loc[:, volume] = panel.loc[:, volume].fillna(0)
+    if layout == "long":
+        panel = panel.stack(level="Symbol").dropna(how="all")
+        panel.columns.name = None
+    return panel
+
+
+async def fetch_panel(symbols, period="1mo", interval="1d", start=None,
+                      end=None, timezone=None, join="outer", ffill=False,
+                      layout="wide", fields=None, max_concurrency=10, session=None):
+    """Coroutine of fetch_prices followed by price_panel, see there for the
+    parameters. Symbols that failed are logged and left out."""
+    prices, _ = await fetch_prices(symbols, period, interval, start, end, timezone,
+                                   max_concurrency, session)
+    return price_panel(prices, join, ffill, layout, fields)
+
+
+QUOTE_URL = 'https://query1.finance.yahoo.com/v7/finance/quote'
+QUOTE_CHUNK_SIZE = 50
+
+
+def _profile(result):
+    return {'symbol': result['symbol'],
+            'name': result.get('longName') or result.get('shortName'),
+            'exchange': result.get('exchange'),
+            'currency': result.get('currency'),
+            'price': result.get('regularMarketPrice'),
+            'time': result.get('regularMarketTime')}
+
+
+def _request_profiles(symbols, session):
+    params = {'symbols': ','.join(symbols)}
+    # One request of many symbols, it is not counted for any of them.
+    with metrics.measure(None, 'quote', QUOTE_URL) as m:
+        response = network.fetch(QUOTE_URL, params=params, session=session)
+        m.received(response)
+        with m.parse():
+            results = response.json()['quoteResponse']['result']
+    return [_profile(r) for r in results]
+
+
+def quote_profiles(symbols, max_age=None, max_workers=8, session=None):
+    """Name, exchange, currency and price of many symbols.
+
+    The light v7 quote endpoint answers up to QUOTE_CHUNK_SIZE symbols per
+    request, the requests run concurrently. Profiles are kept in
+    cache.profile_cache, fresh ones are not requested again.
+
+    Parameters
+    ----------
+    symbols : list of str
+        Ticker symbols
+    max_age : float, optional
+        Reuse cached profiles up to max_age seconds old, by default the
+        ttl of cache.profile_cache. 0 requests all symbols.
+    max_workers : int, optional
+        Number of concurrent requests.
+    session : requests.Session, optional
+        By default the shared session of stockmanager.network is used.
+
+    Returns
+    -------
+    dict
+        symbol -> dict with symbol, name, exchange, currency, price and
+        time (epoch seconds of the price). Unknown symbols are left out.
+    """
+    if isinstance(symbols, str):
+        symbols = [symbols]
+    symbols = list(dict.fromkeys(s.upper() for s in symbols))
+    profiles = {}
+    missing = []
+    for symbol in symbols:
+        profile = profile_cache.peek(symbol, max_age)
+        if profile is None:
+            missing.append(symbol)
+        else:
+            profiles[symbol] = profile
+    chunks = [missing[i:i + QUOTE_CHUNK_SIZE]
+              for i in range(0, len(missing), QUOTE_CHUNK_SIZE)]
+    if len(chunks) == 1:
+        results = [_request_profiles(chunks[0], session)]
+    elif chunks:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as executor:
+            results = list(executor.map(lambda c: _request_profiles(c, session), chunks))
+    else:
+        results = []
+    for profile in (p for r in results for p in r):
+        profile_cache.set(profile['symbol'], profile)
+        profiles[profile['symbol']] = profile
+    return {s: profiles[s] for s in symbols if s in profiles}
+
+
+def load_fundamentals(symbols, max_workers=8, max_per_host=4, session=None):
+    """Call get_fundamentals() of many tickers with a thread pool.
+
+    A failing symbol does not abort the batch, its exception is reported
+    in the returned errors instead.
+
+    Parameters
+    ----------
+    symbols : list of str
+        Ticker symbols
+    max_workers : int, optional
+        Number of threads.
+    max_per_host : int, optional
+        Maximum number of concurrent requests to the same host. Only used
+        if no session is given.
+    session : requests.Session, optional
+        By default a HostLimitedSession is created for the batch.
+
+    Returns
+    -------
+    tickers : dict
+        symbol -> Ticker with fundamentals loaded, in the order of symbols.
+    errors : dict
+        symbol -> Exception raised while loading that symbol.
+    """
+    if isinstance(symbols, str):
+        symbols = [symbols]
+    if not isinstance(max_workers, int) or max_workers < 1:
+        raise ValueError("max_workers needs to be a positive int.")
+    if session is None:
+        session = network.create_session(pool_size=max_workers,
+                                         max_per_host=max_per_host)
+
+    def _load(symbol):
+        ticker = Ticker(symbol, session=session)
+        ticker.get_fundamentals()
+        return ticker
+
+    loaded, errors = {}, {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(_load, s): s for s in symbols}
+        for future in as_completed(futures):
+            symbol = futures[future]
+            try:
+                loaded[symbol] = future.result()
+            except Exception as e:
+                _LOGGER.warning("Failed to load fundamentals of %s: %r",
+                                symbol, e)
+                errors[symbol] = e
+    tickers = {s: loaded[s] for s in symbols if s in loaded}
+    return tickers, errors
+
+
+def _get_quote(ticker):
+    """get_quote of a stream, failures are logged and give None."""
+    try:
+        return ticker.get_quote()
+    except Exception as e:
+        _LOGGER.warning("Failed to poll the quote of %s: %r", ticker.symbol, e)
+
+
+def _changed(quotes, last):
+    for quote in quotes:
+        if quote is not None and last.get(quote['symbol']) != quote_key(quote):
+            last[quote['symbol']] = quote_key(quote)
+            yield quote
+
+
+def stream_quotes(symbols, every=5., max_workers=8, session=None):
+    """Generator of the quotes of many symbols as they change.
+
+    All symbols are polled concurrently every `every` seconds, on a fixed
+    schedule. Same as Ticker.stream_quotes otherwise.
+
+    Parameters
+    ----------
+    symbols : list of str
+        Ticker symbols
+    every : float, optional
+        Seconds between two polls. Default is 5.
+    max_workers : int, optional
+        Number of threads polling at the same time.
+    session : requests.Session, optional
+        By default a session with a pool of max_workers connections is
+        created for the stream.
+
+    Yields
+    ------
+    dict
+        Same as Ticker.get_quote(), in the order of symbols within a poll.
+    """
+    if isinstance(symbols, str):
+        symbols = [symbols]
+    schedule = PollSchedule(every)
+    if session is None:
+        session = network.create_session(pool_size=max_workers)
+    tickers = [Ticker(s, session=session) for s in symbols]
+    last = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while True:
+            yield from _changed(executor.map(_get_quote, tickers), last)
+            schedule.wait()
+
+
+async def astream_quotes(symbols, every=5., max_workers=8, session=None):
+    """Async iterator version of stream_quotes, see there for the parameters.
+
+    The requests run in a thread pool, the event loop only waits.
+    """
+    if isinstance(symbols, str):
+        symbols = [symbols]
+    schedule = PollSchedule(every)
+    if session is None:
+        session = network.create_session(pool_size=max_workers)
+    tickers = [Ticker(s, session=session) for s in symbols]
+    last = {}
+    loop = asyncio.get_running_loop()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while True:
+            quotes = await asyncio.gather(
+                *[loop.run_in_executor(executor, _get_quote, t) for t in tickers])
+            for quote in _changed(quotes, last):
+                yield quote
+            await asyncio.sleep(schedule.delay())
@@ -0,0 +1,345 @@
+""" Caches to avoid downloading the same data again.
+
+PriceCache keeps the OHLCV bars of each (symbol, interval) on disk. A
+request only downloads the part of the range that is not stored yet.
+
+Examples
+--------
+::
+
+    from stockmanager import Ticker, PriceCache
+
+    cache = PriceCache('~/.stockmanager/prices')
+    msft = Ticker('MSFT', cache=cache)
+    df = msft.get_price(start='2015-01-01')  # full download
+    df = msft.get_price(start='2015-01-01')  # only the new bars are requested
+
+If the cache holds finer bars covering a request, e.g. 5m bars for a 1h
+request, they are resampled instead, see stockmanager.resample. The buckets
+follow the exchange timezone, fetch passes it as bars.attrs['timezone'] and
+it is stored with the bars.
+
+QuoteCache keeps the parsed quote page of each symbol in memory for a short
+time. All Ticker objects share the module-level quote_cache::
+
+    from stockmanager import cache
+
+    cache.set_quote_ttl(60)  # a quote is reused for up to a minute
+
+profile_cache keeps the quote profiles of batch.quote_profiles, the name,
+exchange, currency and price of a symbol from the light v7 quote endpoint.
+"""
+
+import os
+import pickle
+import threading
+import time
+from concurrent.futures import Future
+import pandas as pd
+from . import resample as _resample
+import logging
+_LOGGER = logging.getLogger(__name__)
+_LOGGER.addHandler(logging.NullHandler())
+
+DEFAULT_QUOTE_TTL = 15.
+DEFAULT_PROFILE_TTL = 60.
+
+_PERIOD_OFFSETS = {
+    '1d': pd.DateOffset(days=1), '5d': pd.DateOffset(days=5),
+    '1mo': pd.DateOffset(months=1), '3mo': pd.DateOffset(months=3),
+    '6mo': pd.DateOffset(months=6), '1y': pd.DateOffset(years=1),
+    '2y': pd.DateOffset(years=2), '5y': pd.DateOffset(years=5),
+    '10y': pd.DateOffset(years=10)}
+
+
+def params_to_range(params, now=None):
+    """Convert the chart query parameters to a (start, end) epoch range.
+
+    Parameters
+    ----------
+    params : dict
+        Output of stockmanager.price_params
+    now : int, optional
+        Epoch seconds used as the end of a period, default is time.time().
+
+    Returns
+    -------
+    tuple
+        (start, end) in epoch seconds, end is never in the future.
+    """
+    now = int(time.time()) if now is None else int(now)
+    if 'range' not in params:
+        return int(params['period1']), min(int(params['period2']), now)
+    end = pd.Timestamp(now, unit='s')
+    if params['range'] == 'ytd':
+        start = pd.Timestamp(year=end.year, month=1, day=1)
+    else:
+        start = end - _PERIOD_OFFSETS[params['range']]
+    return int(start.timestamp()), now
+
+
+class PriceCache(object):
+    """On-disk cache of price bars, one file per (symbol, interval).
+
+    Each file stores the bars and the epoch range they cover, so a later
+    request only needs to download the missing head and/or tail. Requests
+    of the same (symbol, interval) wait for each other, others download
+    in parallel.
+
+    Parameters
+    ----------
+    directory : str
+        Directory of the cache files, it is created if it does not exist.
+    resample : bool, optional
+        Serve coarser intervals from finer cached bars. Default is True.
+    """
+
+    def __init__(self, directory, resample=True):
+        self.directory = os.path.expanduser(directory)
+        self.resample = resample
+        os.makedirs(self.directory, exist_ok=True)
+        self._lock = threading.Lock()  # Guards _locks only, never held during a download
+        self._locks = {}  # (symbol, interval) -> Lock
+        self._timezones = {}
+
+    def _key_lock(self, symbol, interval):
+        with self._lock:
+            return self._locks.setdefault((symbol.upper(), interval), threading.Lock())
+
+    def _path(self, symbol, interval):
+        return os.path.join(self.directory, '%s_%s.pkl' % (symbol.upper(), interval))
+
+    def load(self, symbol, interval):
+        """Return the stored entry {'start', 'end', 'bars'} or None.
+
+        Entries are replaced atomically by store, so it needs no lock.
+        """
+        path = self._path(symbol, interval)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+    def store(self, symbol, interval, entry):
+        """Write the entry atomically, so a crash never leaves half a file."""
+        if entry.get('timezone'):
+            self._timezones[symbol.upper()] = entry['timezone']
+        path = self._path(symbol, interval)
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    def clear(self, symbol=None, interval=None):
+        """Remove cache files, optionally only of a symbol and/or interval."""
+        for fname in os.listdir(self.directory):
+            if not fname.endswith('.pkl'):
+                continue
+            s, i = fname[:-4].rsplit('_', 1)
+            if (symbol is None or s == symbol.upper()) and \
+                    (interval is None or i == interval):
+                os.remove(os.path.join(self.directory, fname))
+
+    def timezone(self, symbol):
+        """Exchange timezone stored with the bars of symbol, or None."""
+        symbol = symbol.upper()
+        if symbol not in self._timezones:
+            for fname in os.listdir(self.directory):
+                if fname.endswith('.pkl') and fname[:-4].rsplit('_', 1)[0] == symbol:
+                    entry = self.load(symbol, fname[:-4].rsplit('_', 1)[1])
+                    if entry is not None and entry.get('timezone'):
+                        self._timezones[symbol] = entry['timezone']
+                        break
+        return self._timezones.get(symbol)
+
+    def finer_source(self, symbol, interval, start, floor=None):
+        """Cached interval the bars of interval can be resampled from.
+
+        Returns None if resampling is off, if interval itself is cached
+        from start on, or if no finer interval is. Otherwise the coarsest
+        finer interval cached from floor, the start of the first bucket,
+        on.
+        """
+        if not self.resample:
+            return None
+        for source in (interval,) + _resample.SOURCES:
+            if source != interval and not _resample.can_resample(source, interval):
+                continue
+            if not os.path.exists(self._path(symbol, source)):
+                continue
+            entry = self.load(symbol, source)
+            if entry is None:
+                continue
+            if source == interval and entry['start'] <= start:
+                return None
+            if source != interval and entry['start'] <= (start if floor is None else floor):
+                return source
+        return None
+
+    def get_price(self, symbol, interval, start, end, fetch):
+        """Return the bars in [start, end), download what is missing.
+
+        Parameters
+        ----------
+        symbol : str
+            Ticker symbol
+        interval : str
+            Bar interval, e.g. '1d'
+        start, end : int
+            Epoch seconds of the requested range.
+        fetch : callable
+            fetch(start, end) downloads the bars in [start, end] as a
+            DataFrame with a UTC DatetimeIndex, and the exchange timezone
+            in its attrs['timezone'] if it is known.
+
+        Returns
+        -------
+        pandas.DataFrame
+        """
+        with self._key_lock(symbol, interval):
+            entry = self.load(symbol, interval)
+            if entry is None:
+                entry = {'start': start, 'end': end, 'bars': fetch(start, end)}
+                _keep_timezone(entry, entry['bars'])
+                changed = True
+            else:
+                entry, changed = self._extend(entry, start, end, fetch)
+            if changed:
+                self.store(symbol, interval, entry)
+        bars = entry['bars']
+        idx = bars.index
+        mask = (idx >= pd.Timestamp(start, unit='s')) & (idx < pd.Timestamp(end, unit='s'))
+        return bars[mask]
+
+    @staticmethod
+    def _extend(entry, start, end, fetch):
+        pieces = [entry['bars']]
+        changed = False
+        if start < entry['start']:
+            pieces.insert(0, _keep_timezone(entry, fetch(start, entry['start'])))
+            entry['start'] = start
+            changed = True
+        if end > entry['end']:
+            # The last stored bar may still have been forming, fetch it again.
+            tail_start = entry['end']
+            if len(entry['bars']):
+                tail_start = min(tail_start, int(entry['bars'].index[-1].timestamp()))
+            pieces.append(_keep_timezone(entry, fetch(tail_start, end)))
+            entry['end'] = end
+            changed = True
+        if changed:
+            bars = pd.concat([p for p in pieces if len(p)] or pieces[:1])
+            bars = bars[~bars.index.duplicated(keep='last')]
+            if not bars.index.is_monotonic_increasing:
+                bars = bars.sort_index()
+            entry['bars'] = bars
+        return entry, changed
+
+
+def _keep_timezone(entry, bars):
+    """Store the exchange timezone of fetched bars in the entry."""
+    timezone = bars.attrs.get('timezone')
+    if timezone:
+        entry['timezone'] = timezone
+    return bars
+
+
+def _is_empty(value):
+    return value is None or (isinstance(value, dict) and not value)
+
+
+class QuoteCache(object):
+    """Thread-safe in-memory cache with a time to live.
+
+    Concurrent get() calls for the same key that is not cached share one
+    call of the loader (single-flight), the other callers wait for it.
+
+    Parameters
+    ----------
+    ttl : float
+        Time to live of an entry in seconds.
+    """
+
+    def __init__(self, ttl=DEFAULT_QUOTE_TTL):
+        self.ttl = ttl
+        self._data = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, loader, max_age=None):
+        """Return the cached value of key if it is fresh, else call loader().
+
+        Parameters
+        ----------
+        key : hashable
+            Cache key, e.g. the ticker symbol.
+        loader : callable
+            Called without arguments to get a new value. None or an empty
+            dict is returned but not cached.
+        max_age : float, optional
+            Accept cached values up to max_age seconds, default is self.ttl.
+
+        Returns
+        -------
+        object
+            The value returned by loader.
+        """
+        max_age = self.ttl if max_age is None else max_age
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and time.monotonic() - entry[0] <= max_age:
+                return entry[1]
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+        if not leader:
+            return future.result()
+
+        try:
+            value = loader()
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            if not _is_empty(value):
+                self._data[key] = (time.monotonic(), value)
+            del self._inflight[key]
+        future.set_result(value)
+        return value
+
+    def peek(self, key, max_age=None):
+        """Return the cached value of key if it is fresh, else None."""
+        max_age = self.ttl if max_age is None else max_age
+        with self._lock:
+            entry = self._data.get(key)
+        if entry is not None and time.monotonic() - entry[0] <= max_age:
+            return entry[1]
+        return None
+
+    def set(self, key, value):
+        """Store a value, e.g. from a batch request."""
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+
+    def invalidate(self, key=None):
+        """Drop key, or everything if key is None."""
+        with self._lock:
+            if key is None:
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
+
+
+quote_cache = QuoteCache()
+profile_cache = QuoteCache(ttl=DEFAULT_PROFILE_TTL)
+
+
+def set_quote_ttl(ttl):
+    """Set the time to live in seconds of the shared quote cache."""
+    if ttl < 0:
+        raise ValueError("ttl can not be negative.")
+    quote_cache.ttl = ttl
@@ -0,0 +1,268 @@
+""" Cost basis and realized P&L of a trade record.
+
+Lots are matched per symbol with one of three methods:
+
+fifo
+    Sells consume the oldest lots first. Solved for all trades at once:
+    the cost of the first q units bought is a piecewise linear function of
+    q, so the cost of a sell is two np.interp lookups on it.
+average
+    Sells take units at the average cost of the position. The cost of the
+    position follows the recurrence P[k] = a[k] * P[k-1] + d[k], which is
+    solved with a vectorized prefix scan.
+lifo
+    Sells consume the newest lots first, with a stack of lots per symbol.
+
+Fees of buys are part of the cost of their lot, fees of sells reduce the
+proceeds.
+
+Examples
+--------
+::
+
+    from stockmanager.costbasis import CostBasis
+
+    engine = CostBasis('fifo')
+    engine.update(p.record)          # Symbol, Buy, Sell, Price and Fee columns
+    engine.positions(prices={'MSFT': 185.})
+    engine.update(new_trades)        # only the new trades are processed
+"""
+
+import numpy as np
+import pandas as pd
+
+METHODS = ('fifo', 'lifo', 'average')
+
+
+def _affine_scan(a, d):
+    """x[k] = a[k] * x[k-1] + d[k] with x[-1] = 0, for all k at once.
+
+    Hillis-Steele scan of the composition of the affine maps, log2(n)
+    vectorized steps. Factors of old history that underflow to 0 have no
+    influence anyway, so no rescaling is needed.
+    """
+    a = np.array(a, dtype=float)
+    d = np.array(d, dtype=float)
+    shift = 1
+    while shift < len(a):
+        d[shift:] = a[shift:] * d[:-shift] + d[shift:]
+        a[shift:] = a[shift:] * a[:-shift]
+        shift *= 2
+    return d
+
+
+def _group_cumsum(values, starts):
+    """Cumulative sum restarting at each group start."""
+    total = np.cumsum(values)
+    offset = np.repeat(total[starts] - values[starts], np.diff(np.r_[starts, len(values)]))
+    return total - offset
+
+
+class CostBasis(object):
+    """Incremental lot matching engine.
+
+    Parameters
+    ----------
+    method : str
+        'fifo', 'lifo' or 'average'.
+
+    Attributes
+    ----------
+    n_trades : int
+        Number of trades processed.
+    """
+
+    def __init__(self, method='fifo'):
+        method = method.lower()
+        if method not in METHODS:
+            raise AttributeError("method can only be one of %s" % ', '.join(METHODS))
+        self.method = method
+        self.n_trades = 0
+        self._lots = {}  # symbol -> (quantities, unit costs) of the open lots
+        self._realized = {}
+        self._fees = {}
+
+    def update(self, trades):
+        """Process new trades, in time order within each symbol.
+
+        Parameters
+        ----------
+        trades : pandas.DataFrame
+            Columns Symbol, Buy, Sell and Price, optionally Fee, e.g.
+            Portfolio.record. A row can either buy or sell.
+
+        Returns
+        -------
+        pandas.DataFrame
+            Cost (of the sold units) and Realized P&L of each trade, with
+            the index of trades. Both are 0 for buys.
+
+        Raises
+        ------
+        ValueError
+            If a sell exceeds the position. Nothing is changed then.
+        """
+        if not len(trades):
+            return pd.DataFrame(columns=['Cost', 'Realized P&L'], index=trades.index, dtype=float)
+        symbols = trades['Symbol'].astype(str).to_numpy()
+        buy = trades['Buy'].to_numpy(dtype=float)
+        sell = trades['Sell'].to_numpy(dtype=float)
+        price = trades['Price'].to_numpy(dtype=float)
+        fee = trades['Fee'].fillna(0.).to_numpy(dtype=float) if 'Fee' in trades else np.zeros(len(trades))
+        if ((buy > 0) & (sell > 0)).any():
+            raise ValueError("a trade can either buy or sell.")
+
+        # The open lots of each symbol come first, as buys without fee.
+        codes, names = pd.factorize(symbols)
+        lot_codes, lot_qty, lot_cost = [], [], []
+        for code, name in enumerate(names):
+            if name in self._lots:
+                qty, cost = self._lots[name]
+                lot_codes.append(np.full(len(qty), code))
+                lot_qty.append(qty)
+                lot_cost.append(cost)
+        n_lots = sum(len(q) for q in lot_qty)
+        g = np.concatenate(lot_codes + [codes]) if n_lots else codes
+        b = np.concatenate(lot_qty + [buy]) if n_lots else buy
+        s = np.r_[np.zeros(n_lots), sell]
+        unit = price + np.divide(fee, buy, out=np.zeros_like(fee), where=buy > 0)
+        unit = np.concatenate(lot_cost + [unit]) if n_lots else unit
+        proceeds = np.r_[np.zeros(n_lots), sell * price - np.where(sell > 0, fee, 0.)]
+        is_trade = np.r_[np.zeros(n_lots, dtype=bool), np.ones(len(trades), dtype=bool)]
+        trade_pos = np.r_[np.full(n_lots, -1), np.arange(len(trades))]
+
+        order = np.argsort(g, kind='stable')
+        g, b, s, unit, proceeds, is_trade, trade_pos = (
+            x[order] for x in (g, b, s, unit, proceeds, is_trade, trade_pos))
+        starts = np.flatnonzero(np.r_[True, g[1:] != g[:-1]])
+        position = _group_cumsum(b - s, starts)
+        if (position < -1e-9).any():
+            bad = names[g[np.argmax(position < -1e-9)]]
+            raise ValueError("sells of %s exceed its position." % bad)
+
+        if self.method == 'fifo':
+            cost, lots = self._fifo(g, b, s, unit, starts)
+        elif self.method == 'average':
+            cost, lots = self._average(g, b, s, unit, starts, position)
+        else:
+            cost, lots = self._lifo(g, b, s, unit, starts)
+
+        realized = np.where(s > 0, proceeds - cost, 0.)
+        result = np.zeros((len(trades), 2))
+        result[trade_pos[is_trade], 0] = cost[is_trade]
+        result[trade_pos[is_trade], 1] = realized[is_trade]
+
+        realized_sum = np.bincount(g, weights=realized, minlength=len(names))
+        fee_sum = np.bincount(codes, weights=fee, minlength=len(names))
+        for code, name in enumerate(names):
+            self._lots[name] = lots[code]
+            self._realized[name] = self._realized.get(name, 0.) + realized_sum[code]
+            self._fees[name] = self._fees.get(name, 0.) + fee_sum[code]
+        self.n_trades += len(trades)
+        return pd.DataFrame(result, index=trades.index, columns=['Cost', 'Realized P&L'])
+
+    @staticmethod
+    def _fifo(g, b, s, unit, starts):
+        bought = np.cumsum(b)  # global, the symbols follow each other
+        offset = np.repeat(bought[starts] - b[starts], np.diff(np.r_[starts, len(g)]))
+        sold = _group_cumsum(s, starts) + offset
+        is_buy = b > 0
+        xp = np.r_[0., bought[is_buy]]
+        fp = np.r_[0., np.cumsum(b * unit)[is_buy]]
+        cost = np.where(s > 0, np.interp(sold, xp, fp) - np.interp(sold - s, xp, fp), 0.)
+
+        # What is left of each buy after the sells of its symbol.
+        ends = np.r_[starts[1:], len(g)] - 1
+        sold_total = np.repeat(sold[ends], np.diff(np.r_[starts, len(g)]))
+        left = np.clip(bought - sold_total, 0., b)
+        return cost, _split_lots(g, starts, left, unit)
+
+    @staticmethod
+    def _average(g, b, s, unit, starts, position):
+        previous = np.r_[0., position[:-1]]
+        a = np.where(s > 0, np.divide(position, previous, out=np.zeros_like(position),
+                                      where=previous > 0), 1.)
+        a[starts] = 0.  # each symbol starts from an empty pool
+        pool = _affine_scan(a, b * unit)
+        pool_before = np.r_[0., pool[:-1]]
+        pool_before[starts] = 0.
+        cost = np.where(s > 0, pool_before - pool, 0.)
+
+        lots = {}
+        ends = np.r_[starts[1:], len(g)] - 1
+        for start, end in zip(starts, ends):
+            qty = position[end]
+            lots[g[start]] = (np.array([qty]), np.array([pool[end] / qty])) if qty > 0 \
+                else (np.zeros(0), np.zeros(0))
+        return cost, lots
+
+    @staticmethod
+    def _lifo(g, b, s, unit, starts):
+        cost = np.zeros(len(g))
+        lots = {}
+        ends = np.r_[starts[1:], len(g)]
+        for start, end in zip(starts, ends):
+            stack = []  # [quantity, unit cost], newest last
+            for k in range(start, end):
+                if b[k] > 0:
+                    stack.append([b[k], unit[k]])
+                    continue
+                need = s[k]
+                while need > 1e-12:
+                    take = min(need, stack[-1][0])
+                    cost[k] += take * stack[-1][1]
+                    stack[-1][0] -= take
+                    need -= take
+                    if stack[-1][0] <= 1e-12:
+                        stack.pop()
+            lots[g[start]] = (np.array([q for q, _ in stack]), np.array([c for _, c in stack]))
+        return cost, lots
+
+    @property
+    def lots(self):
+        """Open lots as a DataFrame with Symbol, Quantity and Unit Cost."""
+        frames = [pd.DataFrame({'Symbol': symbol, 'Quantity': qty, 'Unit Cost': cost})
+                  for symbol, (qty, cost) in self._lots.items() if len(qty)]
+        if not frames:
+            return pd.DataFrame(columns=['Symbol', 'Quantity', 'Unit Cost'])
+        return pd.concat(frames, ignore_index=True)
+
+    def positions(self, prices=None):
+        """Position, cost basis and P&L of each symbol.
+
+        Parameters
+        ----------
+        prices : dict or pandas.Series, optional
+            symbol -> current price, adds Price, Market Value and
+            Unrealized P&L.
+
+        Returns
+        -------
+        pandas.DataFrame
+            Indexed by Symbol, with Position, Cost Basis, Average Cost,
+            Realized P&L and Fees.
+        """
+        symbols = list(self._realized)
+        position = np.array([self._lots[s][0].sum() for s in symbols])
+        basis = np.array([(self._lots[s][0] * self._lots[s][1]).sum() for s in symbols])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            average = np.where(position > 0, basis / position, np.nan)
+        df = pd.DataFrame({'Position': position, 'Cost Basis': basis, 'Average Cost': average,
+                           'Realized P&L': [self._realized[s] for s in symbols],
+                           'Fees': [self._fees[s] for s in symbols]},
+                          index=pd.Index(symbols, name='Symbol'))
+        if prices is not None:
+            df['Price'] = pd.Series(prices, dtype=float).reindex(df.index).to_numpy()
+            df['Market Value'] = df['Position'] * df['Price']
+            df['Unrealized P&L'] = df['Market Value'] - df['Cost Basis']
+        return df
+
+
+def _split_lots(g, starts, qty, unit):
+    """{group: (quantities, unit costs)} of the lots with a quantity left."""
+    lots = {}
+    ends = np.r_[starts[1:], len(g)]
+    for start, end in zip(starts, ends):
+        keep = qty[start:end] > 0
+        lots[g[start]] = (qty[start:end][keep], unit[start:end][keep])
+    return lots
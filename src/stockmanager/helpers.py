@@ -1,13 +1,10 @@
 import pandas as pd 
 import numpy as np 
 import re
-import requests
+import json
 import logging
-
-try:
-    import ujson as _json
-except ImportError:
-    import json as _json
+from . import network
+from .PriceSeries import PriceSeries
 
 
 _LOGGER = logging.getLogger(__name__)
@@ -22,55 +19,185 @@ def empty_df(index=[]):
     return empty
 
 
-def create_df(data, timezone=None):
-    timestamps = data["timestamp"]
+def chart_arrays(data, dtype=np.float64, dropna=False):
+    """Typed NumPy arrays of a chart response.
+
+    Parameters
+    ----------
+    data : dict
+        One result of the chart endpoint, with timestamp and indicators.
+    dtype : numpy dtype, optional
+        dtype of the price columns, e.g. np.float32 to save memory.
+    dropna : bool, optional
+        Drop rows with missing values.
+
+    Returns
+    -------
+    timestamps : numpy.ndarray
+        int64 epoch seconds in increasing order.
+    columns : dict
+        Open, High, Low, Close, Adj Close and Volume arrays.
+    """
+    timestamps = np.asarray(data["timestamp"], dtype=np.int64)
     all_prices = data["indicators"]["quote"][0]
 
     adjclose = all_prices["close"]
     if "adjclose" in data["indicators"]:
         adjclose = data["indicators"]["adjclose"][0]["adjclose"]
-    # Create quotes dataframe based on all_price.s
-    quotes = pd.DataFrame({"Open": all_prices["open"],
-                           "High": all_prices["high"],
-                           "Low": all_prices["low"],
-                           "Close": all_prices["close"],
-                           "Adj Close": adjclose,
-                           "Volume": all_prices["volume"]})
-
-    quotes.index = pd.to_datetime(timestamps, unit="s")
-    quotes.sort_index(inplace=True)
+    # None becomes nan in float arrays.
+    columns = {"Open": np.asarray(all_prices["open"], dtype=dtype),
+               "High": np.asarray(all_prices["high"], dtype=dtype),
+               "Low": np.asarray(all_prices["low"], dtype=dtype),
+               "Close": np.asarray(all_prices["close"], dtype=dtype),
+               "Adj Close": np.asarray(adjclose, dtype=dtype)}
+    try:
+        columns["Volume"] = np.asarray(all_prices["volume"], dtype=np.int64)
+    except TypeError:  # Missing volume
+        columns["Volume"] = np.asarray(all_prices["volume"], dtype=np.float64)
+
+    selector = None
+    if dropna:
+        valid = np.ones(len(timestamps), dtype=bool)
+        for col in columns.values():
+            if col.dtype.kind == 'f':
+                valid &= ~np.isnan(col)
+        if not valid.all():
+            selector = valid
+    if not (timestamps[1:] >= timestamps[:-1]).all():
+        order = np.argsort(timestamps, kind='stable')
+        selector = order if selector is None else order[selector[order]]
+    if selector is not None:
+        timestamps = timestamps[selector]
+        columns = {k: v[selector] for k, v in columns.items()}
+    return timestamps, columns
+
+
+def merge_chart_results(results):
+    """Stitch chart results of consecutive windows into one result.
+
+    Bars are ordered by time and duplicated timestamps, e.g. at the window
+    edges, keep the bar of the later window. Windows without bars are
+    skipped. The meta of the last window is used.
+    """
+    results = list(results)
+    with_bars = [r for r in results if r.get("timestamp")]
+    if not with_bars:
+        return results[-1]
+    timestamps = np.concatenate([np.asarray(r["timestamp"], dtype=np.int64)
+                                 for r in with_bars])
+    # Index of the last occurrence of each timestamp, in time order.
+    _, first_reversed = np.unique(timestamps[::-1], return_index=True)
+    keep = len(timestamps) - 1 - first_reversed
+
+    def _stitch(lists):
+        values = np.empty(len(timestamps), dtype=object)
+        values[:] = [v for lst in lists for v in lst]
+        return values[keep].tolist()
+
+    quote = {key: _stitch([r["indicators"]["quote"][0][key] for r in with_bars])
+             for key in with_bars[0]["indicators"]["quote"][0]}
+    indicators = {"quote": [quote]}
+    if all("adjclose" in r["indicators"] for r in with_bars):
+        indicators["adjclose"] = [{"adjclose": _stitch(
+            [r["indicators"]["adjclose"][0]["adjclose"] for r in with_bars])}]
+    return {"meta": results[-1]["meta"],
+            "timestamp": timestamps[keep].tolist(),
+            "indicators": indicators}
+
+
+def create_df(data, timezone=None, dtype=np.float64, dropna=False):
+    """Create the OHLCV DataFrame from a chart response.
+
+    The columns are built as typed NumPy arrays straight from the payload,
+    the rows are only sorted if the timestamps are not in order already.
+    See chart_arrays for the parameters.
+
+    Returns
+    -------
+    pandas.DataFrame
+    """
+    timestamps, columns = chart_arrays(data, dtype, dropna)
+    quotes = pd.DataFrame(columns, index=pd.to_datetime(timestamps, unit="s"),
+                          copy=False)
     # Adjust timezone if given. 
     if timezone is not None:
         quotes.index = quotes.index.tz_localize(timezone)
     return quotes
 
 
+def create_series(data, timezone=None, dtype=np.float64, dropna=False):
+    """Same as create_df, but return a PriceSeries."""
+    timestamps, columns = chart_arrays(data, dtype, dropna)
+    return PriceSeries(timestamps, columns["Open"], columns["High"],
+                       columns["Low"], columns["Close"], columns["Adj Close"],
+                       columns["Volume"], timezone)
+
+
+def cleanup_statement(data):
+    """Turn a list of financial statements into a DataFrame, one column per endDate."""
+    df = pd.DataFrame(data).drop(columns=['maxAge'])
+    for col in df.columns:
+        df[col] = np.where(
+            df[col].astype(str) == '-', np.nan, df[col])
+
+    df.set_index('endDate', inplace=True)
+    try:
+        df.index = pd.to_datetime(df.index, unit='s')
+    except ValueError:
+        df.index = pd.to_datetime(df.index)
+    df = df.T
+    df.columns.name = ''
+    df.index.name = 'Breakdown'
+
+    df.index = camel2title(df.index)
+    return df
+
+
 def camel2title(o):
     return [re.sub("([a-z])([A-Z])", r"\g<1> \g<2>", i).title() for i in o]
 
 
-def get_json(url, proxy=None):
-    html = requests.get(url=url, proxies=proxy).text
-    if "QuoteSummaryStore" not in html:
-        html = requests.get(url=url, proxies=proxy).text
-        if "QuoteSummaryStore" not in html:
-            return {}
+def _flatten_value(pairs):
+    """object_pairs_hook: {} -> None and {'raw': x, 'fmt': ...} -> x."""
+    if not pairs:
+        return None
+    if pairs[0][0] == 'raw':
+        return pairs[0][1]
+    return dict(pairs)
+
+
+_STORE_DECODER = json.JSONDecoder(object_pairs_hook=_flatten_value)
+
+
+def parse_quote_summary(html):
+    """Return the QuoteSummaryStore of a Yahoo Finance page as a dict.
 
-    json_str = html.split('root.App.main =')[1].split('(this)')[0].split(';\n}')[0].strip()
-    data = _json.loads(json_str)['context']['dispatcher']['stores']['QuoteSummaryStore']
+    The store is decoded straight from the page in one pass. Empty objects
+    become None and {'raw': ..., 'fmt': ...} objects are replaced by the
+    raw value. Returns {} if the page has no QuoteSummaryStore.
+    """
+    start = html.find('root.App.main')
+    idx = html.find('"QuoteSummaryStore":', max(start, 0))
+    if start < 0 or idx < 0:
+        return {}
+    idx += len('"QuoteSummaryStore":')
+    while html[idx] in ' \t\n\r':
+        idx += 1
+    return _STORE_DECODER.raw_decode(html, idx)[0] or {}
 
-    # return data
-    new_data = _json.dumps(data).replace('{}', 'null')
-    new_data = re.sub(
-        r'\{[\'|\"]raw[\'|\"]:(.*?),(.*?)\}', r'\1', new_data)
 
-    return _json.loads(new_data)
+def get_json(url, proxy=None, session=None):
+    # Throttling and server errors are retried by network.fetch
+    html = network.fetch(url, proxy=proxy, session=session).text
+    return parse_quote_summary(html)
 
 
 def get_ohlc(df):
     """Check dataframe and return a flag of whether the dataframe has ohlc and a tuple or the available data."""
+    if isinstance(df, PriceSeries):
+        return True, (df.open, df.high, df.low, df.close, df.volume)
     if not isinstance(df, pd.core.frame.DataFrame):
-        raise TypeError('Arg needs to be a pd.DataFrame')
+        raise TypeError('Arg needs to be a pd.DataFrame or PriceSeries')
 
     ohlc_cols = {'open', 'high', 'low', 'close'}
     price_cols = {'price'}
@@ -0,0 +1,201 @@
+""" Append-only journal of a Portfolio in SQLite.
+
+Every change of a Portfolio opened with a journal is appended to it as it
+happens: trades, holdings registered with add() and removed symbols. Each
+append is one committed transaction in write-ahead log mode, so it costs
+the same however long the history is, and a crash loses nothing that was
+registered.
+
+A checkpoint stores the holdings, opening the journal loads the latest one
+and replays the events after it. Holdings are stored as JSON with their
+dtypes, and the record is read back from the trade events with one query.
+
+Examples
+--------
+::
+
+    from stockmanager import Portfolio
+
+    p = Portfolio(journal='~/.stockmanager/book.db')  # replays the journal
+    p.trade('buy', 'MSFT', 10, price=180.)             # one durable append
+    p.checkpoint()                                     # snapshot of the holdings
+"""
+
+import os
+import json
+import sqlite3
+import threading
+import time
+import pandas as pd
+import logging
+_LOGGER = logging.getLogger(__name__)
+_LOGGER.addHandler(logging.NullHandler())
+
+# Trade columns of the events table and the record column of each.
+TRADE_COLUMNS = {'symbol': 'Symbol', 'sell': 'Sell', 'buy': 'Buy', 'price': 'Price',
+                 'date': 'Date', 'total_sell': 'Total Sell', 'total_buy': 'Total Buy',
+                 'fee': 'Fee'}
+_DTYPES = {'price': float, 'total_sell': float, 'total_buy': float, 'fee': float}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,            -- 'trade', 'upsert' or 'remove'
+    symbol TEXT, sell INTEGER, buy INTEGER, price REAL,
+    date INTEGER,                  -- nanoseconds since the epoch
+    total_sell REAL, total_buy REAL, fee REAL,
+    update_summary INTEGER,        -- trade: 1 if it changed the holdings
+    data TEXT                      -- JSON, upsert: holdings rows, remove: symbols
+);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    upto INTEGER NOT NULL,         -- last event included
+    created REAL NOT NULL,
+    summary TEXT NOT NULL          -- JSON of the holdings
+);
+"""
+
+
+class TradeJournal(object):
+    """SQLite journal of the trades and holdings changes of a Portfolio.
+
+    Parameters
+    ----------
+    path : str
+        Database file, it is created if it does not exist.
+    synchronous : str, optional
+        SQLite synchronous setting. 'FULL' (default) syncs every append to
+        disk, 'NORMAL' is faster but can lose the last appends on a power
+        failure (not on a crash of the process).
+    """
+
+    def __init__(self, path, synchronous='FULL'):
+        self.path = os.path.expanduser(path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=%s" % synchronous)
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def append_trades(self, rows, update_summary=True):
+        """Append record rows, all in one transaction."""
+        columns = list(TRADE_COLUMNS)
+        values = rows[list(TRADE_COLUMNS.values())]
+        notna = values.notna()
+        values = values.assign(Date=values['Date'].to_numpy('datetime64[ns]').view('int64'))
+        values = values.astype(object).where(notna, None).assign(
+            update_summary=int(update_summary))
+        sql = "INSERT INTO events (kind, %s, update_summary) VALUES ('trade', %s, ?)" % (
+            ', '.join(columns), ', '.join('?' * len(columns)))
+        with self._lock, self._conn:
+            self._conn.executemany(sql, values.to_numpy().tolist())
+
+    def upsert(self, holdings):
+        """Append holdings rows (indexed by Symbol) that replace the stored ones."""
+        self._append_data('upsert', _frame_to_json(holdings))
+
+    def remove(self, symbols):
+        """Append the removal of symbols from the holdings."""
+        self._append_data('remove', json.dumps([str(s) for s in symbols]))
+
+    def _append_data(self, kind, data):
+        with self._lock, self._conn:
+            self._conn.execute("INSERT INTO events (kind, data) VALUES (?, ?)", (kind, data))
+
+    def checkpoint(self, holdings):
+        """Store the holdings (Portfolio.summary) as of the last event.
+
+        Holdings events before the checkpoint are not needed anymore and
+        are deleted with older checkpoints, trade events are kept since
+        they are the record.
+        """
+        data = _frame_to_json(holdings)
+        with self._lock, self._conn:
+            upto = self._conn.execute("SELECT COALESCE(MAX(seq), 0) FROM events").fetchone()[0]
+            self._conn.execute("INSERT INTO checkpoints (upto, created, summary) VALUES (?, ?, ?)",
+                               (upto, time.time(), data))
+            self._conn.execute("DELETE FROM checkpoints WHERE upto < ?", (upto,))
+            self._conn.execute("DELETE FROM events WHERE kind != 'trade' AND seq <= ?", (upto,))
+        return upto
+
+    def record(self):
+        """All trade events as a record DataFrame, in journal order."""
+        with self._lock:
+            df = pd.read_sql_query("SELECT %s FROM events WHERE kind = 'trade' ORDER BY seq"
+                                   % ', '.join(TRADE_COLUMNS), self._conn, dtype=_DTYPES)
+        return _to_record(df)
+
+    def replay(self):
+        """Latest checkpoint and the holdings events after it.
+
+        Returns
+        -------
+        holdings : pandas.DataFrame or None
+            Holdings of the latest checkpoint, None without checkpoint.
+        events : list
+            (kind, payload) in journal order. Consecutive trades that
+            changed the holdings are one ('trades', DataFrame) event, the
+            others are ('upsert', DataFrame) and ('remove', list).
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT upto, summary FROM checkpoints ORDER BY seq DESC LIMIT 1").fetchone()
+            upto, holdings = (0, None) if row is None else (row[0], _frame_from_json(row[1]))
+            df = pd.read_sql_query(
+                "SELECT seq, kind, %s, data FROM events WHERE seq > ? "
+                "AND (kind != 'trade' OR update_summary = 1) ORDER BY seq"
+                % ', '.join(TRADE_COLUMNS), self._conn, params=(upto,), dtype=_DTYPES)
+        events = []
+        run = (df['kind'] != df['kind'].shift()).cumsum()
+        for _, part in df.groupby(run, sort=False):
+            kind = part['kind'].iloc[0]
+            if kind == 'trade':
+                events.append(('trades', _to_record(part[list(TRADE_COLUMNS)])
+                               .reset_index(drop=True)))
+            else:
+                events.extend((kind, _frame_from_json(data) if kind == 'upsert' else json.loads(data))
+                              for data in part['data'])
+        return holdings, events
+
+
+def _to_record(df):
+    df = df.rename(columns=TRADE_COLUMNS)
+    df['Date'] = pd.to_datetime(df['Date'], unit='ns')
+    return df
+
+
+def _frame_to_json(df):
+    """JSON of a DataFrame with its dtypes and named index, dates as epoch
+    nanoseconds, so it reads back the same with any pandas version."""
+    index = df.index.name
+    if index is not None:
+        df = df.reset_index()
+    dtypes = {str(c): str(t) for c, t in df.dtypes.items()}
+    notna = df.notna()
+    for column in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[column]):
+            df = df.assign(**{column: df[column].to_numpy('datetime64[ns]').view('int64')})
+    rows = df.astype(object).where(notna, None).to_numpy().tolist()
+    return json.dumps({'index': index, 'dtypes': dtypes, 'rows': rows})
+
+
+def _frame_from_json(data):
+    data = json.loads(data)
+    df = pd.DataFrame(data['rows'], columns=list(data['dtypes']), dtype=object)
+    for column, dtype in data['dtypes'].items():
+        if dtype.startswith('datetime64'):
+            df[column] = pd.to_datetime(df[column], unit='ns')
+        elif dtype != 'object':
+            df[column] = df[column].astype(dtype)
+    return df.set_index(data['index']) if data['index'] is not None else df
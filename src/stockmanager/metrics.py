@@ -0,0 +1,235 @@
+""" Instrumentation of the requests issued by Ticker.
+
+Every chart, quote page, holders and financials request of a Ticker is
+measured and passed to the subscribed listeners as a Measurement: url,
+bytes received, HTTP latency, parse time and DataFrame build time. Cached
+quotes and bars issue no request and are not reported. Nothing is measured
+while no listener is subscribed.
+
+Examples
+--------
+::
+
+    from stockmanager import Ticker, metrics
+
+    def log(m):
+        print(m.symbol, m.kind, m.latency, m.parse_time, m.build_time)
+
+    metrics.subscribe(log)
+
+    # Per-symbol counters
+    totals = metrics.subscribe(metrics.Aggregator())
+    Ticker('MSFT').get_price(period='1y')
+    totals.summary()
+"""
+
+import time
+import threading
+import pandas as pd
+import logging
+_LOGGER = logging.getLogger(__name__)
+_LOGGER.addHandler(logging.NullHandler())
+
+KINDS = ('chart', 'quote', 'holders', 'financials')
+_listeners = ()
+_listeners_lock = threading.Lock()
+
+
+def subscribe(listener):
+    """Call listener(measurement) after each request, returns listener."""
+    global _listeners
+    if not callable(listener):
+        raise TypeError("listener needs to be callable.")
+    with _listeners_lock:
+        _listeners = _listeners + (listener,)
+    return listener
+
+
+def unsubscribe(listener):
+    """Remove a listener added with subscribe."""
+    global _listeners
+    with _listeners_lock:
+        _listeners = tuple(f for f in _listeners if f != listener)
+
+
+def enabled():
+    """True if at least one listener is subscribed."""
+    return bool(_listeners)
+
+
+class Measurement(object):
+    """Measurement of one request, or the windows of a stitched chart request.
+
+    Attributes
+    ----------
+    symbol : str or None
+        None for a request of many symbols, see batch.quote_profiles.
+    kind : str
+        One of KINDS.
+    url : str
+    requests : int
+        Number of HTTP requests, more than one for a chunked chart range.
+    status : int or None
+        HTTP status of the last response.
+    bytes : int
+        Bytes received.
+    latency : float
+        HTTP latency in seconds, summed over the requests.
+    parse_time : float
+        Seconds spent decoding the responses.
+    build_time : float
+        Seconds spent building DataFrames from the decoded data.
+    error : str or None
+        Exception type if the request or the parsing failed.
+    """
+    __slots__ = ('symbol', 'kind', 'url', 'requests', 'status', 'bytes',
+                 'latency', 'parse_time', 'build_time', 'error', '_lock')
+
+    def __init__(self, symbol, kind, url):
+        self.symbol = symbol
+        self.kind = kind
+        self.url = url
+        self.requests = 0
+        self.status = None
+        self.bytes = 0
+        self.latency = 0.
+        self.parse_time = 0.
+        self.build_time = 0.
+        self.error = None
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.error = exc_type.__name__
+        emit(self)
+        return False
+
+    def received(self, response):
+        """Add a response, can be called from several threads."""
+        latency = response.elapsed.total_seconds()
+        size = len(response.content)
+        with self._lock:
+            self.requests += 1
+            self.status = response.status_code
+            self.bytes += size
+            self.latency += latency
+
+    def parse(self):
+        """Context manager adding its duration to parse_time."""
+        return _Timer(self, 'parse_time')
+
+    def build(self):
+        """Context manager adding its duration to build_time."""
+        return _Timer(self, 'build_time')
+
+    def as_dict(self):
+        return {k: getattr(self, k) for k in self.__slots__ if k != '_lock'}
+
+    def __repr__(self):
+        return "Measurement(%s)" % ", ".join("%s=%r" % i for i in self.as_dict().items())
+
+
+class _Timer(object):
+    __slots__ = ('measurement', 'field', 'start')
+
+    def __init__(self, measurement, field):
+        self.measurement = measurement
+        self.field = field
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        m = self.measurement
+        with m._lock:
+            setattr(m, self.field, getattr(m, self.field) + elapsed)
+        return False
+
+
+class _NullMeasurement(object):
+    """Stands in for Measurement while no listener is subscribed."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def received(self, response):
+        pass
+
+    def parse(self):
+        return self
+
+    def build(self):
+        return self
+
+
+NULL = _NullMeasurement()
+
+
+def measure(symbol, kind, url):
+    """Start measuring a request, emitted when the with block ends.
+
+    Returns a no-op stand-in if no listener is subscribed.
+    """
+    if not _listeners:
+        return NULL
+    return Measurement(symbol, kind, url)
+
+
+def emit(measurement):
+    """Pass a measurement to all listeners. A failing listener is logged and
+    does not interrupt the request."""
+    for listener in _listeners:
+        try:
+            listener(measurement)
+        except Exception:
+            _LOGGER.exception("metrics listener %r failed", listener)
+
+
+class Aggregator(object):
+    """Listener keeping per-symbol and per-kind counters.
+
+    Examples
+    --------
+    ::
+
+        totals = metrics.subscribe(metrics.Aggregator())
+        ...
+        totals.summary()        # DataFrame indexed by symbol and kind
+    """
+    fields = ('requests', 'errors', 'bytes', 'latency', 'parse_time', 'build_time')
+
+    def __init__(self):
+        self._totals = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, m):
+        with self._lock:
+            totals = self._totals.setdefault((m.symbol, m.kind), [0, 0, 0, 0., 0., 0.])
+            totals[0] += m.requests
+            totals[1] += m.error is not None
+            totals[2] += m.bytes
+            totals[3] += m.latency
+            totals[4] += m.parse_time
+            totals[5] += m.build_time
+
+    def reset(self):
+        with self._lock:
+            self._totals.clear()
+
+    def summary(self):
+        """Counters as a DataFrame indexed by (Symbol, Kind). Requests of
+        many symbols have the Symbol None and come first."""
+        with self._lock:
+            items = sorted(self._totals.items(),
+                           key=lambda i: (i[0][0] is not None, i[0][0] or '', i[0][1]))
+        index = pd.MultiIndex.from_arrays([[k[0] for k, _ in items], [k[1] for k, _ in items]],
+                                          names=['Symbol', 'Kind'])
+        return pd.DataFrame([v for _, v in items], index=index, columns=list(self.fields))
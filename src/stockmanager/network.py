@@ -0,0 +1,450 @@
+""" Shared HTTP session for all Yahoo Finance requests.
+
+Opening a new connection for every request means a TCP and TLS handshake
+each time. All network calls in stockmanager go through a pooled
+requests.Session instead, so connections are kept alive and reused.
+
+Examples
+--------
+Use a bigger pool for bulk jobs::
+
+    from stockmanager import network, Ticker
+
+    network.set_session(network.create_session(pool_size=50))
+    msft = Ticker('MSFT')  # uses the shared session
+
+    # or give a ticker its own session
+    s = network.create_session(pool_size=4)
+    aapl = Ticker('AAPL', session=s)
+
+Every request also passes a per-host token bucket rate limiter and circuit
+breaker. Throttled (429) and server error (5xx) responses are retried with
+jittered exponential backoff::
+
+    network.configure(rate=5, burst=10, max_retries=4)
+    network.stats()  # counters and breaker state per host
+"""
+
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from .transport import Transport
+import logging
+_LOGGER = logging.getLogger(__name__)
+_LOGGER.addHandler(logging.NullHandler())
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) '
+                  'AppleWebKit/537.36 (KHTML, like Gecko) '
+                  'Chrome/80.0.3987.149 Safari/537.36',
+    'Accept-Encoding': 'gzip, deflate',
+    'Connection': 'keep-alive'}
+
+DEFAULT_RATE = 10.  # requests per second and host
+DEFAULT_BURST = 20
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF_BASE = 0.5  # seconds
+DEFAULT_BACKOFF_MAX = 30.
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_TIMEOUT = 30.
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+_session = None
+_session_lock = threading.Lock()
+_transport = Transport()
+_sleep = time.sleep
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised when a request is refused because the host's circuit is open."""
+
+
+class TokenBucket(object):
+    """Token bucket rate limiter, allows rate requests per second on
+    average and bursts of up to burst requests.
+
+    Parameters
+    ----------
+    rate : float
+        Tokens added per second.
+    burst : int
+        Maximum number of tokens.
+    """
+
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST):
+        if rate <= 0 or burst < 1:
+            raise ValueError("rate needs to be positive and burst at least 1.")
+        self.rate = float(rate)
+        self.burst = burst
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self):
+        """Take a token, return how long to wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.
+            return -self._tokens / self.rate
+
+    def acquire(self):
+        """Block until a token is available, return the time waited."""
+        wait = self._reserve()
+        if wait > 0:
+            _sleep(wait)
+        return wait
+
+
+class CircuitBreaker(object):
+    """Stop sending requests to a host after failure_threshold consecutive
+    failures. After reset_timeout seconds one trial request is let through
+    (half open), its success closes the circuit again.
+
+    Parameters
+    ----------
+    failure_threshold : int
+        Consecutive failures to open the circuit.
+    reset_timeout : float
+        Seconds until a trial request is allowed.
+    """
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, failure_threshold=DEFAULT_FAILURE_THRESHOLD,
+                 reset_timeout=DEFAULT_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == self.OPEN and \
+                    time.monotonic() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self):
+        """Return True if a request may be sent now."""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN and \
+                    time.monotonic() - self._opened_at >= self.reset_timeout:
+                # Let one trial request through.
+                self._state = self.HALF_OPEN
+                return True
+            return False
+
+    def release(self):
+        """Give back the trial of a half open circuit whose request ended
+        without telling if the host is healthy, the next request is the
+        trial then."""
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._state = self.OPEN
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    _LOGGER.warning("Too many failures, stop requests for %.0f s.",
+                                    self.reset_timeout)
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+class _Host(object):
+    """Rate limiter, circuit breaker and counters of one host."""
+
+    def __init__(self, config):
+        self.bucket = TokenBucket(config['rate'], config['burst'])
+        self.breaker = CircuitBreaker(config['failure_threshold'],
+                                      config['reset_timeout'])
+        self.counters = dict.fromkeys(
+            ('requests', 'retries', 'throttled', 'server_errors',
+             'connection_errors', 'rejected'), 0)
+        self.counters['wait_time'] = 0.
+        self.lock = threading.Lock()
+
+    def count(self, key, value=1):
+        with self.lock:
+            self.counters[key] += value
+
+
+_config = {'rate': DEFAULT_RATE, 'burst': DEFAULT_BURST,
+           'max_retries': DEFAULT_MAX_RETRIES,
+           'backoff_base': DEFAULT_BACKOFF_BASE,
+           'backoff_max': DEFAULT_BACKOFF_MAX,
+           'failure_threshold': DEFAULT_FAILURE_THRESHOLD,
+           'reset_timeout': DEFAULT_RESET_TIMEOUT}
+_hosts = {}
+_hosts_lock = threading.Lock()
+
+
+def _host(url):
+    name = urlsplit(url).netloc
+    with _hosts_lock:
+        if name not in _hosts:
+            _hosts[name] = _Host(_config)
+        return _hosts[name]
+
+
+def configure(**kwargs):
+    """Configure the rate limiter, retries and circuit breaker.
+
+    Counters and breaker states are reset.
+
+    Parameters
+    ----------
+    rate : float
+        Requests per second and host.
+    burst : int
+        Requests allowed at once before the rate applies.
+    max_retries : int
+        Retries of a throttled, failed or server error request.
+    backoff_base, backoff_max : float
+        The n-th retry waits a random time up to
+        min(backoff_max, backoff_base * 2 ** n) seconds.
+    failure_threshold : int
+        Consecutive failures that open the circuit of a host.
+    reset_timeout : float
+        Seconds an open circuit refuses requests.
+    """
+    unknown = set(kwargs) - set(_config)
+    if unknown:
+        raise KeyError("unknown settings: %s" % sorted(unknown))
+    with _hosts_lock:
+        _config.update(kwargs)
+        _hosts.clear()
+
+
+def stats():
+    """Counters and circuit breaker state of each host.
+
+    Returns
+    -------
+    dict
+        host -> dict with requests, retries, throttled, server_errors,
+        connection_errors, rejected, wait_time and state.
+    """
+    with _hosts_lock:
+        hosts = dict(_hosts)
+    result = {}
+    for name, host in hosts.items():
+        with host.lock:
+            result[name] = dict(host.counters)
+        result[name]['state'] = host.breaker.state
+    return result
+
+
+def _backoff(attempt, response=None):
+    retry_after = None if response is None else response.headers.get('Retry-After')
+    if retry_after is not None:
+        try:
+            return min(float(retry_after), _config['backoff_max'])
+        except ValueError:
+            pass
+    # Full jitter
+    return random.uniform(0, min(_config['backoff_max'],
+                                 _config['backoff_base'] * 2 ** attempt))
+
+
+class HostLimitedSession(requests.Session):
+    """requests.Session that allows at most max_per_host requests in flight
+    to the same host. Other hosts are not blocked.
+
+    Parameters
+    ----------
+    max_per_host : int
+        Maximum number of concurrent requests per host.
+    """
+
+    def __init__(self, max_per_host):
+        super().__init__()
+        if not isinstance(max_per_host, int) or max_per_host < 1:
+            raise ValueError("max_per_host needs to be a positive int.")
+        self.max_per_host = max_per_host
+        self._host_semaphores = {}
+        self._host_lock = threading.Lock()
+
+    def _semaphore(self, host):
+        with self._host_lock:
+            if host not in self._host_semaphores:
+                self._host_semaphores[host] = threading.BoundedSemaphore(
+                    self.max_per_host)
+            return self._host_semaphores[host]
+
+    def request(self, method, url, *args, **kwargs):
+        with self._semaphore(urlsplit(url).netloc):
+            return super().request(method, url, *args, **kwargs)
+
+
+def create_session(pool_size=DEFAULT_POOL_SIZE, headers=None,
+                   max_per_host=None):
+    """Create a requests.Session with a connection pool of pool_size.
+
+    Parameters
+    ----------
+    pool_size : int, optional
+        Maximum number of kept-alive connections per host.
+    headers : dict, optional
+        Extra headers, added on top of DEFAULT_HEADERS.
+    max_per_host : int, optional
+        If given, a HostLimitedSession is returned, which caps the number
+        of concurrent requests per host.
+
+    Returns
+    -------
+    requests.Session
+    """
+    if not isinstance(pool_size, int) or pool_size < 1:
+        raise ValueError("pool_size needs to be a positive int.")
+    if max_per_host is None:
+        session = requests.Session()
+    else:
+        session = HostLimitedSession(max_per_host)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update(DEFAULT_HEADERS)
+    if headers is not None:
+        session.headers.update(headers)
+    return session
+
+
+def get_session():
+    """Return the module-level session, create one if there is none."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = create_session()
+    return _session
+
+
+def set_session(session):
+    """Replace the module-level session, e.g. with a bigger pool.
+
+    Parameters
+    ----------
+    session : requests.Session or None
+        None will reset to a default session at the next request.
+    """
+    global _session
+    if session is not None and not isinstance(session, requests.Session):
+        raise TypeError("session needs to be a requests.Session or None.")
+    with _session_lock:
+        _session = session
+
+
+def set_transport(transport):
+    """Replace the transport that sends the requests, e.g. with a
+    transport.RecordTransport or transport.ReplayTransport.
+
+    Parameters
+    ----------
+    transport : transport.Transport or None
+        None restores the default transport.
+    """
+    global _transport
+    if transport is None:
+        transport = Transport()
+    if not isinstance(transport, Transport):
+        raise TypeError("transport needs to be a stockmanager.transport.Transport.")
+    _transport = transport
+
+
+def get_transport():
+    """Return the current transport."""
+    return _transport
+
+
+def _should_retry(response):
+    """Throttled, server errors and the maintenance page of Yahoo, which is
+    a 200 HTML page. Only bodies that are not JSON are decoded for it."""
+    if response.status_code in RETRY_STATUS:
+        return True
+    if response.status_code != 200 or 'json' in response.headers.get('Content-Type', ''):
+        return False
+    return "Will be right back" in response.text
+
+
+def fetch(url, params=None, proxy=None, session=None, timeout=30):
+    """GET url through the given session or the module-level one.
+
+    The request waits for the rate limiter of the host. Connection errors,
+    429 and 5xx responses are retried with backoff. When the retries are
+    used up the last response is returned, or the last connection error
+    is raised.
+
+    Parameters
+    ----------
+    url : str
+        Request url
+    params : dict, optional
+        Query parameters
+    proxy : dict, optional
+        Proxy in requests format, e.g. {'https': 'host:port'}
+    session : requests.Session, optional
+        By default the module-level session is used.
+    timeout : float, optional
+        Timeout in seconds.
+
+    Returns
+    -------
+    requests.Response
+
+    Raises
+    ------
+    CircuitOpenError
+        If the host failed too often recently.
+    """
+    session = session or get_session()
+    host = _host(url)
+    max_retries = _config['max_retries']
+    for attempt in range(max_retries + 1):
+        if not host.breaker.allow():
+            host.count('rejected')
+            raise CircuitOpenError("Too many failed requests to %s, try again later."
+                                   % urlsplit(url).netloc)
+        host.count('wait_time', host.bucket.acquire())
+        host.count('requests')
+        try:
+            response = _transport.get(session, url, params=params,
+                                      proxies=proxy, timeout=timeout)
+        except (requests.ConnectionError, requests.Timeout):
+            host.count('connection_errors')
+            host.breaker.record_failure()
+            if attempt == max_retries:
+                raise
+            response = None
+        except BaseException:
+            host.breaker.release()
+            raise
+        else:
+            if not _should_retry(response):
+                host.breaker.record_success()
+                return response
+            host.count('throttled' if response.status_code == 429 else 'server_errors')
+            host.breaker.record_failure()
+            if attempt == max_retries:
+                return response
+        host.count('retries')
+        _sleep(_backoff(attempt, response))
@@ -0,0 +1,171 @@
+""" Derive coarse bars from fine bars without downloading them again.
+
+Examples
+--------
+::
+
+    from stockmanager import Ticker
+    from stockmanager.resample import resample
+
+    bars = Ticker('MSFT').get_price(period='1mo', interval='5m')
+    hourly = resample(bars, '1h')
+    daily = resample(bars, '1d', exchange_tz='America/New_York')
+
+A Ticker with a PriceCache does this automatically: if the cache holds
+finer bars covering the requested range, get_price resamples them instead
+of requesting the coarser interval.
+
+Buckets are session aware. Intraday buckets start on a grid anchored at
+the session open of each day, e.g. 09:30, 10:30, ... for 1h bars of a US
+exchange, and never span two days. Daily, weekly (from Monday), monthly
+and quarterly buckets follow the calendar of the exchange timezone.
+"""
+
+import numpy as np
+import pandas as pd
+from .PriceSeries import PriceSeries
+
+_DAY = 24 * 3600
+INTRADAY_SECONDS = {'1m': 60, '2m': 120, '5m': 300, '15m': 900, '30m': 1800,
+                    '60m': 3600, '90m': 5400, '1h': 3600}
+CALENDAR = ('1d', '1wk', '1mo', '3mo')
+# Sources to try, coarsest first, so the fewest bars are read.
+SOURCES = ('1d', '90m', '1h', '60m', '30m', '15m', '5m', '2m', '1m')
+
+
+def can_resample(source, target):
+    """True if bars of the target interval can be built from source bars."""
+    if source == target:
+        return False
+    if source in INTRADAY_SECONDS and target in INTRADAY_SECONDS:
+        s, t = INTRADAY_SECONDS[source], INTRADAY_SECONDS[target]
+        return t > s and t % s == 0
+    if source in INTRADAY_SECONDS or source == '1d':
+        return target in CALENDAR
+    return source == '1mo' and target == '3mo'
+
+
+def _local_seconds(timestamps, exchange_tz):
+    if exchange_tz is None:
+        return timestamps
+    index = pd.to_datetime(timestamps, unit='s').tz_localize('UTC').tz_convert(exchange_tz)
+    local = (index.tz_localize(None) - pd.Timestamp(0)) // pd.Timedelta(seconds=1)
+    return np.asarray(local, dtype=np.int64)
+
+
+def _session_start(local, session_start):
+    """Seconds after midnight of the session open, by default the most
+    common time of the first bar of a day."""
+    if session_start is not None:
+        t = pd.Timedelta(session_start + ':00' if session_start.count(':') == 1 else session_start)
+        return int(t.total_seconds())
+    if not len(local):
+        return 0
+    day = local // _DAY
+    first = np.flatnonzero(np.r_[True, day[1:] != day[:-1]])
+    times, counts = np.unique(local[first] - day[first] * _DAY, return_counts=True)
+    return int(times[np.argmax(counts)])
+
+
+def bucket_starts(timestamps, interval, exchange_tz=None, session_start=None):
+    """Start of the bucket of each bar, in local epoch seconds.
+
+    Parameters
+    ----------
+    timestamps : numpy.ndarray
+        int64 epoch seconds (UTC) of the bars.
+    interval : str
+        Target interval, one of INTRADAY_SECONDS or CALENDAR.
+    exchange_tz : str, optional
+        Timezone of the exchange, for the day boundaries. Default is UTC.
+    session_start : str, optional
+        Session open as 'HH:MM' in exchange time, the anchor of intraday
+        buckets. By default it is inferred from the bars.
+
+    Returns
+    -------
+    starts : numpy.ndarray
+        Bucket start of each bar in local epoch seconds.
+    local : numpy.ndarray
+        Local epoch seconds of each bar.
+    """
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    local = _local_seconds(timestamps, exchange_tz)
+    day = local // _DAY
+    if interval in INTRADAY_SECONDS:
+        width = INTRADAY_SECONDS[interval]
+        anchor = day * _DAY + _session_start(local, session_start)
+        return anchor + (local - anchor) // width * width, local
+    if interval == '1d':
+        return day * _DAY, local
+    if interval == '1wk':
+        # Epoch day 0 is a Thursday, weeks start on Monday.
+        return ((day + 3) // 7 * 7 - 3) * _DAY, local
+    if interval in ('1mo', '3mo'):
+        months = local.astype('datetime64[s]').astype('datetime64[M]').astype(np.int64)
+        if interval == '3mo':
+            months = months // 3 * 3
+        return months.astype('datetime64[M]').astype('datetime64[s]').astype(np.int64), local
+    raise AttributeError("Cannot resample to %s, valid intervals: %s"
+                         % (interval, ', '.join(list(INTRADAY_SECONDS) + list(CALENDAR))))
+
+
+def floor_time(timestamp, interval, exchange_tz=None):
+    """Epoch seconds of the earliest bar a bucket containing timestamp can
+    have: the local midnight for intraday and daily buckets, the start of
+    the week, month or quarter otherwise."""
+    floor = '1d' if interval in INTRADAY_SECONDS else interval
+    starts, local = bucket_starts(np.array([timestamp]), floor, exchange_tz)
+    return int(timestamp - (local[0] - starts[0]))
+
+
+def resample(prices, interval, exchange_tz=None, session_start=None):
+    """Resample OHLCV bars to a coarser interval.
+
+    Open is the first open, High the highest high, Low the lowest low,
+    Close and Adj Close the last values and Volume the sum of each bucket.
+    Intraday buckets are labelled by their start on the session grid,
+    daily and longer buckets by their first bar, as Yahoo Finance does.
+
+    Parameters
+    ----------
+    prices : pandas.DataFrame or PriceSeries
+        Output of get_price, bars in increasing time order.
+    interval : str
+        Target interval, e.g. '1h', '1d', '1wk'.
+    exchange_tz, session_start
+        See bucket_starts.
+
+    Returns
+    -------
+    pandas.DataFrame or PriceSeries
+        Same type as prices.
+    """
+    bars = PriceSeries.from_dataframe(prices) if isinstance(prices, pd.DataFrame) else prices
+    ts = bars.timestamps
+    keys, local = bucket_starts(ts, interval, exchange_tz, session_start)
+    if len(ts):
+        first = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    else:
+        first = np.zeros(0, dtype=np.intp)
+    last = np.r_[first[1:], len(ts)][:len(first)] - 1
+    if interval in INTRADAY_SECONDS:
+        # Grid start, in UTC with the offset of the first bar.
+        labels = keys[first] - (local[first] - ts[first])
+    else:
+        labels = ts[first]
+
+    def _reduce(ufunc, values):
+        if not len(first):
+            return values[:0]
+        return ufunc.reduceat(values, first)
+
+    result = PriceSeries(labels, bars.open[first],
+                         _reduce(np.fmax, bars.high), _reduce(np.fmin, bars.low),
+                         bars.close[last], bars.adjclose[last],
+                         _reduce(np.add, bars.volume), bars.timezone)
+    if isinstance(prices, pd.DataFrame):
+        df = result.to_dataframe()
+        df.index.name = prices.index.name
+        return df
+    return result
@@ -0,0 +1,319 @@
+""" Columnar storage of price history in Parquet or Feather (Arrow IPC).
+
+Needs pyarrow, install it with ``pip install stockmanager[parquet]``.
+
+Examples
+--------
+::
+
+    from stockmanager import Ticker, save_prices, load_prices
+
+    df = Ticker('MSFT').get_price(period='1y', interval='1h')
+    save_prices(df, 'msft.parquet')
+    df = load_prices('msft.parquet', columns=['Close'], start='2020-03-01')
+
+    # A whole universe in one file, symbol -> DataFrame
+    save_prices({'MSFT': df, 'AAPL': df2}, 'universe.feather')
+    universe = load_prices('universe.feather', symbols=['AAPL'])
+
+Feather files are written uncompressed, so they are memory-mapped and
+several processes reading the same file share its pages instead of each
+holding a copy.
+
+save_table and iter_table store and stream any DataFrame with a time and
+a Symbol column the same way, Portfolio.save and Portfolio.load use them
+for the trade record.
+"""
+
+import os
+import pandas as pd
+from .PriceSeries import PriceSeries
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+INDEX_NAME = 'Datetime'
+SYMBOL_NAME = 'Symbol'
+_FORMATS = {'.parquet': 'parquet', '.pq': 'parquet',
+            '.feather': 'feather', '.arrow': 'feather', '.ipc': 'feather', '.csv': 'csv'}
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("pyarrow is needed for Parquet/Feather storage, "
+                          "pip install stockmanager[parquet]")
+
+
+def _get_format(path, format, valid=('parquet', 'feather')):
+    if format is None:
+        format = _FORMATS.get(os.path.splitext(path)[1].lower(), 'parquet')
+    format = format.lower()
+    if format not in valid:
+        raise AttributeError("format can only be %s." % ' or '.join("'%s'" % f for f in valid))
+    return format
+
+
+def _to_frame(prices):
+    if isinstance(prices, PriceSeries):
+        prices = prices.to_dataframe()
+    if not isinstance(prices, pd.DataFrame):
+        raise TypeError("prices need to be a DataFrame, PriceSeries or a dict of them.")
+    df = prices.copy(deep=False)
+    df.index.name = INDEX_NAME
+    return df.reset_index()
+
+
+def save_prices(prices, path, format=None, compression=None):
+    """Save the output of get_price for one or many symbols.
+
+    Parameters
+    ----------
+    prices : pandas.DataFrame, PriceSeries or dict
+        Price of one symbol, or a dict of symbol -> price for a universe.
+        A universe is stored in long format with a Symbol column.
+    path : str
+        File path.
+    format : str, optional
+        'parquet' or 'feather', by default taken from the file extension.
+    compression : str, optional
+        Compression codec. By default parquet uses snappy and feather is
+        uncompressed so that it can be memory-mapped without decoding.
+    """
+    _require_pyarrow()
+    format = _get_format(path, format)
+    if isinstance(prices, dict):
+        frames = []
+        for symbol in sorted(prices):
+            df = _to_frame(prices[symbol])
+            df.insert(0, SYMBOL_NAME, symbol)
+            frames.append(df)
+        df = pd.concat(frames, ignore_index=True)
+        df[SYMBOL_NAME] = df[SYMBOL_NAME].astype('category')
+    else:
+        df = _to_frame(prices)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if format == 'parquet':
+        pq.write_table(table, path, compression=compression or 'snappy')
+    else:
+        feather.write_feather(table, path, compression=compression or 'uncompressed')
+
+
+def _bound(value, tz):
+    ts = pd.Timestamp(value)
+    if tz is not None and ts.tz is None:
+        ts = ts.tz_localize(tz)
+    return ts
+
+
+def _read_schema(path, format, memory_map):
+    if format == 'parquet':
+        return pq.read_schema(path, memory_map=memory_map)
+    with pa.memory_map(path) as source:
+        return pa.ipc.open_file(source).schema
+
+
+def _parquet_filters(time_column, start, end, symbols, tz, has_symbol):
+    filters = []
+    if start is not None:
+        filters.append((time_column, '>=', _bound(start, tz)))
+    if end is not None:
+        filters.append((time_column, '<=', _bound(end, tz)))
+    if symbols is not None and has_symbol:
+        filters.append((SYMBOL_NAME, 'in', list(symbols)))
+    return filters or None
+
+
+def _filter_mask(table, time_column, start, end, symbols, tz, has_symbol):
+    """Boolean mask of the rows of a Table or RecordBatch in the filters."""
+    time_type = table.schema.field(time_column).type
+    mask = None
+    if start is not None:
+        mask = pc.greater_equal(table[time_column], pa.scalar(_bound(start, tz), time_type))
+    if end is not None:
+        m = pc.less_equal(table[time_column], pa.scalar(_bound(end, tz), time_type))
+        mask = m if mask is None else pc.and_(mask, m)
+    if symbols is not None and has_symbol:
+        m = pc.is_in(pc.cast(table[SYMBOL_NAME], pa.string()),
+                     value_set=pa.array(list(symbols), pa.string()))
+        mask = m if mask is None else pc.and_(mask, m)
+    return mask
+
+
+def _row_groups(parquet_file, time_column, start, end, symbols, tz):
+    """Row groups whose statistics can hold rows in the filters."""
+    meta = parquet_file.metadata
+    names = parquet_file.schema_arrow.names
+    keep = []
+    for i in range(meta.num_row_groups):
+        group = meta.row_group(i)
+        stats = {name: group.column(j).statistics for j, name in enumerate(names)
+                 if name in (time_column, SYMBOL_NAME)}
+        t, sym = stats.get(time_column), stats.get(SYMBOL_NAME)
+        if t is not None and t.has_min_max:
+            # Statistics of tz-aware columns are UTC.
+            lo, hi = (_bound(v, None if tz is None else 'UTC') for v in (t.min, t.max))
+            if (start is not None and hi < _bound(start, tz)) or \
+                    (end is not None and lo > _bound(end, tz)):
+                continue
+        if symbols is not None and sym is not None and sym.has_min_max:
+            if not any(sym.min <= s <= sym.max for s in symbols):
+                continue
+        keep.append(i)
+    return keep
+
+
+def save_table(df, path, format=None, compression=None, row_group_size=None):
+    """Save a DataFrame without its index as Parquet or Feather.
+
+    Sort it by Symbol and time before saving, so the statistics of each
+    Parquet row group let iter_table skip the row groups outside of the
+    filters.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+    path : str
+        File path.
+    format : str, optional
+        'parquet' or 'feather', by default taken from the file extension.
+    compression : str, optional
+        See save_prices.
+    row_group_size : int, optional
+        Rows per Parquet row group, default is pyarrow's.
+    """
+    _require_pyarrow()
+    format = _get_format(path, format)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if format == 'parquet':
+        pq.write_table(table, path, compression=compression or 'snappy',
+                       row_group_size=row_group_size)
+    else:
+        feather.write_feather(table, path, compression=compression or 'uncompressed')
+
+
+def iter_table(path, time_column, columns=None, start=None, end=None, symbols=None,
+               format=None, batch_size=65536, memory_map=True):
+    """Stream the rows of a file written by save_table in the filters.
+
+    Only the row groups of a Parquet file that can hold matching rows are
+    read, one batch at a time, so the file does not need to fit in memory.
+
+    Parameters
+    ----------
+    path : str
+        File path.
+    time_column : str
+        Column start and end apply to.
+    columns, start, end, symbols, format, memory_map
+        See load_table.
+    batch_size : int, optional
+        Maximum rows per batch.
+
+    Yields
+    ------
+    pyarrow.Table
+        Filtered batches, empty ones are skipped.
+    """
+    _require_pyarrow()
+    format = _get_format(path, format)
+    if isinstance(symbols, str):
+        symbols = [symbols]
+    schema = _read_schema(path, format, memory_map)
+    has_symbol = SYMBOL_NAME in schema.names
+    tz = getattr(schema.field(time_column).type, 'tz', None)
+    read = None if columns is None else \
+        list(dict.fromkeys([c for c in (SYMBOL_NAME, time_column) if c in schema.names] + columns))
+    if format == 'parquet':
+        f = pq.ParquetFile(path, memory_map=memory_map)
+        groups = _row_groups(f, time_column, start, end, symbols, tz)
+        batches = f.iter_batches(batch_size=batch_size, row_groups=groups, columns=read) \
+            if groups else iter(())
+    else:
+        batches = feather.read_table(path, columns=read,
+                                     memory_map=memory_map).to_batches(batch_size)
+    for batch in batches:
+        mask = _filter_mask(batch, time_column, start, end, symbols, tz, has_symbol)
+        table = pa.Table.from_batches([batch])
+        if mask is not None:
+            table = table.filter(mask)
+        if columns is not None:
+            table = table.select(columns)
+        if table.num_rows:
+            yield table
+
+
+def load_table(path, columns=None, start=None, end=None, symbols=None,
+               format=None, memory_map=True):
+    """Read a file written by save_prices as a pyarrow.Table.
+
+    Only the requested columns and rows are read. Parquet row groups
+    outside of the filters are skipped. Uncompressed feather files are
+    memory-mapped without copying.
+
+    Parameters
+    ----------
+    path : str
+        File path.
+    columns : list of str, optional
+        Price columns to read, e.g. ['Close', 'Volume']. Default is all.
+    start, end : str or datetime, optional
+        Only bars with start <= time <= end are returned.
+    symbols : list of str, optional
+        Only these symbols of a universe file are returned.
+    format : str, optional
+        'parquet' or 'feather', by default taken from the file extension.
+    memory_map : bool, optional
+        Memory-map the file. Default is True.
+
+    Returns
+    -------
+    pyarrow.Table
+    """
+    _require_pyarrow()
+    format = _get_format(path, format)
+    schema = _read_schema(path, format, memory_map)
+    has_symbol = SYMBOL_NAME in schema.names
+    if columns is not None:
+        missing = set(columns) - set(schema.names)
+        if missing:
+            raise KeyError("columns %s not in %s" % (sorted(missing), path))
+        columns = [c for c in (SYMBOL_NAME, INDEX_NAME) if c in schema.names] + \
+            [c for c in columns if c not in (SYMBOL_NAME, INDEX_NAME)]
+    tz = getattr(schema.field(INDEX_NAME).type, 'tz', None)
+    if isinstance(symbols, str):
+        symbols = [symbols]
+
+    if format == 'parquet':
+        filters = _parquet_filters(INDEX_NAME, start, end, symbols, tz, has_symbol)
+        return pq.read_table(path, columns=columns, filters=filters, memory_map=memory_map)
+
+    table = feather.read_table(path, columns=columns, memory_map=memory_map)
+    mask = _filter_mask(table, INDEX_NAME, start, end, symbols, tz, has_symbol)
+    if mask is not None:
+        table = table.filter(mask)
+    return table
+
+
+def load_prices(path, columns=None, start=None, end=None, symbols=None,
+                format=None, memory_map=True):
+    """Read a file written by save_prices, see load_table for the parameters.
+
+    Returns
+    -------
+    pandas.DataFrame or dict
+        DataFrame indexed by time for a single symbol file, or a dict of
+        symbol -> DataFrame for a universe file.
+    """
+    table = load_table(path, columns, start, end, symbols, format, memory_map)
+    df = table.to_pandas(split_blocks=True, self_destruct=True)
+    if SYMBOL_NAME not in df.columns:
+        return df.set_index(INDEX_NAME)
+    result = {}
+    for symbol, group in df.groupby(SYMBOL_NAME, observed=True, sort=False):
+        result[symbol] = group.drop(columns=SYMBOL_NAME).set_index(INDEX_NAME)
+    return result
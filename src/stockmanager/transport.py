@@ -0,0 +1,181 @@
+""" Record and replay transports for offline, deterministic runs.
+
+A transport sends the requests of network.fetch. RecordTransport sends
+them over the network and archives every response in a directory.
+ReplayTransport answers from such an archive without network access,
+optionally with an artificial latency.
+
+Examples
+--------
+Record once::
+
+    from stockmanager import network, Ticker
+    from stockmanager.transport import RecordTransport, ReplayTransport
+
+    network.set_transport(RecordTransport('./archive'))
+    Ticker('MSFT').get_fundamentals()
+
+Then replay offline, with 50 ms per request::
+
+    network.set_transport(ReplayTransport('./archive', latency=0.05))
+    Ticker('MSFT').get_fundamentals()
+
+The test suite replays the archive in tests/dummy_data/archive, or the one
+STOCKMANAGER_REPLAY is set to, and records one from the network if
+STOCKMANAGER_RECORD is set instead.
+"""
+
+import os
+import json
+import time
+import random
+import hashlib
+import datetime
+import threading
+from urllib.parse import urlencode
+import logging
+_LOGGER = logging.getLogger(__name__)
+_LOGGER.addHandler(logging.NullHandler())
+
+_HEADERS = ('Content-Type', 'Retry-After')
+# Parameters that change with the time of the request, ignored by the fallback.
+VOLATILE_PARAMS = ('period1', 'period2')
+
+
+class ArchiveMissError(LookupError):
+    """Raised when a replayed request is not in the archive."""
+
+
+def request_key(url, params=None):
+    """Key of a request in the archive: url with sorted query parameters."""
+    if not params:
+        return url
+    return url + '?' + urlencode(sorted(params.items()))
+
+
+def _stable_key(url, params=None):
+    return request_key(url, {k: v for k, v in (params or {}).items()
+                             if k not in VOLATILE_PARAMS})
+
+
+def _filename(key):
+    return hashlib.sha1(key.encode('utf-8')).hexdigest() + '.json'
+
+
+class ArchivedResponse(object):
+    """The parts of requests.Response stockmanager uses."""
+
+    def __init__(self, url, status_code, text, headers=None, elapsed=0.):
+        self.url = url
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers or {}
+        self.elapsed = datetime.timedelta(seconds=elapsed)
+
+    @property
+    def content(self):
+        return self.text.encode('utf-8')
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class Transport(object):
+    """Default transport, sends the request with the session."""
+
+    def get(self, session, url, params=None, proxies=None, timeout=None):
+        return session.get(url=url, params=params, proxies=proxies,
+                           timeout=timeout)
+
+
+class RecordTransport(Transport):
+    """Send requests over the network and archive the responses.
+
+    Parameters
+    ----------
+    directory : str
+        Archive directory, created if it does not exist.
+    """
+
+    def __init__(self, directory):
+        self.directory = os.path.expanduser(directory)
+        os.makedirs(self.directory, exist_ok=True)
+
+    def get(self, session, url, params=None, proxies=None, timeout=None):
+        response = super().get(session, url, params, proxies, timeout)
+        key = request_key(url, params)
+        record = {'key': key, 'url': url, 'params': params or {},
+                  'recorded': time.time(), 'status_code': response.status_code,
+                  'headers': {h: response.headers[h] for h in _HEADERS
+                              if h in response.headers},
+                  'text': response.text}
+        path = os.path.join(self.directory, _filename(key))
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(record, f)
+        os.replace(tmp, path)
+        return response
+
+
+class ReplayTransport(Transport):
+    """Answer requests from an archive written by RecordTransport.
+
+    Parameters
+    ----------
+    directory : str
+        Archive directory.
+    latency : float, optional
+        Seconds added to each response, to measure concurrency realistically.
+    jitter : float, optional
+        Random extra latency up to jitter seconds.
+    fallback : bool, optional
+        If the exact request is not archived, answer with the newest
+        recording that only differs in VOLATILE_PARAMS, e.g. a chart request
+        whose end is now. Any other difference is a miss. Default is True.
+        Recordings without a recording time are dated by their file time.
+    """
+
+    def __init__(self, directory, latency=0., jitter=0., fallback=True):
+        self.directory = os.path.expanduser(directory)
+        if not os.path.isdir(self.directory):
+            raise FileNotFoundError("No archive at %s" % self.directory)
+        self.latency = latency
+        self.jitter = jitter
+        self.fallback = fallback
+        recordings = {}
+        for fname in os.listdir(self.directory):
+            if fname.endswith('.json'):
+                path = os.path.join(self.directory, fname)
+                with open(path) as f:
+                    record = json.load(f)
+                key = _stable_key(record['url'], record.get('params'))
+                recorded = record.get('recorded') or os.path.getmtime(path)
+                recordings.setdefault(key, []).append((recorded, fname))
+        # Oldest first, the fallback answers with the last one.
+        self._by_stable_key = {key: [fname for _, fname in sorted(r)]
+                               for key, r in recordings.items()}
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def _load(self, fname):
+        with self._lock:
+            if fname not in self._cache:
+                with open(os.path.join(self.directory, fname)) as f:
+                    self._cache[fname] = json.load(f)
+            return self._cache[fname]
+
+    def get(self, session, url, params=None, proxies=None, timeout=None):
+        key = request_key(url, params)
+        fname = _filename(key)
+        if not os.path.exists(os.path.join(self.directory, fname)):
+            similar = self._by_stable_key.get(_stable_key(url, params)) if self.fallback else None
+            if not similar:
+                raise ArchiveMissError("%s is not in the archive %s" % (key, self.directory))
+            fname = similar[-1]
+            _LOGGER.debug("No exact recording of %s, replay %s", key, fname)
+        record = self._load(fname)
+        delay = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0.)
+        if delay > 0:
+            time.sleep(delay)
+        return ArchivedResponse(record['url'], record['status_code'],
+                                record['text'], record['headers'], delay)
@@ -2,7 +2,9 @@
 # Should support both matplotlib and plotly backend.
 import mplfinance as mpf
 import plotly.graph_objects as go
+import pandas as pd
 from ..helpers import get_ohlc
+from ..PriceSeries import PriceSeries
 from ._arg_validator import _process_kwargs, _valid_plot_kwargs
 from itertools import cycle
 
@@ -13,7 +15,7 @@ def plot_price(price, backend='matplotlib', **kwargs):
 
     Parameters
     ----------
-    price : pd.DataFrame
+    price : pd.DataFrame or PriceSeries
         price data frame
     backend : str
         matplotlib or plotly
@@ -43,9 +45,11 @@ def price_plot_with_matplotlib(price, **kwargs):
 
     Parameters
     ----------
-    price : pd.DataFrame
+    price : pd.DataFrame or PriceSeries
         price data frame
     """
+    if isinstance(price, PriceSeries):
+        price = price.to_dataframe()
     mpf.plot(price, **kwargs)
 
 
@@ -54,7 +58,7 @@ def price_plot_with_plotly(price, show_hours=True, **kwargs):
 
     Parameters
     ----------
-    price : pd.DataFrame
+    price : pd.DataFrame or PriceSeries
         price data frame
     """
     has_ohlc, ohlc = get_ohlc(price)  # Get ohlc for
@@ -69,7 +73,7 @@ def price_plot_with_plotly(price, show_hours=True, **kwargs):
 
     fig = go.Figure()
     if config['type'] == 'line':
-        fig.add_trace(go.Scatter(x=timeline_str, y=price.Close,
+        fig.add_trace(go.Scatter(x=timeline_str, y=price['Close'],
                                  line=dict(color='royalblue'), name='Price'))
     elif config['type'] == 'candle' or config['type'] == 'candlestick':
         if has_ohlc:
@@ -107,7 +111,7 @@ def price_plot_with_plotly(price, show_hours=True, **kwargs):
 
         for mav in mavgs:
 
-            mavprices = price.Close.rolling(mav).mean().values
+            mavprices = pd.Series(price['Close']).rolling(mav).mean().values
             # if mavc:
             #     ax1.plot(timeline_str, mavprices, color=next(mavc))
             # else:
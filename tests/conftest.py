@@ -10,7 +10,26 @@
 import os
 import pytest
 from pandas import read_csv, to_datetime, DataFrame
-from stockmanager import Ticker, Portfolio
+from stockmanager import Ticker, Portfolio, network
+from stockmanager.transport import RecordTransport, ReplayTransport
+
+
+ARCHIVE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dummy_data', 'archive')
+
+
+@pytest.fixture(scope="session", autouse=True)
+def archive_transport():
+    """Replay the responses recorded in dummy_data/archive, or the archive
+    STOCKMANAGER_REPLAY is set to, so the tests run offline. Record a new
+    archive from the network if STOCKMANAGER_RECORD is set instead."""
+    if os.environ.get('STOCKMANAGER_RECORD'):
+        network.set_transport(RecordTransport(os.environ['STOCKMANAGER_RECORD']))
+    else:
+        latency = float(os.environ.get('STOCKMANAGER_REPLAY_LATENCY', 0))
+        network.set_transport(ReplayTransport(os.environ.get('STOCKMANAGER_REPLAY') or ARCHIVE,
+                                              latency=latency))
+    yield
+    network.set_transport(None)
 
 
 @pytest.fixture(scope="module")
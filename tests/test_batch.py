@@ -0,0 +1,157 @@
+import asyncio
+import json
+import pytest
+from unittest import mock
+from stockmanager import fetch_prices, load_fundamentals, metrics
+
+
+@mock.patch('stockmanager.batch.Ticker.get_price')
+def test_fetch_prices(get_price, dummy_price):
+    get_price.return_value = dummy_price
+    result, errors = asyncio.run(fetch_prices(['MSFT', 'AAPL'], period='1y',
+                                              max_concurrency=2))
+    assert set(result) == {'MSFT', 'AAPL'}
+    assert result['MSFT'] is dummy_price
+    assert errors == {}
+    assert get_price.call_count == 2
+
+
+def test_fetch_prices_errors(dummy_price):
+    def fake_price(self, **kwargs):
+        if self.symbol == 'BAD':
+            raise KeyError('chart')
+        return dummy_price
+
+    with mock.patch('stockmanager.batch.Ticker.get_price', fake_price):
+        result, errors = asyncio.run(fetch_prices(['MSFT', 'BAD', 'AAPL'],
+                                                  max_concurrency=2))
+    assert list(result) == ['MSFT', 'AAPL']
+    assert list(errors) == ['BAD']
+    assert isinstance(errors['BAD'], KeyError)
+
+
+def test_fetch_prices_invalid_args():
+    with pytest.raises(AttributeError):
+        asyncio.run(fetch_prices(['MSFT'], period='3d'))
+    with pytest.raises(AttributeError):
+        asyncio.run(fetch_prices(['MSFT'], interval='2d'))
+    with pytest.raises(ValueError):
+        asyncio.run(fetch_prices(['MSFT'], max_concurrency=0))
+
+
+def test_load_fundamentals():
+    def fake_fundamentals(self):
+        if self.symbol == 'BAD':
+            raise KeyError('shortName')
+
+    with mock.patch('stockmanager.batch.Ticker.get_fundamentals',
+                    fake_fundamentals):
+        tickers, errors = load_fundamentals(['MSFT', 'BAD', 'AAPL'],
+                                            max_workers=2)
+    assert list(tickers) == ['MSFT', 'AAPL']
+    assert tickers['AAPL'].symbol == 'AAPL'
+    assert isinstance(errors['BAD'], KeyError)
+
+
+def _quotes(prices):
+    prices = {s: iter(p) for s, p in prices.items()}
+
+    def get_quote(self):
+        price = next(prices[self.symbol])
+        if price is None:
+            raise RuntimeError('down')
+        return {'symbol': self.symbol, 'price': price, 'volume': 1, 'time': 1}
+    return get_quote
+
+
+@mock.patch('stockmanager.Ticker._sleep')
+def test_stream_quotes(sleep):
+    from stockmanager.batch import stream_quotes
+    get_quote = _quotes({'MSFT': [1., 1., 2.], 'AAPL': [5., None, 5.]})
+    with mock.patch('stockmanager.batch.Ticker.get_quote', get_quote):
+        stream = stream_quotes(['MSFT', 'AAPL'], every=1., max_workers=2)
+        quotes = [next(stream) for _ in range(3)]
+    assert [(q['symbol'], q['price']) for q in quotes] == \
+        [('MSFT', 1.), ('AAPL', 5.), ('MSFT', 2.)]
+    assert sleep.call_count == 2
+
+
+def test_astream_quotes():
+    from stockmanager.batch import astream_quotes
+    get_quote = _quotes({'MSFT': [1., 1., 2.], 'AAPL': [5., 5., 5.]})
+
+    async def collect():
+        quotes = []
+        async for quote in astream_quotes(['MSFT', 'AAPL'], every=0.01):
+            quotes.append(quote)
+            if len(quotes) == 3:
+                break
+        return quotes
+
+    with mock.patch('stockmanager.batch.Ticker.get_quote', get_quote):
+        quotes = asyncio.run(collect())
+    assert [(q['symbol'], q['price']) for q in quotes] == \
+        [('MSFT', 1.), ('AAPL', 5.), ('MSFT', 2.)]
+
+
+def test_price_panel(dummy_price):
+    from stockmanager import price_panel, PriceSeries
+    prices = {'MSFT': dummy_price, 'AAPL': PriceSeries.from_dataframe(dummy_price.iloc[2:])}
+    panel = price_panel(prices, fields=['Close', 'Volume'])
+    assert panel.shape == (len(dummy_price), 4)
+    assert list(panel.columns.get_level_values('Symbol').unique()) == ['MSFT', 'AAPL']
+    assert panel[('AAPL', 'Close')].isna().sum() == 2
+
+    assert len(price_panel(prices, join='inner')) == len(dummy_price) - 2
+
+    filled = price_panel({'MSFT': dummy_price, 'AAPL': dummy_price.iloc[::2]}, ffill=True)
+    assert (filled[('AAPL', 'Close')].iloc[1] == filled[('AAPL', 'Close')].iloc[0])
+    assert filled[('AAPL', 'Volume')].iloc[1] == 0
+
+    long = price_panel(prices, layout='long')
+    assert long.index.names == ['Datetime', 'Symbol']
+    assert len(long) == 2 * len(dummy_price) - 2
+    assert list(long.columns) == list(dummy_price.columns)
+
+    with pytest.raises(AttributeError):
+        price_panel(prices, join='left')
+
+
+def test_quote_profiles():
+    from stockmanager import quote_profiles
+    from stockmanager.cache import profile_cache
+    from stockmanager.transport import ArchivedResponse
+    requested = []
+
+    def fetch(url, params=None, proxy=None, session=None):
+        symbols = params['symbols'].split(',')
+        requested.append(symbols)
+        result = [{'symbol': s, 'longName': s + ' Inc.', 'exchange': 'NMS',
+                   'currency': 'USD', 'regularMarketPrice': 10.}
+                  for s in symbols if s != 'NOSUCH']
+        return ArchivedResponse(url, 200, json.dumps({'quoteResponse': {'result': result}}))
+
+    profile_cache.invalidate()
+    symbols = ['S%d' % i for i in range(120)] + ['NOSUCH']
+    totals = metrics.subscribe(metrics.Aggregator())
+    try:
+        with mock.patch('stockmanager.network.fetch', fetch):
+            profiles = quote_profiles(symbols)
+    finally:
+        metrics.unsubscribe(totals)
+    # Batch requests are not counted for a symbol.
+    summary = totals.summary()
+    assert summary.index.get_level_values('Symbol').isna().all()
+    assert list(summary['requests']) == [3]
+
+    with mock.patch('stockmanager.network.fetch', fetch):
+        assert len(requested) == 3  # chunks of 50
+        assert len(profiles) == 120 and 'NOSUCH' not in profiles
+        assert profiles['S0']['name'] == 'S0 Inc.'
+
+        # Fresh profiles come from the cache.
+        quote_profiles(['s1', 'S2'])
+        assert len(requested) == 3
+        quote_profiles(['S1'], max_age=0)
+        assert requested[-1] == ['S1']
+    profile_cache.invalidate()
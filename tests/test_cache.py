@@ -0,0 +1,166 @@
+import threading
+import time
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from stockmanager import PriceCache, Ticker
+from stockmanager.cache import params_to_range, QuoteCache
+
+
+def _epoch(date):
+    return int(pd.Timestamp(date).timestamp())
+
+
+def _fake_fetch(dummy_price, calls):
+    def fetch(start, end):
+        calls.append((start, end))
+        idx = dummy_price.index
+        mask = (idx >= pd.Timestamp(start, unit='s')) & (idx <= pd.Timestamp(end, unit='s'))
+        return dummy_price[mask]
+    return fetch
+
+
+def test_params_to_range():
+    now = _epoch('2020-06-15')
+    assert params_to_range({'period1': 10, 'period2': 2 * now}, now) == (10, now)
+    start, end = params_to_range({'range': '1mo'}, now)
+    assert end == now and start == _epoch('2020-05-15')
+    start, _ = params_to_range({'range': 'ytd'}, now)
+    assert start == _epoch('2020-01-01')
+
+
+def test_price_cache_incremental(tmpdir, dummy_price):
+    cache = PriceCache(str(tmpdir))
+    calls = []
+    fetch = _fake_fetch(dummy_price, calls)
+
+    a = cache.get_price('MSFT', '1d', _epoch('2020-05-01'), _epoch('2020-05-15'), fetch)
+    assert len(calls) == 1
+    assert a.index[0] >= pd.Timestamp('2020-05-01')
+
+    # Same range again, served from disk.
+    b = cache.get_price('MSFT', '1d', _epoch('2020-05-01'), _epoch('2020-05-15'), fetch)
+    assert len(calls) == 1
+    pd.testing.assert_frame_equal(a, b)
+
+    # Only head and tail are downloaded.
+    c = cache.get_price('msft', '1d', _epoch('2020-04-20'), _epoch('2020-05-20'), fetch)
+    assert len(calls) == 3
+    assert calls[1] == (_epoch('2020-04-20'), _epoch('2020-05-01'))
+    assert calls[2][1] == _epoch('2020-05-20')
+    assert c.index.is_monotonic_increasing and c.index.is_unique
+    expected = dummy_price[(dummy_price.index >= '2020-04-20') & (dummy_price.index < '2020-05-20')]
+    pd.testing.assert_frame_equal(c, expected)
+
+    cache.clear('MSFT')
+    assert cache.load('MSFT', '1d') is None
+
+
+def test_price_cache_parallel_symbols(tmpdir, dummy_price):
+    cache = PriceCache(str(tmpdir))
+    both_fetching = threading.Barrier(2, timeout=5)
+
+    def fetch(start, end):
+        both_fetching.wait()  # Breaks if the other symbol waits for this download
+        return dummy_price
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [executor.submit(cache.get_price, s, '1d', _epoch('2020-05-01'),
+                                   _epoch('2020-05-15'), fetch) for s in ('MSFT', 'AAPL')]
+        assert all(len(f.result()) for f in futures)
+
+def test_ticker_cache(tmpdir, dummy_price):
+    calls = []
+    fetch = _fake_fetch(dummy_price, calls)
+    with mock.patch.object(Ticker, '_fetch_bars', lambda self, s, e, i: fetch(s, e)):
+        t = Ticker('MSFT', cache=str(tmpdir))
+        t.get_price(start='2020-05-01', end='2020-05-10')
+        t.get_price(start='2020-05-01', end='2020-05-10')
+    assert len(calls) == 1
+
+
+def test_quote_cache_ttl():
+    qc = QuoteCache(ttl=60)
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return {'price': {'regularMarketPrice': 1.}}
+
+    assert qc.get('MSFT', loader) is qc.get('MSFT', loader)
+    assert len(calls) == 1
+    qc.get('MSFT', loader, max_age=0)
+    assert len(calls) == 2
+    qc.invalidate('MSFT')
+    qc.get('MSFT', loader)
+    assert len(calls) == 3
+
+    # Empty pages are not cached
+    qc.get('ZM', dict)
+    assert 'ZM' not in qc._data
+
+
+def test_quote_cache_single_flight():
+    qc = QuoteCache(ttl=60)
+    calls = []
+    release = threading.Event()
+
+    def loader():
+        calls.append(1)
+        release.wait(5)
+        return {'price': {'regularMarketPrice': 1.}}
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        futures = [executor.submit(qc.get, 'MSFT', loader) for _ in range(8)]
+        time.sleep(0.1)
+        release.set()
+        results = [f.result() for f in futures]
+    assert len(calls) == 1
+    assert all(r is results[0] for r in results)
+
+
+def test_ticker_cache_resamples(tmpdir, dummy_price):
+    calls = []
+    fetch = _fake_fetch(dummy_price, calls)
+
+    def fetch_bars(self, start, end, interval):
+        assert interval == '1d', "weekly bars are resampled, not requested"
+        return fetch(start, end)
+
+    with mock.patch.object(Ticker, '_fetch_bars', fetch_bars):
+        t = Ticker('MSFT', cache=str(tmpdir))
+        t.get_price(start='2020-04-20', end='2020-05-20')
+        weekly = t.get_price(start='2020-04-27', end='2020-05-15', interval='1wk')
+    assert len(calls) == 1
+    assert weekly.index[0] == pd.Timestamp('2020-04-27 13:30')
+    assert len(weekly) == 3
+
+    t.cache.resample = False
+    assert t.cache.finer_source('MSFT', '1wk', _epoch('2020-04-27')) is None
+
+
+def test_ticker_cache_resamples_exchange_timezone(tmpdir):
+    # ASX session 10:00-16:00 AEDT is 23:00-05:00 UTC, across midnight UTC.
+    index = pd.DatetimeIndex([pd.Timestamp('2020-01-05 23:00') + pd.Timedelta(days=d, hours=h)
+                              for d in range(5) for h in range(6)])
+    hourly = pd.DataFrame({'Open': 1., 'High': 2., 'Low': 0.5, 'Close': 1.5,
+                           'Adj Close': 1.5, 'Volume': 10}, index=index)
+
+    def fetch_bars(self, start, end, interval):
+        assert interval == '1h'
+        self.meta = {'exchangeTimezoneName': 'Australia/Sydney'}
+        df = hourly[(hourly.index >= pd.Timestamp(start, unit='s')) &
+                    (hourly.index <= pd.Timestamp(end, unit='s'))].copy()
+        df.attrs['timezone'] = 'Australia/Sydney'
+        return df
+
+    with mock.patch.object(Ticker, '_fetch_bars', fetch_bars):
+        Ticker('BHP.AX', cache=str(tmpdir)).get_price(start='2020-01-04', end='2020-01-11',
+                                                      interval='1h')
+        # A new Ticker has no meta, the timezone comes from the cache.
+        daily = Ticker('BHP.AX', cache=str(tmpdir)).get_price(start='2020-01-05 12:00',
+                                                              end='2020-01-11',
+                                                              interval='1d')
+    assert len(daily) == 5
+    assert (daily.index.hour == 23).all()
+    assert (daily['Volume'] == 60).all()
@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+import pytest
+from stockmanager.costbasis import CostBasis, _affine_scan
+
+
+def _trades():
+    return pd.DataFrame({'Symbol': ['A', 'B', 'A', 'A', 'B', 'A'],
+                         'Buy': [10, 5, 5, 0, 0, 0], 'Sell': [0, 0, 0, 12, 3, 3],
+                         'Price': [10., 20., 12., 15., 25., 20.],
+                         'Fee': [1., 0., 0., 2., 0., 0.]})
+
+
+def _random_trades(n, seed=0):
+    rng = np.random.default_rng(seed)
+    symbols = rng.choice(['A', 'B', 'C'], n)
+    qty = rng.integers(1, 20, n)
+    buy, sell = np.zeros(n), np.zeros(n)
+    position = {}
+    for i, (s, q) in enumerate(zip(symbols, qty)):
+        if rng.random() < 0.5 and position.get(s, 0) > 0:
+            sell[i] = min(q, position[s])
+        else:
+            buy[i] = q
+        position[s] = position.get(s, 0) + buy[i] - sell[i]
+    return pd.DataFrame({'Symbol': symbols, 'Buy': buy, 'Sell': sell,
+                         'Price': rng.uniform(10, 20, n), 'Fee': rng.uniform(0, 1, n)})
+
+
+def _reference(trades, method):
+    """Lot by lot, one trade at a time."""
+    lots, realized = {}, []
+    for row in trades.itertuples():
+        book = lots.setdefault(row.Symbol, [])
+        if row.Buy:
+            book.append([row.Buy, row.Price + row.Fee / row.Buy])
+            realized.append(0.)
+            continue
+        if method == 'average':
+            qty = sum(q for q, _ in book)
+            unit = sum(q * c for q, c in book) / qty
+            book[:] = [[qty - row.Sell, unit]] if qty > row.Sell else []
+            cost = row.Sell * unit
+        else:
+            need, cost = row.Sell, 0.
+            while need:
+                lot = book[0] if method == 'fifo' else book[-1]
+                take = min(need, lot[0])
+                cost += take * lot[1]
+                lot[0] -= take
+                need -= take
+                if not lot[0]:
+                    book.remove(lot)
+        realized.append(row.Sell * row.Price - row.Fee - cost)
+    return np.array(realized)
+
+
+def test_affine_scan():
+    a = np.array([0., 1., .5, 1., 0., 2.])
+    d = np.array([1., 2., 0., 3., 4., 1.])
+    x, expected = 0., []
+    for ak, dk in zip(a, d):
+        x = ak * x + dk
+        expected.append(x)
+    np.testing.assert_allclose(_affine_scan(a, d), expected)
+
+
+def test_fifo():
+    engine = CostBasis('FIFO')
+    result = engine.update(_trades())
+    # 10 @ 10 + 1 fee and 2 @ 12, sold 12 @ 15 - 2 fee
+    assert result['Cost'][3] == pytest.approx(125.)
+    assert result['Realized P&L'][3] == pytest.approx(53.)
+    positions = engine.positions(prices={'A': 30., 'B': 30.})
+    assert positions.loc['A', 'Position'] == 0
+    assert positions.loc['B', 'Cost Basis'] == pytest.approx(40.)
+    assert positions.loc['B', 'Unrealized P&L'] == pytest.approx(20.)
+    assert positions.loc['A', 'Fees'] == 3.
+    with pytest.raises(AttributeError):
+        CostBasis('hifo')
+
+
+@pytest.mark.parametrize('method', ['fifo', 'lifo', 'average'])
+def test_matches_reference(method):
+    trades = _random_trades(500)
+    engine = CostBasis(method)
+    realized = engine.update(trades)['Realized P&L'].to_numpy()
+    np.testing.assert_allclose(realized, _reference(trades, method), atol=1e-6)
+
+
+@pytest.mark.parametrize('method', ['fifo', 'lifo', 'average'])
+def test_incremental(method):
+    trades = _random_trades(300, seed=1)
+    whole = CostBasis(method)
+    whole.update(trades)
+    parts = CostBasis(method)
+    for chunk in np.array_split(np.arange(len(trades)), 7):
+        parts.update(trades.iloc[chunk])
+    assert parts.n_trades == len(trades)
+    pd.testing.assert_frame_equal(parts.positions(), whole.positions())
+
+
+def test_oversell():
+    engine = CostBasis()
+    engine.update(_trades().iloc[:2])
+    with pytest.raises(ValueError):
+        engine.update(pd.DataFrame({'Symbol': ['B'], 'Buy': [0], 'Sell': [6], 'Price': [1.]}))
+    assert engine.n_trades == 2
+    assert engine.lots['Quantity'].sum() == 15
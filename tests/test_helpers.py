@@ -0,0 +1,69 @@
+import os
+import numpy as np
+import pandas as pd
+from stockmanager.helpers import parse_quote_summary, create_df, merge_chart_results
+
+
+def test_parse_quote_summary(rootdir):
+    with open(os.path.join(rootdir, 'dummy_data', 'dummy_quote.html')) as f:
+        html = f.read()
+    data = parse_quote_summary(html)
+    assert set(data) >= {'price', 'summaryDetail', 'quoteType', 'esgScores'}
+    # raw/fmt objects are flattened to the raw value
+    assert data['price']['regularMarketPrice'] == 158.15
+    assert data['price']['marketCap'] == 1202176884736
+    # empty objects become None, but strings are left alone
+    assert data['summaryDetail']['expireDate'] is None
+    assert data['summaryProfile']['longBusinessSummary'].endswith('{}')
+    assert data['upgradeDowngradeHistory']['history'][0]['firm'] == 'Wedbush'
+
+
+def test_parse_quote_summary_no_store():
+    assert parse_quote_summary('<html>Will be right back</html>') == {}
+
+
+def _chart_payload():
+    return {'timestamp': [1588000000, 1587900000, 1588100000, 1588200000],
+            'indicators': {
+                'quote': [{'open': [2., 1., None, 4.], 'high': [2., 1., 3., 4.],
+                           'low': [2., 1., 3., 4.], 'close': [2., 1., 3., 4.],
+                           'volume': [20, 10, 30, 40]}],
+                'adjclose': [{'adjclose': [1.9, 0.9, 2.9, 3.9]}]}}
+
+
+def test_create_df():
+    df = create_df(_chart_payload())
+    assert df.index.is_monotonic_increasing
+    assert list(df['Open'].values[:2]) == [1., 2.]
+    assert np.isnan(df['Open'].values[2])
+    assert df['Volume'].dtype == np.int64
+    assert list(df['Adj Close'].values) == [0.9, 1.9, 2.9, 3.9]
+
+    df = create_df(_chart_payload(), dtype=np.float32, dropna=True)
+    assert len(df) == 3
+    assert df['Close'].dtype == np.float32
+    assert list(df['Close'].values) == [1., 2., 4.]
+    assert (df.index == pd.to_datetime([1587900000, 1588000000, 1588200000], unit='s')).all()
+
+
+def test_create_df_missing_volume():
+    payload = _chart_payload()
+    payload['indicators']['quote'][0]['volume'][0] = None
+    df = create_df(payload, dropna=True)
+    assert len(df) == 2
+    assert df['Volume'].dtype == np.float64
+
+
+def test_merge_chart_results():
+    a = _chart_payload()
+    b = {'meta': {'last': True}, 'timestamp': [1588200000, 1588300000],
+         'indicators': {'quote': [{'open': [5., 6.], 'high': [5., 6.], 'low': [5., 6.],
+                                   'close': [5., 6.], 'volume': [50, 60]}],
+                        'adjclose': [{'adjclose': [4.9, 5.9]}]}}
+    merged = merge_chart_results([a, {'meta': {}}, b])
+    assert merged['meta'] == {'last': True}
+    assert merged['timestamp'] == [1587900000, 1588000000, 1588100000,
+                                   1588200000, 1588300000]
+    # The later window wins for the duplicated bar.
+    assert merged['indicators']['quote'][0]['close'] == [1., 2., 3., 5., 6.]
+    assert merged['indicators']['adjclose'][0]['adjclose'][-2:] == [4.9, 5.9]
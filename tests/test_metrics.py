@@ -0,0 +1,62 @@
+import json
+import pytest
+from unittest import mock
+from stockmanager import Ticker, metrics
+from stockmanager.transport import ArchivedResponse
+
+
+def _chart_response(url, params=None, proxy=None, session=None):
+    content = {'chart': {'result': [{
+        'meta': {'symbol': 'MSFT'},
+        'timestamp': [1587648600, 1587735000],
+        'indicators': {'quote': [{'open': [1., 2.], 'high': [1., 2.], 'low': [1., 2.],
+                                  'close': [1., 2.], 'volume': [10, 20]}]}}]}}
+    return ArchivedResponse(url, 200, json.dumps(content), elapsed=0.25)
+
+
+def test_no_listener():
+    assert not metrics.enabled()
+    assert metrics.measure('MSFT', 'chart', 'url') is metrics.NULL
+
+
+def test_measure_get_price():
+    events = []
+    totals = metrics.Aggregator()
+    metrics.subscribe(events.append)
+    metrics.subscribe(totals)
+    try:
+        with mock.patch('stockmanager.network.fetch', _chart_response):
+            Ticker('MSFT').get_price(period='1mo')
+            Ticker('MSFT').get_price(period='1mo')
+    finally:
+        metrics.unsubscribe(events.append)
+        metrics.unsubscribe(totals)
+    assert not metrics.enabled()
+
+    m = events[0]
+    assert (m.symbol, m.kind, m.requests, m.status) == ('MSFT', 'chart', 1, 200)
+    assert m.url.endswith('/v8/finance/chart/MSFT')
+    assert m.bytes > 0 and m.latency == 0.25
+    assert m.parse_time > 0 and m.build_time > 0 and m.error is None
+
+    summary = totals.summary()
+    assert summary.loc[('MSFT', 'chart'), 'requests'] == 2
+    assert summary.loc[('MSFT', 'chart'), 'latency'] == 0.5
+
+
+def test_error_and_failing_listener():
+    def broken(m):
+        raise ValueError
+
+    events = []
+    metrics.subscribe(broken)
+    metrics.subscribe(events.append)
+    try:
+        with pytest.raises(KeyError):
+            with metrics.measure('MSFT', 'quote', 'url'):
+                raise KeyError
+    finally:
+        metrics.unsubscribe(broken)
+        metrics.unsubscribe(events.append)
+    assert events[0].error == 'KeyError'
+    assert metrics.Aggregator().summary().empty
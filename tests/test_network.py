@@ -0,0 +1,157 @@
+from stockmanager import Ticker, Portfolio, network
+from stockmanager.transport import Transport
+import requests
+import pytest
+from unittest import mock
+
+
+def test_create_session():
+    s = network.create_session(pool_size=3)
+    assert isinstance(s, requests.Session)
+    adapter = s.get_adapter('https://query1.finance.yahoo.com')
+    assert adapter._pool_maxsize == 3
+    assert 'gzip' in s.headers['Accept-Encoding']
+
+    with pytest.raises(ValueError):
+        network.create_session(pool_size=0)
+
+
+def test_shared_session():
+    assert network.get_session() is network.get_session()
+    s = network.create_session()
+    network.set_session(s)
+    assert network.get_session() is s
+    network.set_session(None)
+    assert network.get_session() is not s
+
+    with pytest.raises(TypeError):
+        network.set_session('session')
+
+
+def test_injected_session():
+    s = network.create_session(pool_size=2)
+    assert Ticker('MSFT', session=s).session is s
+    assert Portfolio(session=s)._session is s
+
+
+def test_host_limited_session():
+    s = network.create_session(pool_size=4, max_per_host=2)
+    assert isinstance(s, network.HostLimitedSession)
+    assert s._semaphore('finance.yahoo.com') is s._semaphore('finance.yahoo.com')
+    assert s._semaphore('finance.yahoo.com') is not s._semaphore('query1.finance.yahoo.com')
+
+    with pytest.raises(ValueError):
+        network.create_session(max_per_host=0)
+
+
+class FakeResponse(object):
+    def __init__(self, status_code=200, text='ok', headers=None):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers or {}
+
+
+class FakeSession(object):
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def get(self, **kwargs):
+        self.calls += 1
+        r = self.responses.pop(0)
+        if isinstance(r, Exception):
+            raise r
+        return r
+
+
+@pytest.fixture
+def throttle():
+    sleeps = []
+    network.configure(max_retries=3, failure_threshold=3, reset_timeout=60)
+    previous = network.get_transport()
+    network.set_transport(None)  # Send with the fake sessions, not the archive
+    try:
+        with mock.patch('stockmanager.network._sleep', sleeps.append):
+            yield sleeps
+    finally:
+        network.set_transport(previous)
+    network.configure(**{'max_retries': network.DEFAULT_MAX_RETRIES,
+                         'failure_threshold': network.DEFAULT_FAILURE_THRESHOLD,
+                         'reset_timeout': network.DEFAULT_RESET_TIMEOUT})
+
+
+def test_retry_with_backoff(throttle):
+    session = FakeSession([FakeResponse(429, headers={'Retry-After': '2'}),
+                           requests.ConnectionError(),
+                           FakeResponse(200)])
+    r = network.fetch('https://retry.test/a', session=session)
+    assert r.status_code == 200
+    assert session.calls == 3
+    assert throttle[0] == 2.
+    s = network.stats()['retry.test']
+    assert s['requests'] == 3 and s['retries'] == 2
+    assert s['throttled'] == 1 and s['connection_errors'] == 1
+    assert s['state'] == 'closed'
+
+
+def test_circuit_breaker(throttle):
+    session = FakeSession([FakeResponse(503)] * 4)
+    # Breaker opens after 3 failures, the 4th try is refused
+    with pytest.raises(network.CircuitOpenError):
+        network.fetch('https://down.test/a', session=session)
+    assert session.calls == 3
+    assert network.stats()['down.test']['state'] == 'open'
+    with pytest.raises(network.CircuitOpenError):
+        network.fetch('https://down.test/b', session=session)
+    assert network.stats()['down.test']['rejected'] >= 1
+
+
+class RaisingTransport(Transport):
+    def get(self, session, url, params=None, proxies=None, timeout=None):
+        raise requests.exceptions.ChunkedEncodingError()
+
+
+def test_circuit_half_open_other_error(throttle):
+    session = FakeSession([FakeResponse(503)] * 3 + [FakeResponse(200)])
+    with pytest.raises(network.CircuitOpenError):
+        network.fetch('https://flaky.test/a', session=session)
+    breaker = network._host('https://flaky.test/a').breaker
+    breaker._opened_at -= 60  # reset_timeout passed, the next request is a trial
+
+    previous = network.get_transport()
+    network.set_transport(RaisingTransport())
+    try:
+        with pytest.raises(requests.exceptions.ChunkedEncodingError):
+            network.fetch('https://flaky.test/a', session=session)
+    finally:
+        network.set_transport(previous)
+    assert breaker.state == 'half_open'
+    # The host recovered, the next trial closes the circuit.
+    assert network.fetch('https://flaky.test/a', session=session).status_code == 200
+    assert breaker.state == 'closed'
+
+
+class JsonResponse(object):
+    status_code = 200
+    headers = {'Content-Type': 'application/json;charset=utf-8'}
+
+    @property
+    def text(self):
+        raise AssertionError("the body of a JSON response is decoded")
+
+
+def test_maintenance_page(throttle):
+    session = FakeSession([FakeResponse(text='<html>Will be right back</html>',
+                                        headers={'Content-Type': 'text/html'}),
+                           JsonResponse()])
+    assert isinstance(network.fetch('https://maintenance.test/a', session=session),
+                      JsonResponse)
+    assert session.calls == 2
+
+def test_token_bucket(throttle):
+    bucket = network.TokenBucket(rate=10, burst=2)
+    assert bucket.acquire() == 0
+    assert bucket.acquire() == 0
+    assert bucket.acquire() > 0
+    with pytest.raises(ValueError):
+        network.TokenBucket(rate=0)
@@ -21,3 +21,7 @@ def test_plot_plotly_backend(fig, figat, dummy_price):
     stockmanager.visualization.plot_price(dummy_price, backend='plotly')
 
 
+@mock.patch('stockmanager.visualization.go.Figure')
+def test_plot_plotly_priceseries(fig, dummy_price):
+    bars = stockmanager.PriceSeries.from_dataframe(dummy_price)
+    stockmanager.visualization.plot_price(bars, backend='plotly', mav=3)
@@ -1,8 +1,12 @@
 from stockmanager import Portfolio
 import pytest
 import os
+import json
+import sqlite3
 import time
 from unittest import mock
+import numpy as np
+import pandas as pd
 
 myrecord = Portfolio()
 
@@ -38,6 +42,7 @@ def test_load(empty_portfolio, rootdir):
     empty_portfolio.load(summary_path=summary_path, record_path=record_path)
     assert empty_portfolio.summary['Symbol'][0] == 'MSFT'
     assert empty_portfolio.summary['Symbol'][1] == 'ZM'
+    assert empty_portfolio.record['Date'][0] == pd.Timestamp('2020-02-20')
 
 
 def test_load_no_such_file(empty_portfolio, rootdir):
@@ -65,3 +70,262 @@ def test_remove_list(dummy_portfolio):
     check = ('AAPL', 'MSFT') in set(dummy_portfolio.summary.Symbol)
     assert check == False
 
+
+def _holding_portfolio():
+    p = Portfolio()
+    p.summary = pd.DataFrame({'Symbol': ['MSFT', 'ZM'], 'Name': ['MM', 'ZOOM'],
+                              'Exchange': 'NMS', 'Holdings': [100, 50],
+                              'Price at Registration': [150., 160.],
+                              'Currency': 'USD', 'Date': '01.03.2020 10:00'})
+    return p
+
+
+def test_trade():
+    p = _holding_portfolio()
+    p.trade('buy', 'ZM', 10, price=170.)
+    p.trade('Sell', 'ZM', 5, fee=1., price=180.)
+    assert p.summary.set_index('Symbol').loc['ZM', 'Holdings'] == 55
+    assert p.summary.set_index('Symbol').loc['ZM', 'Price at Registration'] == 180.
+    assert list(p.record['Buy']) == [10, 0]
+    assert p.record['Total Sell'].iloc[1] == 5 * 180. - 1.
+    with pytest.raises(ValueError):
+        p.trade('hold', 'ZM', 5, price=1.)
+
+
+def test_trade_many():
+    p = _holding_portfolio()
+    trades = pd.DataFrame({'Type': ['buy', 'sell', 'buy', 'buy'],
+                           'Symbol': ['MSFT', 'MSFT', 'ZM', 'AAPL'],
+                           'Amount': [10, 30, 5, 1], 'Price': [160., 170., 150., 300.],
+                           'Date': ['02.03.2020 10:00', '01.03.2020 11:00',
+                                    '05.03.2020 10:00', '01.03.2020 10:00']})
+    p.trade_many(trades)
+    summary = p.summary.set_index('Symbol')
+    assert summary.loc['MSFT', 'Holdings'] == 80
+    assert summary.loc['ZM', 'Holdings'] == 55
+    # The latest trade gives the registration price.
+    assert summary.loc['MSFT', 'Price at Registration'] == 160.
+    assert 'AAPL' not in summary.index
+    assert list(p.record['Symbol']) == ['AAPL', 'MSFT', 'MSFT', 'ZM']
+    assert list(p.record['Date'][1:3]) == [pd.Timestamp('2020-03-01 11:00'),
+                                           pd.Timestamp('2020-03-02 10:00')]
+
+    p.trade_many(Type=['buy'], Symbol=['ZM'], Amount=[5], Price=[1.])
+    assert p.summary.set_index('Symbol').loc['ZM', 'Holdings'] == 60
+    assert len(p.record) == 5
+
+
+def test_trade_keeps_record_sorted():
+    p = _holding_portfolio()
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        n = rng.integers(1, 4)
+        p.trade_many(Type='buy', Symbol=rng.choice(['MSFT', 'ZM', 'AAPL'], n),
+                     Amount=rng.integers(1, 10, n), Price=1.,
+                     Date=pd.Timestamp('2020-03-01') + pd.to_timedelta(rng.integers(0, 5, n),
+                                                                       unit='D'))
+    assert p.record is p._sorted_record
+    pd.testing.assert_frame_equal(p.record, p._sort_record(p.record))
+
+
+def test_trade_without_price():
+    p = _holding_portfolio()
+    with mock.patch('stockmanager.Portfolio.Ticker') as ticker:
+        ticker.return_value.current_price = None
+        with pytest.raises(ValueError, match='ZM'):
+            p.trade_many(Type=['buy', 'buy'], Symbol=['ZM', 'MSFT'], Amount=[1, 1],
+                         Price=[np.nan, 1.])
+    assert len(p.record) == 0
+
+
+def test_batch():
+    p = _holding_portfolio()
+    with mock.patch.object(Portfolio, 'trade_many', wraps=p.trade_many) as trade_many:
+        with p.batch():
+            for _ in range(10):
+                p.trade('buy', 'MSFT', 1, price=100.)
+            assert len(p.record) == 0
+    assert trade_many.call_count == 1
+    assert p.summary.set_index('Symbol').loc['MSFT', 'Holdings'] == 110
+
+    with pytest.raises(RuntimeError):
+        with p.batch():
+            p.trade('buy', 'MSFT', 1, price=100.)
+            raise RuntimeError
+    assert len(p.record) == 10
+
+
+def _stub_profiles(symbols, session=None):
+    return {s.upper(): {'symbol': s.upper(), 'name': s.upper() + ' Inc.', 'exchange': 'NMS',
+                        'currency': 'USD', 'price': 100., 'time': 1}
+            for s in symbols if s.upper() != 'NOSUCH'}
+
+
+@mock.patch('stockmanager.Portfolio.quote_profiles', side_effect=_stub_profiles)
+def test_add_registers_and_accumulates(profiles):
+    p = Portfolio()
+    p.add('MSFT', 10)
+    p.add(['ZM', 'AAPL', 'ZM'], [5, 1, 2])
+    p.add('MSFT', 10)
+    assert profiles.call_count == 2  # MSFT is only looked up once
+    assert list(p.summary.columns) == p._summary_colnames
+    assert list(p.summary['Symbol']) == ['MSFT', 'ZM', 'AAPL']
+    assert p.summary.loc[p.summary['Symbol'] == 'MSFT'].Holdings[0] == 20
+    assert p.summary['Holdings'][1] == 7
+    assert p.summary['Name'][1] == 'ZM Inc.'
+
+    with pytest.raises(AttributeError):
+        p.add(['AAPL', 'NOSUCH'], 1)
+    assert p.summary['Holdings'][2] == 1
+    with pytest.raises(ValueError):
+        p.add(['AAPL', 'ZM'], [1])
+
+
+def test_summary_store():
+    p = _holding_portfolio()
+    p.remove(['MSFT', 'NOSUCH'])
+    assert list(p.summary['Symbol']) == ['ZM']
+    with pytest.raises(TypeError):
+        p.remove(1)
+
+    p.summary = pd.DataFrame({'Name': ['A', 'B', 'C'], 'Symbol': ['A', 'B', 'A'],
+                              'Holdings': [1, 2, 3]})
+    assert list(p.summary.columns) == ['Name', 'Symbol', 'Holdings']
+    assert list(p.summary['Holdings']) == [2, 3]
+    p.summary = p.summary.set_index('Symbol')
+    assert list(p.summary['Symbol']) == ['B', 'A']
+    with pytest.raises(KeyError):
+        p.summary = pd.DataFrame({'Name': ['A']})
+
+
+def test_valuation():
+    p = _holding_portfolio()
+    p.summary = pd.concat([p.summary, pd.DataFrame({'Symbol': ['SAP'], 'Holdings': [10],
+                                                    'Price at Registration': [100.],
+                                                    'Currency': ['EUR']})])
+    profiles = {'MSFT': {'price': 165., 'time': 1588000000, 'currency': 'USD'},
+                'ZM': {'price': 140., 'time': 1588000000, 'currency': 'USD'},
+                'SAP': {'price': 110., 'time': 1588000000, 'currency': 'EUR'}}
+    with mock.patch('stockmanager.Portfolio.quote_profiles', return_value=profiles) as qp:
+        v = p.valuation(max_age=30)
+    assert qp.call_args[1]['max_age'] == 30
+    assert list(qp.call_args[0][0]) == ['MSFT', 'ZM', 'SAP']
+    assert v.loc['MSFT', 'Market Value'] == 16500.
+    assert v.loc['ZM', 'Unrealized P&L'] == 50 * (140. - 160.)
+    assert v.loc['MSFT', 'Unrealized P&L %'] == pytest.approx(0.1)
+    assert v.loc['MSFT', 'Weight'] + v.loc['ZM', 'Weight'] == pytest.approx(1.)
+    assert v.loc['SAP', 'Weight'] == 1.
+    assert v.loc['SAP', 'Price Time'] == pd.Timestamp(1588000000, unit='s')
+
+    with mock.patch('stockmanager.Portfolio.quote_profiles', return_value={}):
+        assert np.isnan(p.valuation().loc['ZM', 'Price'])
+
+
+def test_cost_basis():
+    p = _holding_portfolio()
+    p.trade_many(Type=['buy', 'buy', 'sell'], Symbol=['MSFT'] * 3, Amount=[10, 10, 15],
+                 Price=[100., 200., 300.], Fee=[0., 10., 5.],
+                 Date=['01.03.2020 10:00', '02.03.2020 10:00', '03.03.2020 10:00'])
+    assert p.record['Fee'].sum() == 15.
+    fifo = p.cost_basis()
+    assert fifo.loc['MSFT', 'Realized P&L'] == 15 * 300. - 5. - (1000. + 5 * 201.)
+    assert fifo.loc['MSFT', 'Cost Basis'] == 5 * 201.
+    engine = p._cost_engines['fifo']
+
+    p.trade('sell', 'MSFT', 5, price=250.)
+    fifo = p.cost_basis(prices={'MSFT': 210.})
+    assert p._cost_engines['fifo'] is engine  # updated, not rebuilt
+    assert fifo.loc['MSFT', 'Position'] == 0
+    assert fifo.loc['MSFT', 'Unrealized P&L'] == 0
+    assert p.cost_basis('average').loc['MSFT', 'Realized P&L'] == pytest.approx(
+        fifo.loc['MSFT', 'Realized P&L'])
+
+
+def test_journal(tmpdir):
+    path = str(tmpdir.join('book.db'))
+    p = Portfolio(journal=path)
+    p.summary = _holding_portfolio().summary
+    p.trade('buy', 'ZM', 10, price=170.)
+    with mock.patch('stockmanager.Portfolio.quote_profiles', side_effect=_stub_profiles):
+        p.add(['AAPL', 'MSFT'], [5, 1])
+    p.remove('ZM')
+    with p.batch():
+        p.trade('sell', 'MSFT', 20, price=180., fee=1.)
+        p.trade('buy', 'AAPL', 2, price=100.)
+    p.journal.close()
+
+    # Holdings payloads are plain JSON, not pickles.
+    with sqlite3.connect(path) as conn:
+        for (data,) in conn.execute("SELECT summary FROM checkpoints UNION ALL "
+                                    "SELECT data FROM events WHERE data IS NOT NULL"):
+            json.loads(data)
+
+    q = Portfolio(journal=path)
+    pd.testing.assert_frame_equal(q.summary, p.summary)
+    pd.testing.assert_frame_equal(q.record, p.record)
+
+    # Only the trade after the checkpoint is replayed.
+    q.checkpoint()
+    q.trade('buy', 'MSFT', 1, price=1.)
+    q.journal.close()
+    holdings, events = q.journal.__class__(path).replay()
+    assert list(holdings['Holdings']) == [81, 7]
+    assert [kind for kind, _ in events] == ['trades']
+    assert Portfolio(journal=path).summary.set_index('Symbol').loc['MSFT', 'Holdings'] == 82
+    with pytest.raises(AttributeError):
+        Portfolio().checkpoint()
+
+
+def test_summary_in_place(tmpdir):
+    p = Portfolio(journal=str(tmpdir.join('book.db')))
+    p.summary = _holding_portfolio().summary
+    assert p.summary is p.summary
+    p.trade('buy', 'ZM', 10, price=170.)  # Unchanged summary, no checkpoint
+    assert p.journal.replay()[1][0][0] == 'trades'
+
+    p.summary.loc[p.summary['Symbol'] == 'MSFT', 'Holdings'] = 7
+    p.trade('buy', 'MSFT', 1, price=1.)
+    assert p.summary.set_index('Symbol').loc['MSFT', 'Holdings'] == 8
+    assert p.summary.set_index('Symbol').loc['ZM', 'Holdings'] == 60
+    p.journal.close()
+    assert Portfolio(journal=p.journal.path).summary.set_index('Symbol').loc[
+        'MSFT', 'Holdings'] == 8
+
+
+def _traded_portfolio():
+    p = _holding_portfolio()
+    p.trade_many(Type='buy', Symbol=['MSFT', 'ZM', 'MSFT', 'ZM'], Amount=[1, 2, 3, 4],
+                 Price=[10., 20., 30., 40.], Fee=[0., 1., 0., 0.],
+                 Date=['2020-03-02 10:00', '2020-03-03 10:00', '2020-04-02 10:00',
+                       '2020-04-03 10:00'])
+    return p
+
+
+@pytest.mark.parametrize('format', ['csv', 'parquet', 'feather'])
+def test_save_load(tmpdir, format):
+    pytest.importorskip('pyarrow')
+    p = _traded_portfolio()
+    assert p.record['Date'].dtype == 'datetime64[ns]'
+    p.save(str(tmpdir), format=format)
+    q = Portfolio().load(str(tmpdir.join('portfolio.' + format)),
+                         str(tmpdir.join('records.' + format)))
+    pd.testing.assert_frame_equal(q.record, p.record)
+    pd.testing.assert_frame_equal(q.summary, p.summary)
+
+    q.load(str(tmpdir.join('portfolio.' + format)), str(tmpdir.join('records.' + format)),
+           symbols=['ZM'], start='2020-03-03', end='2020-04-01', chunksize=1)
+    assert list(q.record['Buy']) == [2]
+    assert q.record['Buy'].dtype == 'int64'
+    chunks = list(Portfolio.iter_record(str(tmpdir.join('records.' + format)), chunksize=2,
+                                        start='2020-04-01'))
+    assert [len(c) for c in chunks] == [1, 1]
+    with pytest.raises(AttributeError):
+        p.save(str(tmpdir), format='xlsx')
+
+
+def test_load_sorts_record(tmpdir):
+    p = _traded_portfolio()
+    p.save(str(tmpdir))
+    p.record.iloc[::-1].to_csv(str(tmpdir.join('records.csv')), index=False)
+    q = Portfolio().load(str(tmpdir.join('portfolio.csv')), str(tmpdir.join('records.csv')))
+    pd.testing.assert_frame_equal(q.record, p.record)
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+import pytest
+from stockmanager import PriceSeries, get_ohlc
+
+
+def test_roundtrip(dummy_price):
+    bars = PriceSeries.from_dataframe(dummy_price)
+    assert len(bars) == len(dummy_price)
+    assert bars.close.flags['C_CONTIGUOUS']
+    df = bars.to_dataframe()
+    pd.testing.assert_frame_equal(df, dummy_price, check_names=False,
+                                  check_index_type=False, check_freq=False)
+
+
+def test_columns_are_views(dummy_price):
+    bars = PriceSeries.from_dataframe(dummy_price)
+    assert bars['Close'] is bars.close
+    assert bars['Adj Close'] is bars.adjclose
+    last = bars[-5:]
+    assert len(last) == 5
+    assert np.shares_memory(last.close, bars.close)
+    with pytest.raises(KeyError):
+        bars['Price']
+    with pytest.raises(TypeError):
+        bars[0]
+
+
+def test_time_slice(dummy_price):
+    bars = PriceSeries.from_dataframe(dummy_price)
+    part = bars['2020-04-24':'2020-04-28 13:30']
+    expected = dummy_price.loc['2020-04-24':'2020-04-28 13:30']
+    assert len(expected) == 3
+    assert len(part) == len(expected)
+    assert part.index[0] == expected.index[0]
+
+
+def test_get_ohlc(dummy_price):
+    bars = PriceSeries.from_dataframe(dummy_price)
+    has_ohlc, ohlc = get_ohlc(bars)
+    assert has_ohlc
+    assert ohlc[3] is bars.close
@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pytest
+from stockmanager import PriceSeries
+from stockmanager.resample import resample, can_resample, floor_time
+
+
+@pytest.fixture(scope="module")
+def bars_5m():
+    # Two sessions 09:30 - 16:00 New York, in UTC like get_price.
+    days = ['2020-04-23 13:30', '2020-04-24 13:30']
+    idx = pd.DatetimeIndex(np.concatenate(
+        [pd.date_range(d, periods=78, freq='5min') for d in days]))
+    n = len(idx)
+    return pd.DataFrame({'Open': np.arange(n) + 0., 'High': np.arange(n) + 1.,
+                         'Low': np.arange(n) - 1., 'Close': np.arange(n) + .5,
+                         'Adj Close': np.arange(n) + .25,
+                         'Volume': np.ones(n, dtype=np.int64)}, index=idx)
+
+
+def test_can_resample():
+    assert can_resample('5m', '1h') and can_resample('1m', '1d')
+    assert can_resample('1d', '1wk') and can_resample('1mo', '3mo')
+    assert not can_resample('1h', '90m')
+    assert not can_resample('1h', '5m')
+    assert not can_resample('1wk', '1mo')
+
+
+def test_resample_hourly(bars_5m):
+    df = resample(bars_5m, '1h')
+    # 09:30, 10:30, ... 15:30 each day, the last bucket has 30 minutes.
+    assert len(df) == 14
+    assert df.index[0] == pd.Timestamp('2020-04-23 13:30')
+    assert df.index[7] == pd.Timestamp('2020-04-24 13:30')
+    first = df.iloc[0]
+    assert (first['Open'], first['High'], first['Low']) == (0., 12., -1.)
+    assert (first['Close'], first['Adj Close'], first['Volume']) == (11.5, 11.25, 12)
+    assert df['Volume'].iloc[6] == 6
+    assert df['Volume'].sum() == len(bars_5m)
+
+
+def test_resample_daily(bars_5m):
+    df = resample(bars_5m, '1d', exchange_tz='America/New_York')
+    assert list(df.index) == [pd.Timestamp('2020-04-23 13:30'), pd.Timestamp('2020-04-24 13:30')]
+    assert list(df['Close']) == [77.5, 155.5]
+
+    bars = resample(PriceSeries.from_dataframe(bars_5m), '1d')
+    assert isinstance(bars, PriceSeries) and len(bars) == 2
+
+
+def test_resample_weekly(dummy_price):
+    df = resample(dummy_price, '1wk')
+    # Weeks start on Monday 27.04.
+    assert df.index[1] == pd.Timestamp('2020-04-27 13:30')
+    assert df['Volume'].sum() == dummy_price['Volume'].sum()
+    assert floor_time(int(pd.Timestamp('2020-04-29 15:00').timestamp()), '1wk') == \
+        int(pd.Timestamp('2020-04-27').timestamp())
+    assert resample(dummy_price.iloc[:0], '1wk').empty
+    with pytest.raises(AttributeError):
+        resample(dummy_price, '5d')
@@ -0,0 +1,36 @@
+import pandas as pd
+import pytest
+from stockmanager import save_prices, load_prices, PriceSeries
+
+pytest.importorskip('pyarrow')
+
+
+@pytest.mark.parametrize('ext', ['parquet', 'feather'])
+def test_single_symbol(tmpdir, dummy_price, ext):
+    path = str(tmpdir.join('msft.' + ext))
+    save_prices(dummy_price, path)
+    df = load_prices(path)
+    pd.testing.assert_frame_equal(df, dummy_price, check_names=False,
+                                  check_freq=False, check_index_type=False)
+
+    df = load_prices(path, columns=['Close'], start='2020-04-24', end='2020-04-28 23:59')
+    assert list(df.columns) == ['Close']
+    assert len(df) == 3
+
+    with pytest.raises(KeyError):
+        load_prices(path, columns=['Price'])
+
+
+@pytest.mark.parametrize('ext', ['parquet', 'feather'])
+def test_universe(tmpdir, dummy_price, ext):
+    path = str(tmpdir.join('universe.' + ext))
+    save_prices({'MSFT': dummy_price,
+                 'AAPL': PriceSeries.from_dataframe(dummy_price.iloc[:5])}, path)
+    universe = load_prices(path)
+    assert set(universe) == {'MSFT', 'AAPL'}
+    assert len(universe['AAPL']) == 5
+    assert len(universe['MSFT']) == len(dummy_price)
+
+    universe = load_prices(path, symbols='AAPL', columns=['Open'], end='2020-04-24 23:59')
+    assert list(universe) == ['AAPL']
+    assert len(universe['AAPL']) == 2
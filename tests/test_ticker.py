@@ -1,10 +1,12 @@
 
-from stockmanager import Ticker
+from stockmanager import Ticker, price_params, chunk_range
 import pandas as pd
 import pytest
 import numpy as np
+import time
 from datetime import datetime
 from datetime import timedelta
+from unittest import mock
 
 
 
@@ -79,3 +81,122 @@ def test_balancesheet(sb):
     _ = sb.get_balancesheet(freq='Quarterly')
     with pytest.raises(AttributeError):
         _ = sb.get_balancesheet(freq='monthly')
+
+
+def test_price_params():
+    assert price_params('1y', '1d') == {'range': '1y', 'interval': '1d'}
+    params = price_params(start='2020-01-01', end='2020-01-31')
+    assert params['period2'] - params['period1'] == 31 * 24 * 3600
+    with pytest.raises(AttributeError):
+        price_params(period='2d')
+    with pytest.raises(TypeError):
+        price_params(start=12345)
+
+
+def test_lazy_sections():
+    page = {'summaryDetail': {'regularMarketOpen': 1., 'currency': 'USD'},
+            'quoteType': {'shortName': 'Microsoft Corporation'}}
+    t = Ticker('MSFT')
+    with mock.patch.object(Ticker, '_quote_page', return_value=page), \
+            mock.patch.object(Ticker, '_load_holders') as holders, \
+            mock.patch.object(Ticker, '_load_financials') as financials:
+        assert t.name == 'Microsoft Corporation'
+        assert t.currency == 'USD'
+        assert 'summary' in t._loaded
+        holders.assert_not_called()
+        financials.assert_not_called()
+        t.get_cashflow()
+        financials.assert_called_once()
+        holders.assert_not_called()
+
+
+def test_chunk_range(caplog):
+    day = 24 * 3600
+    now = 1590000000
+    assert chunk_range(now - 100 * day, now, '1d', now) == [(now - 100 * day, now)]
+    windows = chunk_range(now - 20 * day, now, '1m', now)
+    assert len(windows) == 3
+    assert windows[0] == (now - 20 * day, now - 13 * day)
+    assert windows[-1][1] == now
+    assert not caplog.records
+    # 1m data only reaches back 30 days, the clamped start is warned
+    windows = chunk_range(now - 365 * day, now, '1m', now)
+    assert windows[0][0] > now - 30 * day
+    assert len(windows) == 5
+    assert [r.levelname for r in caplog.records] == ['WARNING']
+    assert str(pd.Timestamp(windows[0][0], unit='s')) in caplog.text
+
+
+def _chart(timestamps, close):
+    return {'meta': {'symbol': 'MSFT', 'n': len(timestamps)}, 'timestamp': timestamps,
+            'indicators': {'quote': [{'open': close, 'high': close, 'low': close,
+                                      'close': close, 'volume': [1] * len(close)}]}}
+
+
+def test_fetch_chart_stitches_windows():
+    now = int(time.time())
+    calls = []
+
+    def request(self, params, m=None):
+        calls.append(params)
+        p1 = params['period1']
+        if len(calls) == 2:
+            return {'meta': {}}  # no trading in this window
+        # Windows overlap by one bar at the edges.
+        return _chart([p1, p1 + 60, params['period2']], [1., None, 2.])
+
+    with mock.patch.object(Ticker, '_request_chart', request):
+        t = Ticker('MSFT')
+        df = t.get_price(start=datetime.fromtimestamp(now - 20 * 24 * 3600),
+                         end=datetime.fromtimestamp(now), interval='1m')
+    assert len(calls) == 3
+    assert df.index.is_monotonic_increasing and df.index.is_unique
+    assert len(df) == 4
+
+
+def test_next_poll():
+    from stockmanager.Ticker import next_poll
+    assert next_poll(100., 5., 101.) == 105.
+    # A slow poll skips the missed slots instead of drifting.
+    assert next_poll(100., 5., 112.) == 115.
+    assert next_poll(100., 5., 110.) == 115.
+
+
+def test_get_quote():
+    content = {'meta': {'regularMarketPrice': 10., 'regularMarketTime': 5,
+                        'currency': 'USD'},
+               'indicators': {'quote': [{'volume': [1000]}]}}
+    with mock.patch.object(Ticker, '_request_chart', return_value=content) as request:
+        quote = Ticker('msft').get_quote()
+    assert request.call_args[0][0] == {'range': '1d', 'interval': '1d'}
+    assert quote == {'symbol': 'MSFT', 'price': 10., 'volume': 1000,
+                     'time': 5, 'currency': 'USD'}
+
+
+def test_stream_quotes():
+    quotes = iter([{'price': 1., 'volume': 1, 'time': 1},
+                   {'price': 1., 'volume': 1, 'time': 1},
+                   RuntimeError('down'),
+                   {'price': 2., 'volume': 3, 'time': 2}])
+    now = [0.]
+    sleeps = []
+
+    def get_quote(self):
+        now[0] += 0.5  # time of the request
+        q = next(quotes)
+        if isinstance(q, Exception):
+            raise q
+        return q
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    with mock.patch.object(Ticker, 'get_quote', get_quote), \
+            mock.patch('stockmanager.Ticker._clock', lambda: now[0]), \
+            mock.patch('stockmanager.Ticker._sleep', sleep):
+        stream = Ticker('MSFT').stream_quotes(every=2.)
+        assert next(stream)['price'] == 1.
+        assert next(stream)['price'] == 2.
+    # Polls at 0, 2, 4, 6 in spite of the request time.
+    assert sleeps == [1.5, 1.5, 1.5]
@@ -0,0 +1,83 @@
+import pytest
+from unittest import mock
+from stockmanager import network, Ticker
+from stockmanager.transport import (RecordTransport, ReplayTransport,
+                                    ArchiveMissError, ArchivedResponse)
+
+
+class FakeSession(object):
+    def __init__(self, text):
+        self.text = text
+        self.calls = 0
+
+    def get(self, url, params=None, proxies=None, timeout=None):
+        self.calls += 1
+        return ArchivedResponse(url, 200, self.text)
+
+
+def test_record_replay(tmpdir, rootdir):
+    with open(rootdir + '/dummy_data/dummy_quote.html') as f:
+        page = f.read()
+    session = FakeSession(page)
+    archive = str(tmpdir)
+    network.configure()  # Reset breakers opened by offline tests
+    previous = network.get_transport()
+    try:
+        network.set_transport(RecordTransport(archive))
+        network.fetch('https://finance.yahoo.com/quote/MSFT', session=session)
+        network.fetch('https://query1.finance.yahoo.com/v8/finance/chart/MSFT',
+                      params={'range': '1y', 'interval': '1d'}, session=session)
+        network.fetch('https://query1.finance.yahoo.com/v8/finance/chart/MSFT',
+                      params={'period1': 10, 'period2': 20, 'interval': '1d'}, session=session)
+        assert session.calls == 3
+
+        network.set_transport(ReplayTransport(archive))
+        t = Ticker('MSFT', session=session)
+        with mock.patch('stockmanager.Ticker.quote_cache.get',
+                        lambda key, loader, max_age=None: loader()):
+            assert t.current_price == 158.15
+        r = network.fetch('https://query1.finance.yahoo.com/v8/finance/chart/MSFT',
+                          params={'interval': '1d', 'range': '1y'}, session=session)
+        assert r.status_code == 200
+        # A different start and end time falls back to the same request.
+        network.fetch('https://query1.finance.yahoo.com/v8/finance/chart/MSFT',
+                      params={'period1': 1, 'period2': 2, 'interval': '1d'}, session=session)
+        assert session.calls == 3
+        # Any other difference is a miss.
+        for params in ({'period1': 1, 'period2': 2, 'interval': '1m'},
+                       {'range': '5d', 'interval': '1m'}):
+            with pytest.raises(ArchiveMissError):
+                network.fetch('https://query1.finance.yahoo.com/v8/finance/chart/MSFT',
+                              params=params, session=session)
+
+        network.set_transport(ReplayTransport(archive, fallback=False))
+        with pytest.raises(ArchiveMissError):
+            network.fetch('https://query1.finance.yahoo.com/v8/finance/chart/MSFT',
+                          params={'period1': 1, 'period2': 2, 'interval': '1d'},
+                          session=session)
+    finally:
+        network.set_transport(previous)
+
+
+def test_replay_fallback_newest(tmpdir):
+    archive = str(tmpdir)
+    url = 'https://query1.finance.yahoo.com/v8/finance/chart/MSFT'
+    # The newest recording is not the last one by file name.
+    for recorded, period2, text in ((200., 20, '"new"'), (100., 10, '"old"')):
+        with mock.patch('stockmanager.transport.time.time', return_value=recorded):
+            RecordTransport(archive).get(FakeSession(text), url,
+                                         {'period1': 1, 'period2': period2, 'interval': '1d'})
+    r = ReplayTransport(archive).get(None, url, {'period1': 1, 'period2': 30, 'interval': '1d'})
+    assert r.json() == 'new'
+
+def test_replay_latency(tmpdir):
+    archive = str(tmpdir)
+    RecordTransport(archive).get(FakeSession('{}'), 'https://a.test/x')
+    r = ReplayTransport(archive, latency=0.01).get(None, 'https://a.test/x')
+    assert r.json() == {}
+    assert r.elapsed.total_seconds() == 0.01
+
+    with pytest.raises(FileNotFoundError):
+        ReplayTransport(str(tmpdir.join('nothing')))
+    with pytest.raises(TypeError):
+        network.set_transport('replay')